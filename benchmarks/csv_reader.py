@@ -0,0 +1,68 @@
+# Benchmark: ParallelCSVReader (ranged GETs parsed in worker processes) vs pd.read_csv + transform
+# Runs against S3 (or any endpoint set with AWS_ENDPOINT_URL); --upload-rows first writes a
+# synthetic MovieLens-style movies CSV of that many rows to the key.
+# Usage: python benchmarks/csv_reader.py --bucket my-bucket [--key movies.csv] [--upload-rows 5000000]
+#                                        [--workers 1 2 4 8] [--range-mb 16 64] [--repeat 3]
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demos"))
+from common.clients import pooled_client
+from common.csv_reader import MB, ParallelCSVReader
+from common.movielens import prepare_movies
+from demo_pairs import make_movies_csv
+
+
+def timed(fn, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bucket", default=os.environ.get("S3_BUCKET_NAME"), required="S3_BUCKET_NAME" not in os.environ)
+    parser.add_argument("--key", default="movies.csv")
+    parser.add_argument("--upload-rows", type=int, help="write a synthetic movies CSV with this many rows first")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--range-mb", type=int, nargs="+", default=[64])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    s3 = pooled_client("s3", max_pool_connections=16)
+    if args.upload_rows:
+        body = make_movies_csv(args.upload_rows).to_csv(index=False).encode()
+        s3.put_object(Bucket=args.bucket, Key=args.key, Body=body)
+    size = s3.head_object(Bucket=args.bucket, Key=args.key)["ContentLength"]
+    print(f"s3://{args.bucket}/{args.key}: {size / MB:.1f} MB, {os.cpu_count()} CPUs")
+
+    def baseline():
+        # What the demos did: one stream through s3fs, parsed and transformed in this process
+        return prepare_movies(pd.read_csv(f"s3://{args.bucket}/{args.key}"))
+
+    base_seconds, expected = timed(baseline, args.repeat)
+    print(f"{'reader':<28} {'rows':>10} {'seconds':>8} {'MB/s':>7} {'speedup':>8}")
+    print(f"{'pd.read_csv + transform':<28} {len(expected):>10,} {base_seconds:>8.2f} "
+          f"{size / MB / base_seconds:>7.1f} {1:>7.1f}x")
+    for range_mb in args.range_mb:
+        for workers in args.workers:
+            reader = ParallelCSVReader(args.bucket, args.key, s3_client=s3, workers=workers,
+                                       range_size=range_mb * MB, transform=prepare_movies)
+            seconds, df = timed(reader.read, args.repeat)
+            assert len(df) == len(expected) and df["movieId"].equals(expected["movieId"]), (range_mb, workers)
+            name = f"{workers} workers, {range_mb} MB ranges"
+            print(f"{name:<28} {len(df):>10,} {seconds:>8.2f} {size / MB / seconds:>7.1f} "
+                  f"{base_seconds / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
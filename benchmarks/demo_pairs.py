@@ -0,0 +1,326 @@
+# Benchmark: every demo's BEFORE (boto3) script vs its AFTER (wrangler) script on synthetic MovieLens data
+# Each script runs in its own process against a local AWS stand-in and is measured for wall time
+# (interpreter start included), peak RSS, botocore API calls and rows/s; results go to a JSON report.
+# Rows are what each variant itself processed (its output stage's spans in a DEMO_TRACE_PATH trace),
+# e.g. demo 04 boto3 writes 100 items and demo 05 looks up a handful of keys.
+# Usage:
+#   python benchmarks/demo_pairs.py --rows 10000 100000 [--pairs 01 03 04 05] [--output demo_pairs.json]
+#   python benchmarks/demo_pairs.py --endpoint-url http://localhost:4566    # LocalStack: also runs the Athena demos
+#   python benchmarks/demo_pairs.py --baseline old.json --tolerance 0.2     # exit 1 on wall-time regressions
+# Requires moto's server extras (pip install "moto[server]") unless --endpoint-url is given.
+# moto accepts Athena calls but doesn't execute queries: on it demo 02 runs with ATHENA_LOCAL_QUERY=true
+# (common.local_query reads the Parquet table directly), and demo 06 is skipped - it needs an endpoint
+# that executes Athena queries (LocalStack Pro or AWS).
+import argparse
+import json
+import logging
+import os
+import platform
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import boto3
+import numpy as np
+import pandas as pd
+
+DEMOS = Path(__file__).resolve().parent.parent / "demos"
+sys.path.insert(0, str(DEMOS))
+from common.excel import write_excel
+from common.instrumentation import rss_mb
+
+BUCKET = "demo-pairs-bench"
+DATABASE = "movielens"
+TABLE_NAME = "movies"
+GENRES = ["Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama",
+          "Fantasy", "Film-Noir", "Horror", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western"]
+
+# pair -> (BEFORE script, AFTER script, scripts run unmeasured first, Athena use, output stages)
+# Athena use: None, "local" (ATHENA_LOCAL_QUERY=true without a query-executing Athena) or "service"
+# Output stages: the spans whose "rows" (or "keys") attributes count the rows a run processed
+PAIRS = {
+    "01": ("01_csv_to_parquet/boto3_version.py", "01_csv_to_parquet/wrangler.py", [], None, ["write_parquet"]),
+    "02": ("02_athena_query/boto3_version.py", "02_athena_query/wrangler.py", ["01_csv_to_parquet/wrangler.py"],
+           "local", ["local_query", "athena_query"]),
+    "03": ("03_excel_to_glue/boto3_version.py", "03_excel_to_glue/wrangler.py", [], None, ["write_parquet"]),
+    "04": ("04_dynamodb_write/boto3_version.py", "04_dynamodb_write/wrangler.py", [], None, ["dynamodb_write"]),
+    "05": ("05_dynamodb_lookup/boto3_rename.py", "05_dynamodb_lookup/wrangler.py", ["04_dynamodb_write/wrangler.py"],
+           None, ["dynamodb_lookup"]),
+    "06": ("06_athena_to_dynamodb_etl/boto3_version.py", "06_athena_to_dynamodb_etl/wrangler.py",
+           ["01_csv_to_parquet/wrangler.py"], "service", ["dynamodb_write"]),
+}
+
+
+def make_movies_csv(rows, seed=0):
+    # movies.csv shaped like MovieLens: "Title (Year)" with some a.k.a. titles and some without a year
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    years = rng.integers(1900, 2024, size=rows).astype(str)
+    titles = pd.Series([f"Movie {i}" for i in ids])
+    aka = rng.random(rows) < 0.05
+    titles[aka] = titles[aka] + " (a.k.a. Film " + pd.Series(ids[aka]).astype(str).values + ")"
+    no_year = rng.random(rows) < 0.01
+    titles = titles.where(no_year, titles + " (" + years + ")")
+    pool = np.array(["|".join(rng.choice(GENRES, size=k, replace=False)) for k in range(1, 6) for _ in range(20)])
+    return pd.DataFrame({"movieId": ids, "title": titles, "genres": pool[rng.integers(0, len(pool), size=rows)]})
+
+
+def make_employees(rows, seed=0):
+    # employees.xlsx with the demo 03 quirks: stray spaces, hiragana/katakana and full-width variants
+    rng = np.random.default_rng(seed)
+    names = np.array(["佐藤 萌", "伊藤  翔", "高橋 拓海", "伊藤 結衣", "鈴木 一郎", "田中 花子"])
+    titles = np.array(["ア ナリス ト", "かちょ う", "エン ジニア", "リーダー", "ぶちょう", "ｴﾝｼﾞﾆｱ"])
+    departments = np.array(["しんきじ ぎ ょう", "じんじ", "きぎょう", "し んきじぎょう", "ｼﾞﾝｼﾞ"])
+    return pd.DataFrame({
+        "名前": names[rng.integers(0, len(names), size=rows)],
+        "役職": titles[rng.integers(0, len(titles), size=rows)],
+        "部署": departments[rng.integers(0, len(departments), size=rows)],
+    })
+
+
+class Stack:
+    """The AWS stand-in the demos run against: an in-process moto server, or an existing endpoint."""
+
+    def __init__(self, endpoint_url=None):
+        self.server = None
+        if endpoint_url is None:
+            from moto.server import ThreadedMotoServer
+            logging.getLogger("werkzeug").setLevel(logging.ERROR)
+            self.server = ThreadedMotoServer(port=0, verbose=False)
+            self.server.start()
+            host, port = self.server.get_host_and_port()
+            endpoint_url = f"http://{host}:{port}"
+        self.endpoint_url = endpoint_url
+        self.athena = self.server is None
+
+    def client(self, service):
+        return boto3.client(service, endpoint_url=self.endpoint_url)
+
+    def reset(self):
+        if self.server is not None:
+            urllib.request.urlopen(urllib.request.Request(f"{self.endpoint_url}/moto-api/reset", method="POST"))
+
+    def seed(self, movies_csv):
+        s3 = self.client("s3")
+        s3.create_bucket(Bucket=BUCKET)
+        s3.put_object(Bucket=BUCKET, Key="movies.csv", Body=movies_csv)
+        glue = self.client("glue")
+        for database in (DATABASE, "employees"):
+            try:
+                glue.create_database(DatabaseInput={"Name": database})
+            except glue.exceptions.AlreadyExistsException:
+                pass
+        dynamodb = self.client("dynamodb")
+        try:
+            dynamodb.create_table(
+                TableName=TABLE_NAME,
+                KeySchema=[{"AttributeName": "movieId", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "movieId", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+        except dynamodb.exceptions.ResourceInUseException:
+            pass
+
+    def stop(self):
+        if self.server is not None:
+            self.server.stop()
+
+
+def demo_env(stack, workdir):
+    # Caches point into the run's own directory, so every measured run starts cold
+    env = dict(os.environ)
+    env.update({
+        "AWS_ENDPOINT_URL": stack.endpoint_url,
+        "S3_BUCKET_NAME": BUCKET,
+        "GLUE_DATABASE_NAME": DATABASE,
+        "DYNAMODB_TABLE_NAME": TABLE_NAME,
+        "ATHENA_RESULT_LOCATION": f"s3://{BUCKET}/athena-results/",
+        "ATHENA_CACHE_DIR": str(workdir / "athena_cache"),
+        "EXCEL_CACHE_DIR": str(workdir / "excel_cache"),
+        "JA_NORMALIZE_CACHE": str(workdir / "ja_normalize_cache.json"),
+        "LOOKUP_CACHE_PATH": str(workdir / "lookup_cache.sqlite"),
+        "ETL_CHECKPOINT_PATH": str(workdir / "etl.checkpoint.json"),
+    })
+    return env
+
+
+def processed_rows(trace_path, stages):
+    """Rows a demo run processed: the rows (or keys) of its output stage spans, summed."""
+    if not trace_path.exists():
+        return None
+    total = None
+    for line in trace_path.read_text().splitlines():
+        record = json.loads(line)
+        if record["type"] == "span" and record["name"] in stages and record["error"] is None:
+            attributes = record["attributes"]
+            count = attributes.get("rows", attributes.get("keys"))
+            if count is not None:
+                total = (total or 0) + count
+    return total
+
+
+def run_script(script, env, workdir, timeout, trace_path=None):
+    """Run one demo in a child process; returns (exit code, seconds, peak RSS MB, API calls, stderr tail)."""
+    report_file = workdir / "demo_report.json"
+    report_file.unlink(missing_ok=True)
+    if trace_path is not None:
+        trace_path.unlink(missing_ok=True)
+        env = {**env, "DEMO_TRACE_PATH": str(trace_path)}
+    command = [sys.executable, __file__, "--run-demo", str(DEMOS / script), "--report-file", str(report_file)]
+    with tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=stderr)
+        timer = threading.Timer(timeout, process.kill)
+        timer.start()
+        try:
+            process.wait()
+        finally:
+            seconds = time.perf_counter() - start
+            timer.cancel()
+        stderr.seek(0)
+        tail = stderr.read().decode(errors="replace").strip().splitlines()[-5:]
+    # The child reports its own API calls and peak RSS (nothing if it was killed)
+    report = json.loads(report_file.read_text()) if report_file.exists() else {}
+    return process.returncode, seconds, report.get("peak_rss_mb"), report.get("calls", {}), tail
+
+
+def run_demo(script, report_file):
+    # Child side: count every botocore API call the demo makes (awswrangler's included)
+    from botocore.client import BaseClient
+    calls = Counter()
+    make_api_call = BaseClient._make_api_call
+
+    def counted(client, operation_name, api_params):
+        calls[f"{client.meta.service_model.service_name}.{operation_name}"] += 1
+        return make_api_call(client, operation_name, api_params)
+
+    BaseClient._make_api_call = counted
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        Path(report_file).write_text(json.dumps({"calls": dict(sorted(calls.items())), "peak_rss_mb": rss_mb()[1]}))
+
+
+def benchmark(stack, pair, rows, employee_rows, movies_csv, timeout):
+    before, after, setup, athena, stages = PAIRS[pair]
+    results = []
+    for variant, script in (("boto3", before), ("wrangler", after)):
+        record = {"pair": pair, "variant": variant, "script": script, "rows": rows}
+        if athena == "service" and not stack.athena:
+            results.append({**record, "status": "skipped",
+                            "reason": "moto does not execute Athena queries; needs LocalStack Pro or AWS"})
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            write_excel(make_employees(employee_rows), workdir / "employees.xlsx")
+            env = demo_env(stack, workdir)
+            if athena == "local" and not stack.athena:
+                env["ATHENA_LOCAL_QUERY"] = "true"
+            stack.reset()
+            stack.seed(movies_csv)
+            for prerequisite in setup:
+                run_script(prerequisite, env, workdir, timeout)
+            code, seconds, peak_rss, calls, tail = run_script(script, env, workdir, timeout,
+                                                              trace_path=workdir / "trace.jsonl")
+            processed = processed_rows(workdir / "trace.jsonl", stages)
+        record.update({
+            "status": "ok" if code == 0 else "failed",
+            "wall_seconds": round(seconds, 3),
+            "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+            "rows_processed": processed,
+            "rows_per_second": round(processed / seconds, 1) if processed is not None else None,
+            "local_query": env.get("ATHENA_LOCAL_QUERY") == "true",
+            "api_calls_total": sum(calls.values()),
+            "api_calls": calls,
+        })
+        if code != 0:
+            record["error"] = "\n".join(tail)
+        results.append(record)
+    return results
+
+
+def regressions(results, baseline_path, tolerance):
+    baseline = {(r["pair"], r["variant"], r["rows"]): r for r in json.loads(Path(baseline_path).read_text())["results"]}
+    slower = []
+    for result in results:
+        old = baseline.get((result["pair"], result["variant"], result["rows"]))
+        if old and old.get("status") == "ok" and result["status"] == "ok":
+            if result["wall_seconds"] > old["wall_seconds"] * (1 + tolerance):
+                slower.append((result, old))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--employee-rows", type=int, default=10_000, help="rows in employees.xlsx for demo 03")
+    parser.add_argument("--pairs", nargs="+", choices=sorted(PAIRS), default=sorted(PAIRS))
+    parser.add_argument("--endpoint-url", help="existing AWS stand-in (e.g. LocalStack); defaults to moto")
+    parser.add_argument("--output", default="demo_pairs.json")
+    parser.add_argument("--baseline", help="earlier report to compare wall times against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs --baseline (0.2 = 20%%)")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds per script")
+    parser.add_argument("--run-demo", help=argparse.SUPPRESS)
+    parser.add_argument("--report-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_demo:
+        return run_demo(args.run_demo, args.report_file)
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    stack = Stack(args.endpoint_url)
+    results = []
+    try:
+        for rows in args.rows:
+            movies_csv = make_movies_csv(rows).to_csv(index=False).encode()
+            for pair in args.pairs:
+                for result in benchmark(stack, pair, rows, args.employee_rows, movies_csv, args.timeout):
+                    results.append(result)
+                    if result["status"] == "skipped":
+                        print(f"{pair} {result['variant']:<8} {rows:>10,} rows  skipped ({result['reason']})")
+                        continue
+                    processed = result["rows_processed"]
+                    throughput = (f"{processed:>9,} rows processed {result['rows_per_second']:>10,.0f} rows/s"
+                                  if processed is not None else f"{'rows processed unknown':>42}")
+                    print(f"{pair} {result['variant']:<8} {rows:>10,} rows  {result['status']:<6} "
+                          f"{result['wall_seconds']:>8.2f}s {result['peak_rss_mb'] or 0:>8.1f} MB "
+                          f"{result['api_calls_total']:>7,} calls {throughput}")
+    finally:
+        stack.stop()
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "pandas": pd.__version__,
+            "boto3": boto3.__version__,
+            "stack": args.endpoint_url or "moto",
+            "employee_rows": args.employee_rows,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        slower = regressions(results, args.baseline, args.tolerance)
+        for result, old in slower:
+            print(f"REGRESSION {result['pair']} {result['variant']} {result['rows']:,} rows: "
+                  f"{old['wall_seconds']:.2f}s -> {result['wall_seconds']:.2f}s")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
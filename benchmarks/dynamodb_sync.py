@@ -0,0 +1,114 @@
+# Benchmark: DynamoDBSync (write only changed rows) vs rewriting every item on each run
+# Usage:
+#   python benchmarks/dynamodb_sync.py --rows 100000 --change 0.01 0.1   # in-process moto
+#   python benchmarks/dynamodb_sync.py --mode attribute --endpoint-url http://localhost:8000
+# Requires moto (pip install "moto[dynamodb]") unless --endpoint-url is given
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import boto3
+import numpy as np
+import pandas as pd
+from botocore.config import Config
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demos"))
+from common.dynamodb_loader import BulkLoader
+from common.dynamodb_serializer import serialize_items
+from common.dynamodb_sync import DynamoDBSync
+
+TABLE_NAME = "movies-sync-bench"
+# The overwrite baseline gets its own table, so it can't strip the sync's content_hash attributes
+OVERWRITE_TABLE_NAME = "movies-overwrite-bench"
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Sci-Fi", "Thriller"]
+
+
+def make_movies(rows):
+    ids = np.arange(rows)
+    return pd.DataFrame({
+        "movieId": ids.astype(str),
+        "title": [f"Movie {i}" for i in ids],
+        "release_year": 1900 + ids % 124,
+        "genres": [GENRES[: 1 + i % len(GENRES)] for i in ids],
+    })
+
+
+def mutate(df, share, seed):
+    # Retitle a share of the movies and drop as many, like a catalog refresh
+    rng = np.random.default_rng(seed)
+    df = df.reset_index(drop=True)
+    count = int(len(df) * share)
+    changed = rng.choice(len(df), size=count, replace=False)
+    df.loc[changed, "title"] = df.loc[changed, "title"] + f" (rev {seed})"
+    return df.drop(index=rng.choice(np.setdiff1d(np.arange(len(df)), changed), size=count, replace=False))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--change", type=float, nargs="+", default=[0.0, 0.01, 0.1],
+                        help="share of rows changed (and as many removed) per run")
+    parser.add_argument("--mode", choices=["local", "attribute"], default="local")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--endpoint-url", help="DynamoDB Local endpoint; defaults to in-process moto")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    if args.endpoint_url:
+        backend = contextlib.nullcontext()
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+    else:
+        from moto import mock_aws
+        backend = mock_aws()
+
+    with backend, tempfile.TemporaryDirectory() as state_dir:
+        client = boto3.client(
+            "dynamodb", endpoint_url=args.endpoint_url, config=Config(max_pool_connections=args.workers)
+        )
+        for table_name in (TABLE_NAME, OVERWRITE_TABLE_NAME):
+            client.create_table(
+                TableName=table_name,
+                KeySchema=[{"AttributeName": "movieId", "KeyType": "HASH"}],
+                AttributeDefinitions=[{"AttributeName": "movieId", "AttributeType": "S"}],
+                BillingMode="PAY_PER_REQUEST",
+            )
+        loader = BulkLoader(TABLE_NAME, client=client, workers=args.workers)
+        overwrite = BulkLoader(OVERWRITE_TABLE_NAME, client=client, workers=args.workers)
+        try:
+            df = make_movies(args.rows)
+            overwrite.load(serialize_items(df))
+            # Initial load through the sync, so the hashes (file or attribute) exist
+            sync = DynamoDBSync(TABLE_NAME, ["movieId"], mode=args.mode, state_dir=state_dir, client=client,
+                                workers=args.workers)
+            loader.load(serialize_items(sync.diff(df)))
+            sync.commit()
+
+            print(f"{'changed':>8} {'overwrite s':>12} {'writes':>9} {'sync s':>8} {'writes':>9} {'avoided':>9}")
+            for run, share in enumerate(args.change, start=1):
+                current = mutate(df, share, seed=run)
+                start = time.perf_counter()
+                full = overwrite.load(serialize_items(current))
+                overwrite_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                sync = DynamoDBSync(TABLE_NAME, ["movieId"], mode=args.mode, state_dir=state_dir, client=client,
+                                    workers=args.workers)
+                changes = sync.diff(current)
+                stats = loader.load(serialize_items(changes), delete_keys=serialize_items(sync.deleted_keys()))
+                sync.commit(drop_missing=True)
+                sync_seconds = time.perf_counter() - start
+                print(f"{share:>8.1%} {overwrite_seconds:>12.2f} {full.items_written:>9,} {sync_seconds:>8.2f} "
+                      f"{stats.items_written:>9,} {sync.stats.writes_avoided:>9,}")
+                df = current
+        finally:
+            for table_name in (TABLE_NAME, OVERWRITE_TABLE_NAME):
+                client.delete_table(TableName=table_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Benchmark: GenreIndex lookups vs scanning every movie's genres list (what contains() does)
+# Usage: python benchmarks/genre_index.py [--rows 100000 1000000] [--repeat 20]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demos"))
+from common.genre_index import GenreIndex
+
+GENRES = ["Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary", "Drama",
+          "Fantasy", "Film-Noir", "Horror", "Musical", "Mystery", "Romance", "Sci-Fi", "Thriller", "War", "Western"]
+# Drama and Comedy dominate MovieLens; the tail genres are rare
+WEIGHTS = np.array([8, 5, 2, 2, 14, 5, 2, 18, 3, 1, 4, 2, 3, 6, 4, 8, 2, 1], dtype=float)
+
+QUERIES = {
+    "Action": dict(all_of=["Action"]),
+    "Action AND Comedy": dict(all_of=["Action", "Comedy"]),
+    "Horror OR Thriller": dict(any_of=["Horror", "Thriller"]),
+    "Drama AND NOT Romance": dict(all_of=["Drama"], none_of=["Romance"]),
+}
+
+
+def make_movies(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 4, size=rows)
+    genres = [list(rng.choice(GENRES, size=k, replace=False, p=WEIGHTS / WEIGHTS.sum())) for k in counts]
+    return pd.DataFrame({"movieId": np.arange(1, rows + 1), "genres": genres})
+
+
+def scan(df, all_of=(), any_of=(), none_of=()):
+    # Per-row membership test over the genres lists, like contains(genres, ...) in Athena
+    def matches(genres):
+        return (all(g in genres for g in all_of) and (not any_of or any(g in genres for g in any_of))
+                and not any(g in genres for g in none_of))
+    return df["movieId"].to_numpy()[df["genres"].map(matches).to_numpy()]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = make_movies(rows)
+        build, index = timed(lambda: GenreIndex.from_frame(df), 1)
+        size = index.to_table()["data"].nbytes
+        print(f"\n{rows:,} movies: index built in {build:.2f}s, {size / 1e6:.2f} MB of postings")
+        print(f"{'query':<24} {'matches':>9} {'scan':>10} {'index':>10} {'speedup':>8}")
+        for name, query in QUERIES.items():
+            scan_seconds, expected = timed(lambda: scan(df, **query), max(1, args.repeat // 10))
+            index_seconds, ids = timed(lambda: index.query(**query), args.repeat)
+            assert np.array_equal(ids, expected), name
+            print(f"{name:<24} {len(ids):>9,} {scan_seconds * 1000:>8.1f}ms {index_seconds * 1000:>8.2f}ms "
+                  f"{scan_seconds / index_seconds:>7.0f}x")
+
+        # Incremental update: 1% of the movies get new genres
+        changed = make_movies(rows, seed=1).sample(frac=0.01, random_state=0)
+        seconds, delta = timed(lambda: index.update(changed), 1)
+        print(f"update of {len(changed):,} movies: {seconds * 1000:.1f}ms ({delta.summary()})")
+
+
+if __name__ == "__main__":
+    main()
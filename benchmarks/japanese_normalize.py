@@ -0,0 +1,51 @@
+# Benchmark: TextNormalizer (unique values only) vs the per-cell applymap in demo 03
+# Usage: python benchmarks/japanese_normalize.py [--rows 100000 5000000]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import jaconv
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demos"))
+from common.japanese import TextNormalizer
+
+EMPLOYEES_CSV = Path(__file__).resolve().parent.parent / "demos" / "03_excel_to_glue" / "employees.csv"
+
+
+def make_employees(rows, seed=0):
+    # Resample the demo's messy titles/departments up to the requested row count
+    sample = pd.read_csv(EMPLOYEES_CSV).rename(columns={"役職": "title", "部署": "department"})
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "title": rng.choice(sample["title"].to_numpy(), size=rows),
+        "department": rng.choice(sample["department"].to_numpy(), size=rows),
+    })
+
+
+def applymap_normalize(df):
+    # The previous demo 03 path: two jaconv calls per cell
+    return df[["title", "department"]].map(lambda x: jaconv.hira2kata(jaconv.z2h(x)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 5_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'applymap':>10} {'unique':>10} {'speedup':>8}")
+    for rows in args.rows:
+        df = make_employees(rows)
+        start = time.perf_counter()
+        applymap_normalize(df)
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        TextNormalizer().normalize_columns(df, ["title", "department"])
+        after = time.perf_counter() - start
+        print(f"{rows:>10,} {before:>9.2f}s {after:>9.2f}s {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
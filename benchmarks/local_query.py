@@ -0,0 +1,50 @@
+# Benchmark: LocalQueryEngine (partition pruning + Parquet pushdown) vs wr.athena.read_sql_query
+# Runs against a real Athena workgroup (needs ATHENA_RESULT_LOCATION or a workgroup output location).
+# Usage: python benchmarks/local_query.py --database movielens [--repeat 3] [--query "SELECT ..."]
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import awswrangler as wr
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demos"))
+from common.local_query import LocalQueryEngine
+
+DEFAULT_QUERIES = [
+    "SELECT title, genres FROM movies WHERE release_year = 1995",
+    "SELECT movieid, title FROM movies WHERE release_year IN (1994, 1995, 1996) AND movieid < 1000",
+    "SELECT title FROM movies WHERE contains(genres, 'Film-Noir') AND release_year BETWEEN 1940 AND 1959",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default=os.environ.get("GLUE_DATABASE_NAME", "movielens"))
+    parser.add_argument("--query", action="append", help="repeatable; defaults to three movies queries")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = LocalQueryEngine()
+    print(f"{'rows':>7} {'athena s':>9} {'local s':>8} {'MB athena':>10} {'MB files':>9}  query")
+    for sql in args.query or DEFAULT_QUERIES:
+        athena, local = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            # Plain query results (no CTAS), like demo 02
+            expected = wr.athena.read_sql_query(sql, database=args.database, ctas_approach=False)
+            athena.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            df = engine.read_sql_query(sql, args.database)
+            local.append(time.perf_counter() - start)
+        if len(df) != len(expected):
+            print(f"  row count differs: Athena {len(expected)}, local {len(df)}")
+        scanned = expected.query_metadata["Statistics"].get("DataScannedInBytes", 0)
+        print(f"{len(df):>7} {statistics.median(athena):>9.2f} {statistics.median(local):>8.2f} "
+              f"{scanned / 1e6:>10.2f} {engine.last_scan['bytes'] / 1e6:>9.2f}  {sql}")
+
+
+if __name__ == "__main__":
+    main()
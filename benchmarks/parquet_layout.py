@@ -0,0 +1,65 @@
+# Benchmark: Athena bytes scanned and latency before/after compacting a partitioned dataset
+# Runs against a real Athena workgroup (needs ATHENA_RESULT_LOCATION); compaction rewrites the files in place.
+# Usage: python benchmarks/parquet_layout.py --bucket my-bucket --prefix movies --database movielens \
+#            --sort-by movieId [--repeat 3] [--query "SELECT ..."]
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demos"))
+from common.athena_runner import AsyncAthenaRunner
+from common.parquet_layout import ParquetCompactor, ParquetLayout
+
+DEFAULT_QUERIES = [
+    "SELECT count(*) FROM movies WHERE release_year = 1995",
+    "SELECT title FROM movies WHERE movieid BETWEEN 1000 AND 1100",
+    "SELECT count(*) FROM movies WHERE contains(genres, 'Action')",
+]
+
+
+async def measure(runner, queries, repeat):
+    # Queries run one at a time so their latencies don't interfere
+    results = {}
+    for sql in queries:
+        scanned, latency = [], []
+        for _ in range(repeat):
+            execution = await runner.execute(sql)
+            stats = execution["Statistics"]
+            scanned.append(stats.get("DataScannedInBytes", 0))
+            latency.append(stats.get("TotalExecutionTimeInMillis", 0) / 1000)
+        results[sql] = (statistics.median(scanned), statistics.median(latency))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bucket", required=True)
+    parser.add_argument("--prefix", default="movies")
+    parser.add_argument("--database", default=os.environ.get("GLUE_DATABASE_NAME", "movielens"))
+    parser.add_argument("--output-location", default=os.environ.get("ATHENA_RESULT_LOCATION"))
+    parser.add_argument("--sort-by", nargs="*", default=["movieId"])
+    parser.add_argument("--query", action="append", help="repeatable; defaults to three movies queries")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = args.query or DEFAULT_QUERIES
+    runner = AsyncAthenaRunner(args.database, args.output_location, max_concurrency=1)
+
+    before = asyncio.run(measure(runner, queries, args.repeat))
+    ParquetCompactor(args.bucket, args.prefix, layout=ParquetLayout(sort_by=args.sort_by)).compact()
+    # New runner: the semaphore belongs to the previous event loop
+    runner = AsyncAthenaRunner(args.database, args.output_location, max_concurrency=1)
+    after = asyncio.run(measure(runner, queries, args.repeat))
+
+    print(f"{'MB before':>10} {'MB after':>10} {'s before':>9} {'s after':>8}  query")
+    for sql in queries:
+        (scanned_before, latency_before), (scanned_after, latency_after) = before[sql], after[sql]
+        print(f"{scanned_before / 1e6:>10.2f} {scanned_after / 1e6:>10.2f} "
+              f"{latency_before:>9.2f} {latency_after:>8.2f}  {sql}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,114 @@
 # BEFORE: Pandas + boto3 to write Parquet and register with Glue
-import pandas as pd
-import boto3
 import logging
 from datetime import datetime 
+from pathlib import Path
 import os
+import sys
+
+# Shared MovieLens helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.clients import pooled_client
+from common.csv_reader import ParallelCSVReader
+from common.genre_index import refresh_index
+from common.glue_catalog import CatalogSync
+from common.instrumentation import span, start_tracing
+from common.movielens import prepare_movies
+from common.parquet_layout import ParquetLayout
+from common.s3_writer import PartitionedParquetWriter
 
 # ENVIRONMENT VARIABLES
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 GLUE_DATABASE_NAME = os.environ.get('GLUE_DATABASE_NAME', 'demo-glue-catalog-changeme')
+# "true": Athena computes release_year partitions from table properties instead of the catalog
+GLUE_PARTITION_PROJECTION = os.environ.get('GLUE_PARTITION_PROJECTION', 'false').lower() == 'true'
+# Genre -> movieId inverted index of the movies table (empty = don't maintain it)
+MOVIES_GENRE_INDEX_KEY = os.environ.get('MOVIES_GENRE_INDEX_KEY', '_indexes/movies_genres.parquet')
+# Processes that fetch and parse movies.csv ranges (default: one per CPU, 1 = in this process)
+CSV_READ_WORKERS = int(os.environ.get('CSV_READ_WORKERS', '0')) or None
 
 # Configure logging for BEFORE section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("01_csv_to_parquet/boto3_version")
 
 # Initialize AWS clients
-s3 = boto3.client("s3")
-glue = boto3.client("glue")
-
-# Read CSV from S3
-df = pd.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv")
-
-# Extract clean title and year, detect remakes
-df[['title', 'release_year']] = df['title'].str.extract(r'^(.*?)\s*\((\d{4})\)')
-
-# Handle invalid years gracefully - best practice for production code
-df['release_year'] = pd.to_numeric(df['release_year'], errors='coerce')
-
-# Convert pipe-separated genres to list for better searchability
-# Athena can query arrays with contains() function: WHERE contains(genres, 'Action')
-# Note: contains() is case-sensitive - MovieLens uses proper case (Action, Comedy, Sci-Fi)
-df['genres'] = df['genres'].str.split('|')
-
-# Manually partition data by release_year and upload to S3
-for release_year, group in df.groupby('release_year'):
-    # Save each year's data to local parquet file
-    parquet_file = f"/tmp/movies_year_{release_year}.parquet"
-    group.to_parquet(parquet_file)
-    # Upload to S3 with partition structure
-    with open(parquet_file, "rb") as f:
-        s3.upload_fileobj(f, S3_BUCKET_NAME, f"movies/release_year={release_year}/movies.parquet")
-
-# Manually register partitioned table with Glue Data Catalog
-glue.create_table(
-    DatabaseName=GLUE_DATABASE_NAME,
-    TableInput={
-        "Name": "movies",
-        "StorageDescriptor": {
-            # Define schema for all columns except partition column
-            "Columns": [{"Name": col, "Type": "string"} for col in df.columns if col != "release_year"],
-            "Location": f"s3://{S3_BUCKET_NAME}/movies/",
-            # Specify Parquet input/output formats
-            "InputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
-            "OutputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
-            "SerdeInfo": {"SerializationLibrary": "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"}
-        },
-        # Define partition column
-        "PartitionKeys": [{"Name": "release_year", "Type": "int"}]
-    }
+# Clients come from a process-wide pool, so demos/run_demos.py reuses them across demos
+# The S3 connection pool is sized for the parallel partition uploads below
+s3 = pooled_client("s3", max_pool_connections=64)
+glue = pooled_client("glue")
+
+# Read CSV from S3 and transform it in parallel
+# movies.csv is split into 64 MB byte ranges aligned on line ends; worker processes fetch
+# their range with concurrent ranged GETs, parse it and run the transform, so parsing
+# uses every core and only parsed DataFrames come back to this process
+# The transform (prepare_movies):
+# - extracts clean title, year and alternate title in one vectorized pass
+#   (titles without a year keep their text and get a null release_year)
+# - converts pipe-separated genres to lists for better searchability
+#   Athena can query arrays with contains() function: WHERE contains(genres, 'Action')
+#   Note: contains() is case-sensitive - MovieLens uses proper case (Action, Comedy, Sci-Fi)
+with span("read_csv") as stage:
+    reader = ParallelCSVReader(S3_BUCKET_NAME, "movies.csv", s3_client=s3, workers=CSV_READ_WORKERS,
+                               transform=prepare_movies)
+    df = reader.read()
+    stage["rows"] = len(df)
+
+# Partition data by release_year and upload every partition concurrently
+# Each partition is encoded to Parquet in memory (no /tmp files) and uploaded through
+# a bounded thread pool that shares one pooled S3 client; large partitions use multipart
+# Rows are sorted by movieId within each partition (tight row-group min/max statistics)
+# and only low-cardinality columns such as the genres elements are dictionary-encoded
+writer = PartitionedParquetWriter(
+    bucket=S3_BUCKET_NAME,
+    prefix="movies",
+    partition_col="release_year",
+    s3_client=s3,
+    file_name="movies.parquet",
+    layout=ParquetLayout(sort_by="movieId"),
 )
+with span("write_parquet", rows=len(df)):
+    written = writer.write(df)
+
+with span("register_glue", partitions=len(written)):
+    # Manually register partitioned table with Glue Data Catalog
+    # (created on the first run, updated on later ones)
+    catalog = CatalogSync(GLUE_DATABASE_NAME, "movies", client=glue)
+    catalog.ensure_table(
+        {
+            "Name": "movies",
+            "TableType": "EXTERNAL_TABLE",
+            "StorageDescriptor": {
+                # Define schema for all columns except partition column
+                "Columns": [{"Name": col, "Type": "string"} for col in df.columns if col != "release_year"],
+                "Location": f"s3://{S3_BUCKET_NAME}/movies/",
+                # Specify Parquet input/output formats
+                "InputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+                "OutputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+                "SerdeInfo": {"SerializationLibrary": "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"}
+            },
+            # Define partition column
+            "PartitionKeys": [{"Name": "release_year", "Type": "int"}]
+        }
+    )
+
+    # Register every uploaded partition so Athena can query it without MSCK REPAIR TABLE
+    # batch_create_partition takes 100 partitions per call; the batches run concurrently
+    catalog.register_partitions({
+        year: f"s3://{S3_BUCKET_NAME}/movies/release_year={year}/" for year in written
+    })
+
+    if GLUE_PARTITION_PROJECTION:
+        # Every year in the data's range is a valid partition; Athena skips the catalog lookup
+        catalog.enable_projection(
+            {"release_year": {"type": "integer", "range": f"{min(written)},{max(written)}"}},
+            location_template=f"s3://{S3_BUCKET_NAME}/movies/release_year=${{release_year}}/",
+        )
 
+if MOVIES_GENRE_INDEX_KEY:
+    # Precomputed genre -> movieId postings, so genre lookups don't scan every genres array
+    # Only memberships that changed since the last run are rewritten
+    # Rows without a release_year were not written (no partition), so they aren't indexed either
+    indexed = df[df['release_year'].notna()]
+    with span("genre_index", rows=len(indexed)):
+        refresh_index(indexed, S3_BUCKET_NAME, MOVIES_GENRE_INDEX_KEY, full=True, s3_client=s3)
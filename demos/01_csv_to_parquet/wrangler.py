@@ -1,42 +1,173 @@
 # AFTER: AWS SDK for Pandas (wrangler) simplifies the entire flow
 import awswrangler as wr
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 import os
+import sys
+
+# Shared MovieLens helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.clients import pooled_client
+from common.genre_index import GenreIndex, refresh_index
+from common.ingest_manifest import IngestManifest, object_info, partition_hashes
+from common.instrumentation import span, start_tracing
+from common.movielens import parse_titles
+from common.parquet_layout import ParquetCompactor, ParquetLayout
 
 # Configure logging for AFTER section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("01_csv_to_parquet/wrangler")
 
 # ENVIRONMENT VARIABLES
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 GLUE_DATABASE_NAME = os.environ.get('GLUE_DATABASE_NAME', 'demo-glue-catalog-changeme')
 
-# Read CSV from S3
-df = wr.s3.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv")
-
-# Extract clean title and release year
-df[['title', 'release_year']] = df['title'].str.extract(r'^(.*?)\s*\((\d{4})\)')
-
-# Handle invalid years gracefully - best practice for production code
-df['release_year'] = pd.to_numeric(df['release_year'], errors='coerce')
-
-# Convert pipe-separated genres to list for better searchability
-# Athena can query arrays with contains() function: WHERE contains(genres, 'Action')
-# Note: contains() is case-sensitive - MovieLens uses proper case (Action, Comedy, Sci-Fi)
-df['genres'] = df['genres'].str.split('|')
-
-# Write partitioned parquet dataset and auto-register with Glue in one step
-# This single function call handles partitioning by year, uploading to S3,
-# and registering the table schema with Glue Data Catalog automatically
-# Store release year as integer, not string
-wr.s3.to_parquet(
-    df=df,
-    path=f"s3://{S3_BUCKET_NAME}/movies/",
-    dataset=True,
-    database=GLUE_DATABASE_NAME,
-    table="movies",
-    partition_cols=["release_year"],
-    dtype={'release_year': 'int64'}  
-
-)
\ No newline at end of file
+# Pipeline mode: "batch" loads the whole CSV at once, "streaming" processes it in chunks
+# Streaming keeps peak memory flat no matter how large movies.csv grows
+# "incremental" rewrites only the release_year partitions whose rows changed since the last run
+PIPELINE_MODE = os.environ.get('PIPELINE_MODE', 'batch')
+CSV_CHUNK_SIZE = int(os.environ.get('CSV_CHUNK_SIZE', '100000'))
+# Where incremental mode records what it has ingested (outside the movies/ table location)
+MANIFEST_KEY = os.environ.get('MANIFEST_KEY', '_manifests/movies.json')
+# "true": after writing, merge partitions left with several small files (e.g. by appends or streaming)
+COMPACT_SMALL_FILES = os.environ.get('COMPACT_SMALL_FILES', 'false').lower() == 'true'
+# Genre -> movieId inverted index of the movies table (empty = don't maintain it)
+MOVIES_GENRE_INDEX_KEY = os.environ.get('MOVIES_GENRE_INDEX_KEY', '_indexes/movies_genres.parquet')
+
+# Sort by movieId inside each partition; dictionary-encode only low-cardinality columns (genres)
+MOVIES_LAYOUT = ParquetLayout(sort_by="movieId")
+
+
+def transform_movies(df):
+    with span("transform", rows=len(df)):
+        # Extract clean title, release year and alternate title in one vectorized pass
+        # Titles without a year keep their text and get a null release_year
+        df[['title', 'release_year', 'alt_title']] = parse_titles(df['title'])
+
+        # Convert pipe-separated genres to list for better searchability
+        # Athena can query arrays with contains() function: WHERE contains(genres, 'Action')
+        # Note: contains() is case-sensitive - MovieLens uses proper case (Action, Comedy, Sci-Fi)
+        df['genres'] = df['genres'].str.split('|')
+    return df
+
+
+def write_movies(df, mode):
+    # Write partitioned parquet dataset and auto-register with Glue in one step
+    # This single function call handles partitioning by year, uploading to S3,
+    # and registering the table schema with Glue Data Catalog automatically
+    # Store release year as integer, not string
+    with span("write_parquet", rows=len(df), mode=mode):
+        df = MOVIES_LAYOUT.sort_frame(df)
+        wr.s3.to_parquet(
+            df=df,
+            path=f"s3://{S3_BUCKET_NAME}/movies/",
+            dataset=True,
+            mode=mode,
+            database=GLUE_DATABASE_NAME,
+            table="movies",
+            partition_cols=["release_year"],
+            dtype={'release_year': 'bigint'},
+            **MOVIES_LAYOUT.wrangler_kwargs(df)
+        )
+
+
+def indexed_movies(df):
+    # Rows without a release_year have no partition and never reach the table, so they
+    # stay out of the index too - it must list exactly the movies Athena can return
+    return df[df['release_year'].notna()]
+
+
+def update_genre_index(df):
+    # Precomputed genre -> movieId postings, so genre lookups don't scan every genres array
+    # df is the whole CSV: only memberships that changed since the last run are rewritten
+    if MOVIES_GENRE_INDEX_KEY:
+        df = indexed_movies(df)
+        with span("genre_index", rows=len(df)):
+            refresh_index(df, S3_BUCKET_NAME, MOVIES_GENRE_INDEX_KEY, full=True)
+
+
+def load_incremental():
+    s3 = pooled_client("s3")
+    source = f"s3://{S3_BUCKET_NAME}/movies.csv"
+    manifest = IngestManifest(S3_BUCKET_NAME, MANIFEST_KEY, s3_client=s3)
+
+    # Same ETag/size/mtime as last time: nothing to parse or write
+    info = object_info(s3, S3_BUCKET_NAME, "movies.csv")
+    if manifest.unchanged(source, info):
+        logger.info(f"{source} unchanged since the last load, skipping")
+        return
+
+    # Hash every release_year partition and compare with the manifest
+    with span("read_csv"):
+        df = wr.s3.read_csv(source)
+    df = transform_movies(df)
+    with span("partition_hashes"):
+        hashes = partition_hashes(df, "release_year")
+    changed, removed = manifest.diff(hashes)
+    logger.info(f"{len(changed)} of {len(hashes)} partitions changed, {len(removed)} removed")
+
+    if changed:
+        # overwrite_partitions replaces only the partitions present in this frame
+        # and adds any new ones to the Glue table
+        changed_rows = df['release_year'].astype(str).isin(changed) & df['release_year'].notna()
+        write_movies(df[changed_rows], mode="overwrite_partitions")
+    if removed:
+        # Partitions whose rows all disappeared from the CSV: drop their files and catalog entries
+        with span("delete_partitions", partitions=len(removed)):
+            for value in removed:
+                wr.s3.delete_objects(f"s3://{S3_BUCKET_NAME}/movies/release_year={value}/")
+            wr.catalog.delete_partitions(
+                table="movies",
+                database=GLUE_DATABASE_NAME,
+                partitions_values=[[value] for value in removed],
+            )
+
+    update_genre_index(df)
+    # Saved last: if the load fails, the next run retries the same delta
+    manifest.save(source, info, hashes)
+
+
+if PIPELINE_MODE == 'incremental':
+    load_incremental()
+elif PIPELINE_MODE == 'streaming':
+    # chunksize turns read_csv into an iterator of DataFrames, so only one chunk
+    # is parsed at a time. The first chunk replaces the dataset, the rest append
+    # new files to their release_year partitions.
+    # A single background writer uploads chunk N while chunk N+1 is parsed and
+    # transformed; waiting on it before handing over the next chunk caps memory
+    # at two chunks in flight.
+    chunks = wr.s3.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv", chunksize=CSV_CHUNK_SIZE)
+    total_rows = 0
+    # The dataset is rewritten from scratch, so is the genre index (one update per chunk)
+    genre_index = GenreIndex()
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        pending = None
+        for chunk_number, chunk in enumerate(chunks):
+            chunk = transform_movies(chunk)
+            if pending is not None:
+                pending.result()
+            pending = writer.submit(write_movies, chunk, "overwrite" if chunk_number == 0 else "append")
+            genre_index.update(indexed_movies(chunk))
+            total_rows += len(chunk)
+            logger.info(f"Chunk {chunk_number}: queued {len(chunk)} rows ({total_rows} total)")
+        if pending is not None:
+            pending.result()
+    logger.info(f"Streaming load completed: {total_rows} movies written")
+    if MOVIES_GENRE_INDEX_KEY:
+        genre_index.save(S3_BUCKET_NAME, MOVIES_GENRE_INDEX_KEY)
+else:
+    # Read CSV from S3
+    with span("read_csv"):
+        df = wr.s3.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv")
+    df = transform_movies(df)
+    write_movies(df, mode="append")
+    update_genre_index(df)
+
+if COMPACT_SMALL_FILES:
+    # Merge each partition's small files into one sorted file, then delete the originals
+    with span("compact"):
+        ParquetCompactor(S3_BUCKET_NAME, "movies", layout=MOVIES_LAYOUT).compact()
@@ -1,35 +1,71 @@
 # AFTER: AWS SDK for Pandas + jaconv to Excel to Glue table
-import pandas as pd
-import jaconv
 import awswrangler as wr
 import logging
 import os
+import sys
+from pathlib import Path
+
+# Shared helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.excel import read_excel
+from common.instrumentation import span, start_tracing
+from common.japanese import TextNormalizer
+from common.parquet_layout import ParquetCompactor, ParquetLayout
 
 # Configure logging for AFTER section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("03_excel_to_glue/wrangler")
 
 # Environment variables
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 GLUE_DATABASE_NAME = os.environ.get('GLUE_DATABASE_NAME', 'company')
+# Normalized strings from earlier runs (empty = don't persist)
+JA_NORMALIZE_CACHE = os.environ.get('JA_NORMALIZE_CACHE', '/tmp/ja_normalize_cache.json')
+# Parquet copies of parsed workbooks, keyed by file content (empty = always parse)
+EXCEL_CACHE_DIR = os.environ.get('EXCEL_CACHE_DIR', '/tmp/excel_cache')
+# "true": after writing, merge the small files each run appends to the department partitions
+COMPACT_SMALL_FILES = os.environ.get('COMPACT_SMALL_FILES', 'false').lower() == 'true'
 
 # Read Excel file with Japanese text data
-df = pd.read_excel("employees.xlsx")
+# Rows are streamed from openpyxl read-only mode in chunks; an unchanged workbook is
+# loaded from its cached Parquet conversion without parsing
+with span("read_excel") as stage:
+    df = read_excel("employees.xlsx", cache_dir=EXCEL_CACHE_DIR or None)
+    stage["rows"] = len(df)
+# The sheet has Japanese headers (名前 / 役職 / 部署)
+df = df.rename(columns={"名前": "name", "役職": "title", "部署": "department"})
 
 # Standardize Japanese text in title and department columns
 # jaconv.z2h() converts full-width characters to half-width (ａ→a, １→1)
 # jaconv.hira2kata() converts hiragana to katakana (ひらがな→カタカナ)
-df[["title", "department"]] = df[["title", "department"]].applymap(lambda x: jaconv.hira2kata(jaconv.z2h(x)))
+# Stray spaces inside the values ("ア ナリス ト") are removed as well
+# Each distinct value is converted once and the results are reused on later runs
+with span("normalize_text"):
+    normalizer = TextNormalizer(cache_path=JA_NORMALIZE_CACHE or None)
+    df = normalizer.normalize_columns(df, ["title", "department"])
+    normalizer.save()
 
 # Write partitioned parquet dataset and auto-register with Glue in one step
 # Automatically handles partitioning, S3 upload, and Glue table registration
-wr.s3.to_parquet(
-    df=df,
-    path=f"s3://{S3_BUCKET_NAME}/employees_clean/",
-    dataset=True,
-    database=GLUE_DATABASE_NAME,
-    table="employees",
-    partition_cols=["department"]
-)
+# Rows are sorted by name; repeated values such as title are dictionary-encoded
+layout = ParquetLayout(sort_by="name")
+with span("write_parquet", rows=len(df)):
+    df = layout.sort_frame(df)
+    wr.s3.to_parquet(
+        df=df,
+        path=f"s3://{S3_BUCKET_NAME}/employees_clean/",
+        dataset=True,
+        database=GLUE_DATABASE_NAME,
+        table="employees",
+        partition_cols=["department"],
+        **layout.wrangler_kwargs(df)
+    )
+
+if COMPACT_SMALL_FILES:
+    # Merge each department's small files into one sorted file, then delete the originals
+    with span("compact"):
+        ParquetCompactor(S3_BUCKET_NAME, "employees_clean", layout=layout).compact()
 
 print(df.head(10))
\ No newline at end of file
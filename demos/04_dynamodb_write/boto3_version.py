@@ -1,65 +1,109 @@
-# BEFORE: Manual individual DynamoDB writes with complex type conversion
-import pandas as pd
-import boto3
-import time
+# BEFORE: Manual DynamoDB type conversion with batched, parallel writes
+import functools
 import logging
 import os
-from botocore.exceptions import ClientError
+import sys
+from pathlib import Path
+
+# Shared MovieLens helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.clients import pooled_client
+from common.csv_reader import ParallelCSVReader
+from common.dynamodb_loader import BulkLoader
+from common.dynamodb_serializer import serialize_items
+from common.dynamodb_sync import DynamoDBSync
+from common.genre_index import refresh_index
+from common.instrumentation import span, start_tracing
+from common.lookup_cache import DEFAULT_DISK_PATH, LookupCache
+from common.movielens import prepare_movies
 
 # Configure logging for BEFORE section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("04_dynamodb_write/boto3_version")
 
 # Environment variables
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'movies')
+# Lookup cache used by demo 05 - invalidated for the items written here
+LOOKUP_CACHE_PATH = os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_DISK_PATH)
+# Genre -> movieId index of the items in this table, used by demo 05's genre search (empty = off)
+GENRE_INDEX_KEY = os.environ.get('GENRE_INDEX_KEY', f'_indexes/dynamodb/{DYNAMODB_TABLE_NAME}_genres.parquet')
+# Optional DynamoDB adjacency table mirroring the index (partition key genre, sort key movieId)
+GENRE_INDEX_TABLE = os.environ.get('GENRE_INDEX_TABLE', '')
+# Processes that fetch and parse movies.csv ranges (default: one per CPU, 1 = in this process)
+CSV_READ_WORKERS = int(os.environ.get('CSV_READ_WORKERS', '0')) or None
+# Change-detecting sync: local = hashes in DYNAMODB_SYNC_STATE_DIR, attribute = content_hash
+# on each item (empty = overwrite every item, the default)
+DYNAMODB_SYNC = os.environ.get('DYNAMODB_SYNC', '')
+DYNAMODB_SYNC_STATE_DIR = os.environ.get('DYNAMODB_SYNC_STATE_DIR', '/tmp/dynamodb_sync')
+# Also delete synced items missing from this run's rows (only for full loads - this demo writes 100 rows)
+DYNAMODB_SYNC_DELETE = os.environ.get('DYNAMODB_SYNC_DELETE', 'false').lower() == 'true'
 
 # Initialize DynamoDB client (not resource) for manual type handling
-dynamodb = boto3.client("dynamodb")
+# The connection pool matches the loader's worker threads (pooled, shared within the process)
+dynamodb = pooled_client("dynamodb", max_pool_connections=8)
 
 # Read movies CSV from S3 and limit to first 100 rows for demo
-df = pd.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv").head(100)
+# The reader fetches line-aligned byte ranges and stops after the range holding row 100,
+# so the rest of the object is never downloaded
+# The transform runs in the workers: clean title and year extracted in one vectorized
+# pass, pipe-separated genres converted to lists for better searchability
+with span("read_csv") as stage:
+    reader = ParallelCSVReader(S3_BUCKET_NAME, "movies.csv", s3_client=pooled_client("s3"),
+                               workers=CSV_READ_WORKERS,
+                               transform=functools.partial(prepare_movies, columns=('title', 'release_year')))
+    df = reader.read(nrows=100)
+    stage["rows"] = len(df)
+
+changes = df[['movieId', 'title', 'release_year', 'genres']]
+delete_keys = []
+deleted = []
+sync = None
+if DYNAMODB_SYNC:
+    # Only write movies whose content changed since the last sync: every row's attributes
+    # are hashed and compared with the previous hashes in one vectorized pass
+    sync = DynamoDBSync(DYNAMODB_TABLE_NAME, ['movieId'], mode=DYNAMODB_SYNC,
+                        state_dir=DYNAMODB_SYNC_STATE_DIR, client=dynamodb)
+    with span("dynamodb_sync_diff", rows=len(changes)) as stage:
+        changes = sync.diff(changes)
+        if DYNAMODB_SYNC_DELETE:
+            deleted = sync.deleted_keys()['movieId'].tolist()
+            delete_keys = [{'movieId': {'S': movie_id}} for movie_id in deleted]
+        stage["changed"] = len(changes)
 
-# Extract year and clean title
-df['release_year'] = df['title'].str.extract(r'\((\d{4})\)')
-df['title'] = df['title'].str.replace(r'\s*\(\d{4}\).*$', '', regex=True)
+# DynamoDB requires explicit type annotations for each field:
+# S=String, N=Number (sent as a string), SS=StringSet
+# serialize_items converts whole columns at once (no iterrows); the type of each column
+# is inferred from its dtype - movieId is the string partition key, so force it to S
+with span("serialize_items", rows=len(changes)):
+    items = serialize_items(changes, types={'movieId': 'S'})
 
-# Convert pipe-separated genres to list for better searchability
-df['genres'] = df['genres'].str.split('|')
+# Batched, parallel writes instead of one put_item call per row
+# - batch_write_item sends 25 items per request from several worker threads
+# - UnprocessedItems and throttling errors are retried with jittered exponential backoff
+# - An AIMD rate limiter backs off on throttling and ramps up while writes succeed
+loader = BulkLoader(table_name=DYNAMODB_TABLE_NAME, client=dynamodb)
+with span("dynamodb_write", rows=len(items) + len(delete_keys)):
+    stats = loader.load(items, delete_keys=delete_keys)
 
-# Manual individual writes with type conversion and error handling
-successful_writes = 0
-failed_writes = 0
+logger.info(f"Completed: {stats.items_written} successful, {stats.items_failed} failed "
+            f"({stats.items_per_second:.0f} items/s, {stats.consumed_wcu:.0f} WCU consumed)")
 
-for _, row in df.iterrows():
-    try:
-        # Manual DynamoDB type conversion - required for each field
-        # DynamoDB requires explicit type annotations: S=String, N=Number, SS=StringSet
-        item = {
-            'movieId': {'S': str(row['movieId'])},           # String type
-            'title': {'S': str(row['title'])},               # String type  
-            'release_year': {'N': str(row['release_year'])}, # Number type (as string)
-            'genres': {'SS': row['genres']}                  # String Set type
-        }
-        
-        # Individual put_item call - no batching optimization
-        dynamodb.put_item(
-            TableName=DYNAMODB_TABLE_NAME,
-            Item=item
-        )
-        successful_writes += 1
-        
-        # Rate limiting to avoid throttling - manual delay between writes
-        time.sleep(0.01)  # 10ms delay between writes
-        
-    except ClientError as e:
-        failed_writes += 1
-        if e.response['Error']['Code'] == 'ProvisionedThroughputExceededException':
-            time.sleep(1)  # Back off on throttling
-        logger.error(f"Failed to write item {row['movieId']}: {e}")
-    except Exception as e:
-        failed_writes += 1
-        logger.error(f"Unexpected error for item {row['movieId']}: {e}")
+if sync:
+    # Record the new hashes only after every write went through, so failed items are retried next run
+    if not stats.items_failed:
+        sync.commit(drop_missing=DYNAMODB_SYNC_DELETE)
+    logger.info(f"DynamoDB sync: {sync.stats.summary()}")
 
-logger.info(f"Completed: {successful_writes} successful, {failed_writes} failed")
+# Drop the rewritten movies from demo 05's lookup cache so it doesn't serve stale items
+LookupCache(namespace=DYNAMODB_TABLE_NAME, disk_path=LOOKUP_CACHE_PATH or None).invalidate(
+    list(changes['movieId']) + deleted)
 
+if GENRE_INDEX_KEY:
+    # Keep the genre index in step with the items just written: only these movies'
+    # memberships are recomputed, and only changed ones reach the adjacency table
+    with span("genre_index", rows=len(df)):
+        refresh_index(df, S3_BUCKET_NAME, GENRE_INDEX_KEY, removed=deleted,
+                      adjacency_table=GENRE_INDEX_TABLE or None)
@@ -2,24 +2,64 @@
 import awswrangler as wr
 import logging
 import os
+import sys
+from pathlib import Path
+
+# Shared MovieLens helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.dynamodb_sync import DynamoDBSync
+from common.instrumentation import span, start_tracing
+from common.genre_index import refresh_index
+from common.movielens import parse_titles
+from common.lookup_cache import DEFAULT_DISK_PATH, LookupCache
 
 # Configure logging for AFTER section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("04_dynamodb_write/wrangler")
 
 # Environment variables
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'movies')
+# Lookup cache used by demo 05 - invalidated for the items written here
+LOOKUP_CACHE_PATH = os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_DISK_PATH)
+# Genre -> movieId index of the items in this table, used by demo 05's genre search (empty = off)
+GENRE_INDEX_KEY = os.environ.get('GENRE_INDEX_KEY', f'_indexes/dynamodb/{DYNAMODB_TABLE_NAME}_genres.parquet')
+# Optional DynamoDB adjacency table mirroring the index (partition key genre, sort key movieId)
+GENRE_INDEX_TABLE = os.environ.get('GENRE_INDEX_TABLE', '')
+# Change-detecting sync: local = hashes in DYNAMODB_SYNC_STATE_DIR, attribute = content_hash
+# on each item (empty = overwrite every item, the default)
+DYNAMODB_SYNC = os.environ.get('DYNAMODB_SYNC', '')
+DYNAMODB_SYNC_STATE_DIR = os.environ.get('DYNAMODB_SYNC_STATE_DIR', '/tmp/dynamodb_sync')
+# Also delete synced items missing from this run's rows (only for full loads - this demo writes 1000 rows)
+DYNAMODB_SYNC_DELETE = os.environ.get('DYNAMODB_SYNC_DELETE', 'false').lower() == 'true'
 
 # Read movies CSV from S3 and limit to first 1000 rows
-df = wr.s3.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv").head(1000)
+with span("read_csv"):
+    df = wr.s3.read_csv(f"s3://{S3_BUCKET_NAME}/movies.csv").head(1000)
+
+with span("transform", rows=len(df)):
+    # Extract year and clean title in one vectorized pass
+    df[['title', 'release_year']] = parse_titles(df['title'])[['title', 'release_year']]
+
+    # Convert pipe-separated genres to list for better searchability
+    df['genres'] = df['genres'].str.split('|')
 
-# Extract year and clean title
-df['release_year'] = df['title'].str.extract(r'\((\d{4})\)')
-df['title'] = df['title'].str.replace(r'\s*\(\d{4}\).*$', '', regex=True)
+    # movieId is the table's string partition key (AttributeType S)
+    df['movieId'] = df['movieId'].astype(str)
 
-# Convert pipe-separated genres to list for better searchability
-df['genres'] = df['genres'].str.split('|')
+changes = df
+deleted = []
+sync = None
+if DYNAMODB_SYNC:
+    # Only write movies whose content changed since the last sync (hash diff of every row)
+    sync = DynamoDBSync(DYNAMODB_TABLE_NAME, ['movieId'], mode=DYNAMODB_SYNC, state_dir=DYNAMODB_SYNC_STATE_DIR)
+    with span("dynamodb_sync_diff", rows=len(df)) as stage:
+        changes = sync.diff(df)
+        if DYNAMODB_SYNC_DELETE:
+            deleted = sync.deleted_keys()['movieId'].tolist()
+        stage["changed"] = len(changes)
 
 # Write entire dataframe to DynamoDB in one operation
 # Automatically handles all the complexity:
@@ -27,7 +67,30 @@ df['genres'] = df['genres'].str.split('|')
 # - Error handling and retries
 # - Data type conversions
 # - Rate limiting
-wr.dynamodb.put_df(
-    df=df,
-    table_name=DYNAMODB_TABLE_NAME
-)
\ No newline at end of file
+with span("dynamodb_write", rows=len(changes) + len(deleted)):
+    if len(changes):
+        wr.dynamodb.put_df(
+            df=changes,
+            table_name=DYNAMODB_TABLE_NAME
+        )
+    if deleted:
+        wr.dynamodb.delete_items(
+            items=[{'movieId': movie_id} for movie_id in deleted],
+            table_name=DYNAMODB_TABLE_NAME
+        )
+
+if sync:
+    # put_df raises if a write fails, so reaching here means every change is in the table
+    sync.commit(drop_missing=DYNAMODB_SYNC_DELETE)
+    logger.info(f"DynamoDB sync: {sync.stats.summary()}")
+
+# Drop the rewritten movies from demo 05's lookup cache so it doesn't serve stale items
+LookupCache(namespace=DYNAMODB_TABLE_NAME, disk_path=LOOKUP_CACHE_PATH or None).invalidate(
+    list(changes['movieId']) + deleted)
+
+if GENRE_INDEX_KEY:
+    # Keep the genre index in step with the items just written: only these movies'
+    # memberships are recomputed, and only changed ones reach the adjacency table
+    with span("genre_index", rows=len(df)):
+        refresh_index(df, S3_BUCKET_NAME, GENRE_INDEX_KEY, removed=deleted,
+                      adjacency_table=GENRE_INDEX_TABLE or None)
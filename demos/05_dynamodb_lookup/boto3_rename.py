@@ -1,64 +1,59 @@
 # BEFORE: Batch get movies from DynamoDB with boto3
-import boto3
-import pandas as pd
 import logging
+import os
+import sys
+from pathlib import Path
+
+# Shared helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.clients import pooled_client
+from common.dynamodb_lookup import BatchGetEngine
+from common.instrumentation import span, start_tracing
+from common.lookup_cache import DEFAULT_DISK_PATH, CachedTable, LookupCache
 
 # Configure logging for BEFORE section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("05_dynamodb_lookup/boto3_rename")
 
 # env variables
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'demo-table-name-changeme')
+# On-disk lookup cache shared between runs (set to an empty string to keep it in memory only)
+LOOKUP_CACHE_PATH = os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_DISK_PATH)
 
-# Initialize DynamoDB client
-dynamodb = boto3.client("dynamodb")
+# Initialize DynamoDB client (shared with other demos run in the same process)
+dynamodb = pooled_client("dynamodb")
 
 # Define specific movie IDs to lookup
 movie_ids = ["1", "2", "3", "10", "32"]
 
-# Format keys with DynamoDB type annotations
-# DynamoDB requires explicit type specification: {'S': string, 'N': number, etc.}
-keys = [{"movieid": {"S": movie_id}} for movie_id in movie_ids]
-
-# Perform batch get operation with multiple parameters
-# batch_get_item limitations:
-# - Maximum 100 items per request
-# - Must specify table name in RequestItems
-# - Keys must include DynamoDB type annotations
+# batch_get_item limitations handled by the lookup engine:
+# - Maximum 100 items per request: keys are deduplicated and split into 100-key requests
+#   that run concurrently, so 200k IDs are no problem
+# - Keys need DynamoDB type annotations: movieId is the string partition key ({'S': ...})
+# - UnprocessedKeys (throttling) are retried with backoff instead of silently dropped
 # - ProjectionExpression limits returned attributes
-response = dynamodb.batch_get_item(
-    RequestItems={
-        DYNAMODB_TABLE_NAME: {
-            "Keys": keys,
-            "ProjectionExpression": "movieid, title, genres",
-            "ConsistentRead": False  # Eventually consistent by default
-        }
-    }
+engine = BatchGetEngine(
+    table_name=DYNAMODB_TABLE_NAME,
+    key_name="movieId",
+    key_type="S",
+    client=dynamodb,
+    projection=["movieId", "title", "genres"],
+    consistent_read=False  # Eventually consistent by default
 )
 
-# Handle potential unprocessed keys (if throttling occurs)
-if 'UnprocessedKeys' in response and response['UnprocessedKeys']:
-    logger.info(f"Warning: {len(response['UnprocessedKeys'])} items were not processed")
-
-# Extract items from nested response structure
-items = response["Responses"][DYNAMODB_TABLE_NAME]
-results = []
-
-# Manually convert each item from DynamoDB format to regular Python dict
-for item in items:
-    # DynamoDB returns data with type descriptors: {'S': 'value', 'N': '123'}
-    # Must manually extract the actual values from type wrappers
-    movie = {
-        'movieid': item['movieid']['S'],  # String type
-        'title': item['title']['S'],      # String type
-        'genres': item['genres']['S']     # String type
-    }
-    results.append(movie)
-
-# Manually create DataFrame from processed results
-df = pd.DataFrame(results)
+# Read-through cache: only keys missing from the in-process LRU / on-disk tier reach DynamoDB
+# Responses are decoded straight into DataFrame columns
+# (no per-item dict list + pd.DataFrame(results))
+# The cached items only hold the projected attributes, so they get their own namespace variant
+cache = LookupCache(namespace=f"{DYNAMODB_TABLE_NAME}#{','.join(engine.projection)}", ttl=300,
+                    disk_path=LOOKUP_CACHE_PATH or None)
+with span("dynamodb_lookup", keys=len(movie_ids)):
+    df = CachedTable(fetch=engine.get, key_name="movieId", cache=cache).get(movie_ids)
+logger.info(f"Lookup cache stats: {cache.stats()}")
 
 # Export DataFrame to parquet file on S3
-df.to_parquet(f"s3://{S3_BUCKET_NAME}/movie_lookup_results.parquet")
-
+with span("write_parquet", rows=len(df)):
+    df.to_parquet(f"s3://{S3_BUCKET_NAME}/movie_lookup_results.parquet")
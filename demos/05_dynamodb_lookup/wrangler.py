@@ -3,20 +3,38 @@ import awswrangler as wr
 from datetime import datetime
 import logging
 import os
+import sys
+from pathlib import Path
+
+# Shared helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.genre_index import GenreAdjacencyTable, GenreIndex
+from common.instrumentation import span, start_tracing
+from common.lookup_cache import DEFAULT_DISK_PATH, CachedTable, LookupCache
 
 # Configure logging for AFTER section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("05_dynamodb_lookup/wrangler")
 
 # env variables
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'table-name-changeme')
+# On-disk lookup cache shared between runs (set to an empty string to keep it in memory only)
+LOOKUP_CACHE_PATH = os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_DISK_PATH)
+# Genre -> movieId index written by demo 04, used by the genre search (empty = off, like in demo 04)
+GENRE_INDEX_KEY = os.environ.get('GENRE_INDEX_KEY', f'_indexes/dynamodb/{DYNAMODB_TABLE_NAME}_genres.parquet')
+# Query demo 04's DynamoDB adjacency table instead of the Parquet index
+GENRE_INDEX_TABLE = os.environ.get('GENRE_INDEX_TABLE', '')
 
 # Define same movie IDs to lookup
 movie_ids = ["1", "2", "3", "10", "32"]
 
-# Create keys in simple format - no DynamoDB type annotations needed
-keys = [{"movieid": movie_id} for movie_id in movie_ids]
+# Read-through cache in front of DynamoDB: hot movie IDs are served from an in-process
+# LRU (5 minute TTL) or the on-disk tier, and only the missing keys are fetched.
+# Demo 04/06 writers invalidate the cache for the items they overwrite.
+cache = LookupCache(namespace=DYNAMODB_TABLE_NAME, ttl=300, disk_path=LOOKUP_CACHE_PATH or None)
 
 # Single function call handles all complexity automatically:
 # - DynamoDB type annotations
@@ -24,26 +42,56 @@ keys = [{"movieid": movie_id} for movie_id in movie_ids]
 # - Unprocessed key handling and retries
 # - Type conversion from DynamoDB format
 # - DataFrame creation and optimization
-# Note: DynamoDB excels at key-based lookups like this, but would be inefficient for genre searches (requires expensive table scan). 
+# Note: DynamoDB excels at key-based lookups like this, but a genre search would need an
+# expensive table scan - see the genre index below, which turns it into key lookups.
 # Use Athena/Redshift Spectrum for analytical queries.
-df = wr.dynamodb.get_items(
-    table_name=DYNAMODB_TABLE_NAME,
-    keys=keys
+movies = CachedTable(
+    fetch=lambda ids: wr.dynamodb.read_items(table_name=DYNAMODB_TABLE_NAME, partition_values=ids),
+    key_name="movieId",
+    cache=cache
 )
+with span("dynamodb_lookup", keys=len(movie_ids)):
+    df = movies.get(movie_ids)
+logger.info(f"Lookup cache stats: {cache.stats()}")
 
 # Fun data analysis: Calculate movie age and genre diversity
-current_year = datetime.now().year
-df['movie_age'] = current_year - df['year'].astype(int)
-df['genre_count'] = df['genres'].apply(len)
-df['age_category'] = df['movie_age'].apply(lambda x: 'Classic' if x > 25 else 'Modern')
+# None of the IDs in the table: df has no columns to analyze
+if df.empty:
+    logger.warning(f"None of the {len(movie_ids)} movie IDs are in {DYNAMODB_TABLE_NAME}, skipping the analysis")
+else:
+    current_year = datetime.now().year
+    df['movie_age'] = current_year - df['release_year'].astype(int)
+    df['genre_count'] = df['genres'].apply(len)
+    df['age_category'] = df['movie_age'].apply(lambda x: 'Classic' if x > 25 else 'Modern')
+
+    # Display insights
+    logger.info(f"Average movie age: {df['movie_age'].mean():.1f} years")
+    logger.info(f"Average genres per movie: {df['genre_count'].mean():.1f}")
+    logger.info(f"Classic movies (25+ years): {(df['age_category'] == 'Classic').sum()}/{len(df)}")
 
-# Display insights
-logger.info(f"Average movie age: {df['movie_age'].mean():.1f} years")
-logger.info(f"Average genres per movie: {df['genre_count'].mean():.1f}")
-logger.info(f"Classic movies (25+ years): {(df['age_category'] == 'Classic').sum()}/{len(df)}")
+# Genre search without a scan: demo 04 maintains a genre -> movieId index, so
+# "Action AND Comedy" is an intersection of two sorted id arrays (milliseconds),
+# and only the matching movies are fetched - through the same cached lookup
+if GENRE_INDEX_TABLE or GENRE_INDEX_KEY:
+    if GENRE_INDEX_TABLE:
+        genre_index = GenreAdjacencyTable(GENRE_INDEX_TABLE)
+    else:
+        genre_index = GenreIndex.load(S3_BUCKET_NAME, GENRE_INDEX_KEY)
+    with span("genre_lookup") as stage:
+        action_comedies = genre_index.query(all_of=["Action", "Comedy"], none_of=["Romance"])
+        stage["matches"] = len(action_comedies)
+    logger.info(f"Genre index: {len(action_comedies)} Action+Comedy movies without Romance")
+    if len(action_comedies):
+        with span("dynamodb_lookup", keys=min(len(action_comedies), 10)):
+            sample = movies.get(action_comedies[:10].astype(str))
+        if len(sample):
+            logger.info(f"Examples: {', '.join(sample['title'].astype(str))}")
+else:
+    logger.info("Genre index disabled (GENRE_INDEX_KEY is empty), skipping the genre search")
 
 # Export DataFrame to parquet file on S3
-wr.s3.to_parquet(
-    df=df,
-    path=f"s3://{S3_BUCKET_NAME}/movie_lookup_results.parquet"
-)
\ No newline at end of file
+with span("write_parquet", rows=len(df)):
+    wr.s3.to_parquet(
+        df=df,
+        path=f"s3://{S3_BUCKET_NAME}/movie_lookup_results.parquet"
+    )
\ No newline at end of file
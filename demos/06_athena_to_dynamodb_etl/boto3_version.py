@@ -1,28 +1,61 @@
 # BEFORE: Manual Athena query execution + DynamoDB writes
 # Requires: Query execution, polling, result retrieval, data transformation
-import boto3
-import pandas as pd
-import time
+import asyncio
 import logging
 import os
+import sys
+from pathlib import Path
+
+# Shared helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.athena_runner import AsyncAthenaRunner
+from common.clients import pooled_client
+from common.dynamodb_loader import BulkLoader
+from common.dynamodb_serializer import serialize_items
+from common.dynamodb_sync import DynamoDBSync
+from common.genre_index import GenreIndex
+from common.instrumentation import span, start_tracing
+from common.lookup_cache import DEFAULT_DISK_PATH, LookupCache
 
 # Configure logging for BEFORE section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("06_athena_to_dynamodb_etl/boto3_version")
 
 # Environment variables - AWS resource identifiers
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 GLUE_DATABASE_NAME = os.environ.get('GLUE_DATABASE_NAME', 'movielens')
 ATHENA_RESULT_LOCATION = os.environ.get('ATHENA_RESULT_LOCATION')
+# parquet: UNLOAD results to Parquet (genres stays an array, release_year an integer); csv: Athena's CSV file
+ATHENA_RESULT_FORMAT = os.environ.get('ATHENA_RESULT_FORMAT', 'parquet')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'top-movies')
+# Genre index written by demo 01; empty string filters with contains() instead
+MOVIES_GENRE_INDEX_KEY = os.environ.get('MOVIES_GENRE_INDEX_KEY', '_indexes/movies_genres.parquet')
+# Lookup cache used by demo 05 - invalidated for the items written here
+LOOKUP_CACHE_PATH = os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_DISK_PATH)
+# Change-detecting sync: local = hashes in DYNAMODB_SYNC_STATE_DIR, attribute = content_hash
+# on each item (empty = overwrite every item, the default)
+DYNAMODB_SYNC = os.environ.get('DYNAMODB_SYNC', '')
+DYNAMODB_SYNC_STATE_DIR = os.environ.get('DYNAMODB_SYNC_STATE_DIR', '/tmp/dynamodb_sync')
+# Also delete synced items that the query no longer returns
+DYNAMODB_SYNC_DELETE = os.environ.get('DYNAMODB_SYNC_DELETE', 'false').lower() == 'true'
 
-# Initialize AWS clients - separate clients for each service
-athena_client = boto3.client("athena")  # For query execution
-dynamodb_resource = boto3.resource("dynamodb")  # For batch writes
+# Initialize AWS clients - separate clients for each service, taken from the process-wide pool
+athena_client = pooled_client("athena")  # For query execution
+dynamodb_client = pooled_client("dynamodb")  # For batch writes
 
 # Step 1: Execute analytical query in Athena
 # Find movies by popular genres for fast operational lookups
-query = """
+# The genre index (demo 01) yields the first 1000 matching movieIds, so Athena filters
+# on movieId instead of searching every genres array; without an index, use contains()
+genre_ids = GenreIndex.load(S3_BUCKET_NAME, MOVIES_GENRE_INDEX_KEY, s3_client=pooled_client("s3")).query(
+    any_of=['Action', 'Comedy', 'Drama'])[:1000] if MOVIES_GENRE_INDEX_KEY else []
+if len(genre_ids):
+    genre_filter = f"movieId IN ({', '.join(map(str, genre_ids.tolist()))})"
+else:
+    genre_filter = "contains(genres, 'Action') OR contains(genres, 'Comedy') OR contains(genres, 'Drama')"
+query = f"""
 SELECT 
     movieId,
     title,
@@ -33,56 +66,53 @@ SELECT
         ELSE 'Classic'
     END as era
 FROM movies 
-WHERE contains(genres, 'Action') 
-   OR contains(genres, 'Comedy') 
-   OR contains(genres, 'Drama')
+WHERE {genre_filter}
 LIMIT 1000
 """
 
-# Execute query and wait for completion - manual async handling
-response = athena_client.start_query_execution(
-    QueryString=query,
-    QueryExecutionContext={"Database": GLUE_DATABASE_NAME},
-    ResultConfiguration={"OutputLocation": ATHENA_RESULT_LOCATION}
-)
-
-query_id = response["QueryExecutionId"]
+# Execute query and wait for completion
+# The runner polls from 0.2s backing off to 5s (no fixed 2s sleeps), raises
+# AthenaQueryError if the query fails, and loads the result from S3
+runner = AsyncAthenaRunner(GLUE_DATABASE_NAME, ATHENA_RESULT_LOCATION, client=athena_client,
+                           result_format=ATHENA_RESULT_FORMAT)
+with span("athena_query", result_format=ATHENA_RESULT_FORMAT) as stage:
+    result_df = asyncio.run(runner.run(query))
+    stage["rows"] = len(result_df)
 
-# Poll for completion - manual status checking with sleep intervals
-while True:
-    execution_details = athena_client.get_query_execution(QueryExecutionId=query_id)
-    state = execution_details["QueryExecution"]["Status"]["State"]
-    if state in ["SUCCEEDED", "FAILED", "CANCELLED"]:
-        break
-    time.sleep(2)  # Wait 2 seconds between status checks
+# Build the table keys: partition by era, sort by release year then movieid
+# (Athena returns lower-case column names)
+with span("transform", rows=len(result_df)):
+    result_df['pk'] = result_df['era']  # Partition key for query efficiency
+    result_df['sk'] = result_df['release_year'].astype(str) + '#' + result_df['movieid'].astype(str)  # Sort key for range queries
 
-if state != "SUCCEEDED":
-    raise Exception(f"Query failed with state: {state}")
+    changes = result_df[['pk', 'sk', 'title', 'release_year', 'genres', 'era']]
+    delete_keys = []
+    sync = None
+    if DYNAMODB_SYNC:
+        # Skip the movies whose item content is unchanged since the last sync
+        sync = DynamoDBSync(DYNAMODB_TABLE_NAME, ['pk', 'sk'], mode=DYNAMODB_SYNC,
+                            state_dir=DYNAMODB_SYNC_STATE_DIR, client=dynamodb_client)
+        changes = sync.diff(changes)
+        if DYNAMODB_SYNC_DELETE:
+            delete_keys = serialize_items(sync.deleted_keys())
 
-# Load results from S3 - manual CSV retrieval
-# Athena stores results as CSV files in S3
-result_df = pd.read_csv(f"{ATHENA_RESULT_LOCATION.rstrip('/')}/{query_id}.csv")
+    # Convert to DynamoDB wire format column by column (no iterrows / per-cell int() calls)
+    items = serialize_items(changes)
 
-# Write to DynamoDB with manual batch operations
-# Requires manual type conversion and batch management
-table = dynamodb_resource.Table(DYNAMODB_TABLE_NAME)
+# Write in parallel 25-item batches with retries for unprocessed items
+with span("dynamodb_write", rows=len(items) + len(delete_keys)):
+    stats = BulkLoader(table_name=DYNAMODB_TABLE_NAME, client=dynamodb_client).load(items, delete_keys=delete_keys)
 
-try:
-    with table.batch_writer() as batch:  # Handles batching automatically
-        for _, row in result_df.iterrows():
-            # Convert to DynamoDB item format - manual type conversion required
-            item = {
-                'pk': row['pk'],  # Partition key for query efficiency
-                'sk': row['movie_key'],  # Sort key for range queries
-                'title': row['title'],
-                'release_year': int(row['release_year']),  # Must convert to int
-                'genres': row['genres'],
-                'era': row['era']
-            }
-            batch.put_item(Item=item)
-    
-    logger.info(f"Successfully loaded {len(result_df)} movies to DynamoDB")
-    
-except Exception as e:
-    logger.error(f"Error writing to DynamoDB: {e}")
+if stats.items_failed:
+    logger.error(f"Failed to write {stats.items_failed} of {len(items) + len(delete_keys)} changes to DynamoDB")
+else:
+    logger.info(f"Successfully loaded {stats.items_written} movies to DynamoDB ({stats.items_per_second:.0f} items/s)")
+    if sync:
+        # The new hashes are recorded only when every write succeeded
+        sync.commit(drop_missing=DYNAMODB_SYNC_DELETE)
+if sync:
+    logger.info(f"DynamoDB sync: {sync.stats.summary()}")
 
+if stats.items_written:
+    # Items in this table were rewritten - clear its lookup cache entries
+    LookupCache(namespace=DYNAMODB_TABLE_NAME, disk_path=LOOKUP_CACHE_PATH or None).clear()
@@ -1,48 +1,151 @@
 # AFTER: Streamlined ETL with awswrangler
 # Simplifies: Query execution, result handling, and DynamoDB writes
 import awswrangler as wr
+import boto3
 import logging
+import numpy as np
 import os
+import sys
+import threading
+from pathlib import Path
+
+# Shared helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.athena_cache import AthenaResultCache
+from common.dynamodb_sync import DynamoDBSync
+from common.etl_pipeline import Checkpoint, ChunkPipeline
+from common.genre_index import GenreIndex
+from common.instrumentation import span, start_tracing
+from common.lookup_cache import DEFAULT_DISK_PATH, LookupCache
 
 # Configure logging for AFTER section
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Opt-in stage timings and AWS call statistics (DEMO_TRACE_PATH / DEMO_TRACE_OTEL)
+start_tracing("06_athena_to_dynamodb_etl/wrangler")
 
 # Environment variables - same resources, simpler usage
+S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME', 'demo-bucket-changeme')
 GLUE_DATABASE_NAME = os.environ.get('GLUE_DATABASE_NAME', 'movielens')
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'top-movies')
+# Genre index written by demo 01; empty string filters with contains() instead
+MOVIES_GENRE_INDEX_KEY = os.environ.get('MOVIES_GENRE_INDEX_KEY', '_indexes/movies_genres.parquet')
+# Lookup cache used by demo 05 - invalidated for the items written here
+LOOKUP_CACHE_PATH = os.environ.get('LOOKUP_CACHE_PATH', DEFAULT_DISK_PATH)
+# Local Athena result cache: reruns skip the query until the movies table changes (empty = disabled)
+ATHENA_CACHE_DIR = os.environ.get('ATHENA_CACHE_DIR', '/tmp/athena_cache')
+# Pipeline tuning: rows per chunk, concurrent DynamoDB writers, chunks buffered between stages
+ETL_CHUNK_SIZE = int(os.environ.get('ETL_CHUNK_SIZE', '250'))
+ETL_WRITERS = int(os.environ.get('ETL_WRITERS', '4'))
+ETL_QUEUE_SIZE = int(os.environ.get('ETL_QUEUE_SIZE', '4'))
+# Chunks written so far - a failed run resumes from here instead of starting over
+ETL_CHECKPOINT_PATH = os.environ.get('ETL_CHECKPOINT_PATH', '/tmp/athena_to_dynamodb.checkpoint.json')
+# Change-detecting sync: local = hashes in DYNAMODB_SYNC_STATE_DIR, attribute = content_hash
+# on each item (empty = overwrite every item, the default)
+DYNAMODB_SYNC = os.environ.get('DYNAMODB_SYNC', '')
+DYNAMODB_SYNC_STATE_DIR = os.environ.get('DYNAMODB_SYNC_STATE_DIR', '/tmp/dynamodb_sync')
+# Also delete synced items that the query no longer returns
+DYNAMODB_SYNC_DELETE = os.environ.get('DYNAMODB_SYNC_DELETE', 'false').lower() == 'true'
 
-# Step 1: Execute analytical query and get results directly
-# Same SQL query as BEFORE section (with comma fix)
-query = """
+# Step 1: Analytical query, fetched in chunks
+# Same filter as the BEFORE section; the era column is derived in the transform stage
+# The genre index picks the first 1000 matching movieIds, so Athena filters on movieId
+# instead of reading and searching every genres array (no index yet: contains())
+genre_ids = GenreIndex.load(S3_BUCKET_NAME, MOVIES_GENRE_INDEX_KEY).query(
+    any_of=['Action', 'Comedy', 'Drama'])[:1000] if MOVIES_GENRE_INDEX_KEY else []
+if len(genre_ids):
+    genre_filter = f"movieId IN ({', '.join(map(str, genre_ids.tolist()))})"
+else:
+    genre_filter = "contains(genres, 'Action') OR contains(genres, 'Comedy') OR contains(genres, 'Drama')"
+query = f"""
 SELECT 
     movieId,
     title,
     release_year,
-    genres,
-    CASE 
-        WHEN release_year >= 2000 THEN 'Modern'
-        ELSE 'Classic'
-    END as era
+    genres
 FROM movies 
-WHERE contains(genres, 'Action') 
-   OR contains(genres, 'Comedy') 
-   OR contains(genres, 'Drama')
+WHERE {genre_filter}
 LIMIT 1000
 """
 
-# Single function call handles query execution, polling, and result retrieval
-# Automatically manages: async execution, status polling, S3 result retrieval
-result_df = wr.athena.read_sql_query(
-    sql=query,
-    database=GLUE_DATABASE_NAME
-)
-
-# Step 2: Write to DynamoDB in one operation
-# Automatically handles: batching, retries, type conversions, error handling
-wr.dynamodb.put_df(
-    df=result_df,
-    table_name=DYNAMODB_TABLE_NAME
-)
-
-logger.info(f"ETL completed: {len(result_df)} movies transferred from Athena to DynamoDB")
\ No newline at end of file
+checkpoint = Checkpoint(ETL_CHECKPOINT_PATH, key=f"{GLUE_DATABASE_NAME}/{DYNAMODB_TABLE_NAME}/{query}")
+
+# On resume, reuse the failed run's Athena results so chunk N is the same rows as before
+cache_settings = {"max_cache_seconds": 86_400} if checkpoint.resuming else None
+
+
+def run_query():
+    # chunksize returns an iterator: chunks are read from S3 as the pipeline asks for them
+    return wr.athena.read_sql_query(
+        sql=query,
+        database=GLUE_DATABASE_NAME,
+        chunksize=ETL_CHUNK_SIZE,
+        athena_cache_settings=cache_settings,
+    )
+
+
+if ATHENA_CACHE_DIR:
+    # Still streamed: a hit reads the local Parquet chunk by chunk, a miss streams from
+    # Athena and appends each chunk to the cache as it passes through
+    chunks = AthenaResultCache(ATHENA_CACHE_DIR).iter_sql_query(query, GLUE_DATABASE_NAME, run=run_query,
+                                                               chunksize=ETL_CHUNK_SIZE)
+else:
+    chunks = run_query()
+
+
+# Step 2: Transform - era derivation and the table key
+def transform(chunk):
+    with span("transform", rows=len(chunk)):
+        chunk = chunk.copy()
+        # NULL years count as Classic, like CASE WHEN release_year >= 2000 in SQL
+        chunk['era'] = np.where(chunk['release_year'].fillna(0) >= 2000, 'Modern', 'Classic')
+        # Athena lower-cases column names; the table's partition key is the string movieId
+        chunk['movieId'] = chunk.pop('movieid').astype(str)
+    if sync:
+        # Keep only new or changed movies; unchanged ones never reach the writers
+        with span("dynamodb_sync_diff", rows=len(chunk)):
+            chunk = sync.diff(chunk)
+    return chunk
+
+
+# Step 3: Write - each writer thread gets its own boto3 session (sessions aren't thread-safe)
+sessions = threading.local()
+
+
+def write(chunk):
+    if not len(chunk):
+        return
+    if not hasattr(sessions, 'session'):
+        sessions.session = boto3.Session()
+    with span("dynamodb_write", rows=len(chunk)):
+        wr.dynamodb.put_df(df=chunk, table_name=DYNAMODB_TABLE_NAME, boto3_session=sessions.session)
+
+
+# Diffed in the transform stage (one thread); hashes are committed after the pipeline succeeds
+sync = DynamoDBSync(DYNAMODB_TABLE_NAME, ['movieId'], mode=DYNAMODB_SYNC,
+                    state_dir=DYNAMODB_SYNC_STATE_DIR) if DYNAMODB_SYNC else None
+# Chunks skipped on resume are never diffed, so their keys would look deleted
+resuming = checkpoint.resuming
+
+# Fetch, transform and write overlap; bounded queues apply backpressure to the fetch
+pipeline = ChunkPipeline(transform, write, writers=ETL_WRITERS, queue_size=ETL_QUEUE_SIZE, checkpoint=checkpoint)
+with span("etl_pipeline"):
+    metrics = pipeline.run(chunks)
+
+logger.info(f"ETL completed: {metrics['write'].rows} movies transferred from Athena to DynamoDB")
+
+deleted = []
+if sync:
+    if DYNAMODB_SYNC_DELETE and resuming:
+        logger.info("Resumed run: skipping deletes until a full run has diffed every chunk")
+    elif DYNAMODB_SYNC_DELETE:
+        deleted = sync.deleted_keys().to_dict('records')
+        if deleted:
+            with span("dynamodb_delete", rows=len(deleted)):
+                wr.dynamodb.delete_items(items=deleted, table_name=DYNAMODB_TABLE_NAME)
+    sync.commit(drop_missing=DYNAMODB_SYNC_DELETE and not resuming)
+    logger.info(f"DynamoDB sync: {sync.stats.summary()}")
+
+if metrics['write'].rows or deleted:
+    # Items in this table were rewritten - clear its lookup cache entries
+    LookupCache(namespace=DYNAMODB_TABLE_NAME, disk_path=LOOKUP_CACHE_PATH or None).clear()
@@ -0,0 +1,2 @@
+# Shared helpers used by several demos
+# Demo scripts add the demos/ directory to sys.path and import from here
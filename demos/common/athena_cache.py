@@ -0,0 +1,215 @@
+# Client-side Athena result cache keyed by normalized SQL, database and table snapshot
+import hashlib
+import json
+import logging
+import re
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+# Table references after FROM / JOIN, optionally qualified and quoted: movies, db.movies, "db"."movies"
+_TABLE_REF = re.compile(r'\b(?:from|join)\s+((?:"[^"]+"|[\w-]+)(?:\.(?:"[^"]+"|[\w-]+))?)')
+_CTE_NAME = re.compile(r'(?:\bwith|,)\s+([\w-]+)\s+as\s*\(')
+
+
+def normalize_sql(sql):
+    """Drop comments, collapse whitespace and lower-case everything outside string literals.
+
+    Two queries that differ only in formatting produce the same text; literals such
+    as 'Action' keep their case because contains() and = are case-sensitive.
+    """
+    sql = re.sub(r'--[^\n]*', ' ', sql)
+    sql = re.sub(r'/\*.*?\*/', ' ', sql, flags=re.S)
+    parts = re.split(r"('(?:[^']|'')*')", sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'\s+', ' ', parts[i]).lower()
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+def _to_frame(data):
+    # Arrow table/batch -> DataFrame with array columns (genres) as Python lists, the way
+    # awswrangler returns them (numpy arrays would break e.g. wr.dynamodb.put_df)
+    df = data.to_pandas()
+    for field in data.schema:
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+            df[field.name] = data.column(field.name).to_pylist()
+    return df
+
+
+def referenced_tables(sql, database):
+    """Return (database, table) pairs a normalized query reads from (CTE names excluded)."""
+    ctes = set(_CTE_NAME.findall(sql))
+    tables = set()
+    for ref in _TABLE_REF.findall(sql):
+        names = [name.strip('"') for name in ref.split('.')]
+        if len(names) == 1:
+            if names[0] in ctes:
+                continue
+            names = [database, names[0]]
+        tables.add(tuple(names))
+    return sorted(tables)
+
+
+class AthenaResultCache:
+    """Serve repeated Athena queries from local Parquet files while the data is unchanged.
+
+    The cache key covers the normalized SQL, the database and a fingerprint of every
+    table the query reads:
+    - fingerprint="s3": ETag and size of every object under the table location
+      (catches files rewritten in place, e.g. wr.s3.to_parquet(mode="overwrite"))
+    - fingerprint="glue": table UpdateTime plus partition metadata (no S3 listing)
+    When `movies` is rewritten its fingerprint changes, so the next run misses and
+    re-queries Athena. Entries record the original latency and bytes scanned, so
+    every hit reports what it saved.
+    """
+
+    def __init__(self, cache_dir, fingerprint="s3", glue_client=None, s3_client=None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+        self.glue = glue_client or pooled_client("glue")
+        self.s3 = s3_client or pooled_client("s3")
+        self.saved_seconds = 0.0
+        self.saved_bytes = 0
+
+    def _s3_fingerprint(self, location, digest):
+        bucket, _, prefix = location.removeprefix("s3://").partition("/")
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                digest.update(f"{obj['Key']}|{obj['ETag']}|{obj['Size']}\n".encode())
+
+    def _glue_fingerprint(self, database, table, digest):
+        paginator = self.glue.get_paginator("get_partitions")
+        for page in paginator.paginate(DatabaseName=database, TableName=table):
+            for partition in page["Partitions"]:
+                changed = partition.get("LastAnalyzedTime") or partition.get("CreationTime")
+                digest.update(f"{partition['Values']}|{partition['StorageDescriptor'].get('Location')}|{changed}\n".encode())
+
+    def table_fingerprint(self, database, table):
+        try:
+            definition = self.glue.get_table(DatabaseName=database, Name=table)["Table"]
+        except self.glue.exceptions.EntityNotFoundException:
+            return "missing"
+        digest = hashlib.sha256()
+        digest.update(f"{definition.get('UpdateTime')}|{definition['StorageDescriptor']}\n".encode())
+        if self.fingerprint == "s3":
+            self._s3_fingerprint(definition["StorageDescriptor"]["Location"], digest)
+        else:
+            self._glue_fingerprint(database, table, digest)
+        return digest.hexdigest()
+
+    def cache_key(self, sql, database):
+        normalized = normalize_sql(sql)
+        digest = hashlib.sha256(f"{database}\n{normalized}\n".encode())
+        for db, table in referenced_tables(normalized, database):
+            digest.update(f"{db}.{table}={self.table_fingerprint(db, table)}\n".encode())
+        return digest.hexdigest()
+
+    def _log_hit(self, meta, seconds):
+        saved = max(meta["latency_seconds"] - seconds, 0.0)
+        self.saved_seconds += saved
+        self.saved_bytes += meta["bytes_scanned"]
+        logger.info(f"Athena cache hit: saved {saved:.1f}s and {meta['bytes_scanned'] / 1e6:.1f} MB scanned "
+                    f"(session total {self.saved_seconds:.1f}s, {self.saved_bytes / 1e6:.1f} MB)")
+
+    def _write_meta(self, meta_path, sql, database, latency, bytes_scanned):
+        meta_path.write_text(json.dumps({
+            "sql": normalize_sql(sql),
+            "database": database,
+            "latency_seconds": latency,
+            "bytes_scanned": bytes_scanned,
+            "created": time.time(),
+        }))
+
+    def read_sql_query(self, sql, database, run):
+        """Return the cached result for sql, or call run() and cache what it returns.
+
+        run() executes the query and returns a DataFrame, e.g.
+        lambda: wr.athena.read_sql_query(sql=sql, database=database)
+        """
+        key = self.cache_key(sql, database)
+        data_path = self.cache_dir / f"{key}.parquet"
+        meta_path = self.cache_dir / f"{key}.json"
+
+        if data_path.exists() and meta_path.exists():
+            start = time.perf_counter()
+            df = _to_frame(pq.read_table(data_path))
+            self._log_hit(json.loads(meta_path.read_text()), time.perf_counter() - start)
+            return df
+
+        start = time.perf_counter()
+        df = run()
+        latency = time.perf_counter() - start
+        # awswrangler attaches the query execution details to the result
+        statistics = (getattr(df, "query_metadata", None) or {}).get("Statistics", {})
+        bytes_scanned = int(statistics.get("DataScannedInBytes", 0))
+
+        df.to_parquet(data_path, index=False)
+        self._write_meta(meta_path, sql, database, latency, bytes_scanned)
+        logger.info(f"Athena cache miss: query took {latency:.1f}s and scanned {bytes_scanned / 1e6:.1f} MB")
+        return df
+
+    def iter_sql_query(self, sql, database, run, chunksize):
+        """Yield the result for sql as DataFrame chunks, streaming on hits and misses alike.
+
+        A hit reads the cached Parquet chunksize rows at a time. On a miss, run() returns
+        an iterator of chunks, e.g. lambda: wr.athena.read_sql_query(..., chunksize=N);
+        each chunk is appended to the cache file as it passes through, and the entry is
+        only published once the iterator is exhausted (a stopped run caches nothing).
+        Latency recorded for a miss is the time to the first chunk.
+        """
+        key = self.cache_key(sql, database)
+        data_path = self.cache_dir / f"{key}.parquet"
+        meta_path = self.cache_dir / f"{key}.json"
+
+        if data_path.exists() and meta_path.exists():
+            start = time.perf_counter()
+            parquet_file = pq.ParquetFile(data_path)
+            self._log_hit(json.loads(meta_path.read_text()), time.perf_counter() - start)
+            for batch in parquet_file.iter_batches(batch_size=chunksize):
+                yield _to_frame(batch)
+            return
+
+        tmp_path = data_path.with_suffix(".tmp")
+        writer = None
+        latency = None
+        bytes_scanned = 0
+        complete = False
+        start = time.perf_counter()
+        try:
+            for chunk in run():
+                if latency is None:
+                    latency = time.perf_counter() - start
+                statistics = (getattr(chunk, "query_metadata", None) or {}).get("Statistics", {})
+                bytes_scanned = max(bytes_scanned, int(statistics.get("DataScannedInBytes", 0)))
+                if tmp_path is not None:
+                    try:
+                        if writer is None:
+                            table = pa.Table.from_pandas(chunk, preserve_index=False)
+                            writer = pq.ParquetWriter(tmp_path, table.schema)
+                        else:
+                            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                        writer.write_table(table)
+                    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                        # A chunk whose types don't fit the first one's: keep streaming, skip caching
+                        logger.warning(f"Athena cache: not caching this result ({e})")
+                        tmp_path = None
+                yield chunk
+            complete = True
+        finally:
+            if writer is not None:
+                writer.close()
+            if complete and tmp_path is not None and writer is not None:
+                tmp_path.replace(data_path)
+                self._write_meta(meta_path, sql, database, latency, bytes_scanned)
+                logger.info(f"Athena cache miss: first chunk after {latency:.1f}s, "
+                            f"{bytes_scanned / 1e6:.1f} MB scanned")
+            else:
+                data_path.with_suffix(".tmp").unlink(missing_ok=True)
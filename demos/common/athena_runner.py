@@ -0,0 +1,144 @@
+# asyncio Athena query runner: concurrent submission with adaptive status polling
+import asyncio
+import logging
+import time
+import uuid
+
+import pandas as pd
+
+from .athena_unload import ParquetResult, result_schema, unload_statement
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = {"SUCCEEDED", "FAILED", "CANCELLED"}
+
+
+class AthenaQueryError(Exception):
+    def __init__(self, query_id, state, reason):
+        super().__init__(f"Query {query_id} finished with state {state}: {reason}")
+        self.query_id = query_id
+        self.state = state
+        self.reason = reason
+
+
+def read_csv_result(execution):
+    """Default result reader: the CSV file Athena wrote to the output location."""
+    return pd.read_csv(execution["ResultConfiguration"]["OutputLocation"])
+
+
+class AsyncAthenaRunner:
+    """Run many Athena queries concurrently from one event loop.
+
+    At most max_concurrency queries are in flight (Athena's account-level limit on
+    active DML queries is the real ceiling). Each query polls its status after
+    initial_delay seconds, then backs off by `backoff` up to max_delay, so short
+    queries return within a fraction of a second while long ones cost few API calls.
+    boto3 calls run in worker threads via asyncio.to_thread.
+
+    result_format="parquet" runs each SELECT as an UNLOAD to a fresh prefix under
+    unload_location and reads the Parquet files back (typed columns, parallel
+    downloads) instead of re-parsing Athena's CSV result file. run() deletes that
+    prefix once the result is read.
+    """
+
+    def __init__(self, database, output_location, client=None, max_concurrency=5,
+                 initial_delay=0.2, max_delay=5.0, backoff=1.5, result_reader=read_csv_result,
+                 result_format="csv", unload_location=None, s3_client=None):
+        self.database = database
+        self.output_location = output_location
+        self.client = client or pooled_client("athena", max_pool_connections=max_concurrency * 2)
+        self.max_concurrency = max_concurrency
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.result_reader = result_reader
+        self.result_format = result_format
+        self.unload_location = (unload_location or f"{output_location.rstrip('/')}/unload").rstrip("/")
+        self.s3_client = s3_client
+        self._semaphore = None
+
+    def _start(self, sql):
+        response = self.client.start_query_execution(
+            QueryString=sql,
+            QueryExecutionContext={"Database": self.database},
+            ResultConfiguration={"OutputLocation": self.output_location},
+        )
+        return response["QueryExecutionId"]
+
+    async def _wait(self, query_id):
+        delay = self.initial_delay
+        while True:
+            await asyncio.sleep(delay)
+            response = await asyncio.to_thread(self.client.get_query_execution, QueryExecutionId=query_id)
+            execution = response["QueryExecution"]
+            if execution["Status"]["State"] in TERMINAL_STATES:
+                return execution
+            delay = min(self.max_delay, delay * self.backoff)
+
+    async def execute(self, sql):
+        """Execute sql and return its QueryExecution once it SUCCEEDED (raises AthenaQueryError otherwise)."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            query_id = await asyncio.to_thread(self._start, sql)
+            execution = await self._wait(query_id)
+        status = execution["Status"]
+        if status["State"] != "SUCCEEDED":
+            raise AthenaQueryError(query_id, status["State"], status.get("StateChangeReason", ""))
+        return execution
+
+    async def columns(self, sql):
+        """Arrow schema of sql's result, from the column metadata of a LIMIT 0 run (scans nothing)."""
+        execution = await self.execute(f"SELECT * FROM ({sql.strip().rstrip(';')}) LIMIT 0")
+        response = await asyncio.to_thread(self.client.get_query_results,
+                                           QueryExecutionId=execution["QueryExecutionId"], MaxResults=1)
+        return result_schema(response["ResultSet"]["ResultSetMetadata"]["ColumnInfo"])
+
+    async def unload(self, sql):
+        """UNLOAD sql to Parquet and return a ParquetResult (to_frame() / iter_batches()).
+
+        The caller owns the files: use `with await runner.unload(sql) as result:` or
+        call result.delete() once it has been read.
+        """
+        location = f"{self.unload_location}/{uuid.uuid4().hex}/"
+        execution = await self.execute(unload_statement(sql, location))
+        result = await asyncio.to_thread(ParquetResult, location, self.s3_client, execution=execution)
+        if not result.keys:
+            # No rows, no files: take the columns from the query instead
+            result.schema = await self.columns(sql)
+        return result
+
+    async def run(self, sql):
+        """Execute sql and return its result as a DataFrame (raises AthenaQueryError on failure)."""
+        start = time.perf_counter()
+        if self.result_format == "parquet":
+            result = await self.unload(sql)
+            execution = result.execution
+            try:
+                df = await asyncio.to_thread(result.to_frame)
+            finally:
+                await asyncio.to_thread(result.delete)
+        else:
+            execution = await self.execute(sql)
+            df = await asyncio.to_thread(self.result_reader, execution)
+        scanned = execution.get("Statistics", {}).get("DataScannedInBytes", 0)
+        logger.info(f"Query {execution['QueryExecutionId']}: {len(df)} rows in {time.perf_counter() - start:.1f}s "
+                    f"({scanned / 1e6:.1f} MB scanned)")
+        return df
+
+    def submit(self, sql):
+        """Schedule sql on the running loop and return a future resolving to its DataFrame."""
+        return asyncio.ensure_future(self.run(sql))
+
+    async def run_all(self, queries):
+        """Run a list of SQL strings (or a {name: sql} dict) concurrently, keeping the input shape."""
+        if isinstance(queries, dict):
+            results = await asyncio.gather(*(self.submit(sql) for sql in queries.values()))
+            return dict(zip(queries, results))
+        return list(await asyncio.gather(*(self.submit(sql) for sql in queries)))
+
+
+def run_queries(queries, database, output_location, **kwargs):
+    """Blocking helper for scripts: run queries concurrently and return their DataFrames."""
+    return asyncio.run(AsyncAthenaRunner(database, output_location, **kwargs).run_all(queries))
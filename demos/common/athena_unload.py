@@ -0,0 +1,139 @@
+# Athena UNLOAD-to-Parquet results read back as Arrow record batches
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+# Keep Athena's types in pandas: bigint stays an integer even with NULLs, varchar
+# becomes Arrow-backed strings, arrays (genres) become per-row numpy arrays
+_PANDAS_TYPES = {
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+    pa.int64(): pd.Int64Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int8(): pd.Int8Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+# Athena result column types (GetQueryResults ColumnInfo) -> Arrow types, as UNLOAD writes them
+_ATHENA_TYPES = {
+    "varchar": pa.string(),
+    "char": pa.string(),
+    "string": pa.string(),
+    "tinyint": pa.int8(),
+    "smallint": pa.int16(),
+    "integer": pa.int32(),
+    "bigint": pa.int64(),
+    "real": pa.float32(),
+    "float": pa.float32(),
+    "double": pa.float64(),
+    "boolean": pa.bool_(),
+    "date": pa.date32(),
+    "timestamp": pa.timestamp("ms"),
+    "varbinary": pa.binary(),
+}
+
+
+def unload_statement(sql, location, compression="SNAPPY"):
+    """Wrap a SELECT in UNLOAD so Athena writes Parquet files under location (must be empty)."""
+    return f"UNLOAD ({sql.strip().rstrip(';')}) TO '{location}' WITH (format = 'PARQUET', compression = '{compression}')"
+
+
+def result_schema(column_info):
+    """Arrow schema of a query result from its ColumnInfo (arrays are typed as list<string>)."""
+    fields = []
+    for column in column_info:
+        kind = column["Type"].lower()
+        if kind == "decimal":
+            arrow_type = pa.decimal128(column.get("Precision", 38), column.get("Scale", 0))
+        elif kind == "array":
+            # ColumnInfo doesn't name the element type; the demo arrays (genres) are strings
+            arrow_type = pa.list_(pa.string())
+        else:
+            arrow_type = _ATHENA_TYPES.get(kind, pa.string())
+        fields.append((column["Name"].lower(), arrow_type))
+    return pa.schema(fields)
+
+
+def _split_uri(uri):
+    bucket, _, key = uri.removeprefix("s3://").partition("/")
+    return bucket, key
+
+
+class ParquetResult:
+    """The Parquet files an UNLOAD wrote, fetched from S3 in parallel.
+
+    to_frame() downloads every file concurrently and returns one typed DataFrame;
+    iter_batches() yields Arrow record batches of at most batch_size rows while keeping
+    only `workers` files in memory, for results that don't fit in RAM (as_pandas=True
+    converts each batch with the same types as to_frame()).
+    An empty UNLOAD writes no files; pass schema so an empty result still has its columns.
+    The files are the caller's to remove: use the result as a context manager, or call
+    delete() once it has been read.
+    """
+
+    def __init__(self, location, s3_client=None, workers=8, execution=None, schema=None):
+        self.location = location
+        self.execution = execution
+        self.schema = schema
+        self.s3 = s3_client or pooled_client("s3", max_pool_connections=workers)
+        self.workers = workers
+        bucket, prefix = _split_uri(location)
+        self.bucket = bucket
+        paginator = self.s3.get_paginator("list_objects_v2")
+        objects = [obj for page in paginator.paginate(Bucket=bucket, Prefix=prefix) for obj in page.get("Contents", [])]
+        self.keys = sorted(obj["Key"] for obj in objects if obj["Size"] > 0)
+        self._all_keys = [obj["Key"] for obj in objects]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.delete()
+
+    def delete(self):
+        """Remove the UNLOAD output from S3 (every object under location)."""
+        # DeleteObjects takes up to 1000 keys per call
+        for i in range(0, len(self._all_keys), 1000):
+            self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in self._all_keys[i:i + 1000]], "Quiet": True},
+            )
+        if self._all_keys:
+            logger.info(f"Deleted {len(self._all_keys)} UNLOAD files under {self.location}")
+        self._all_keys = []
+
+    def _fetch(self, key):
+        body = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return pq.ParquetFile(io.BytesIO(body))
+
+    def to_arrow(self):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            tables = [f.read() for f in pool.map(self._fetch, self.keys)]
+        if not tables:
+            return self.schema.empty_table() if self.schema is not None else pa.table({})
+        return pa.concat_tables(tables, promote_options="default")
+
+    def to_frame(self):
+        return self.to_arrow().to_pandas(types_mapper=_PANDAS_TYPES.get)
+
+    def iter_batches(self, batch_size=100_000, as_pandas=False):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = [pool.submit(self._fetch, key) for key in self.keys[:self.workers]]
+            next_key = len(pending)
+            while pending:
+                parquet_file = pending.pop(0).result()
+                # Start the next download before converting this file's batches
+                if next_key < len(self.keys):
+                    pending.append(pool.submit(self._fetch, self.keys[next_key]))
+                    next_key += 1
+                for batch in parquet_file.iter_batches(batch_size=batch_size):
+                    yield batch.to_pandas(types_mapper=_PANDAS_TYPES.get) if as_pandas else batch
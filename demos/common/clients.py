@@ -0,0 +1,56 @@
+# Process-wide boto3 session and client pool shared by the demos and the helpers in common
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def session():
+    """boto3's default session (awswrangler uses it too), created once per process."""
+    with _lock:
+        if boto3.DEFAULT_SESSION is None:
+            boto3.setup_default_session()
+        return boto3.DEFAULT_SESSION
+
+
+def pooled_client(service, max_pool_connections=10):
+    """A client for service shared by every caller in the process.
+
+    Creating a client loads the service model and opens a new connection pool, so
+    demos run one after another (see demos/run_demos.py) reuse both instead.
+    Clients are thread-safe; one client is kept per (service, pool size).
+    """
+    key = (service, max_pool_connections)
+    client = _clients.get(key)
+    if client is None:
+        default_session = session()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                # Session.client() isn't thread-safe, so creation stays under the lock
+                client = default_session.client(service, config=Config(max_pool_connections=max_pool_connections))
+                _clients[key] = client
+    return client
+
+
+def reset():
+    """Forget the pooled clients and the default session (e.g. after switching credentials or endpoints)."""
+    with _lock:
+        _clients.clear()
+        boto3.DEFAULT_SESSION = None
+
+
+def _after_fork():
+    # A forked worker (e.g. common.csv_reader) must not reuse the parent's connections,
+    # and the lock may have been held by another parent thread at fork time
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+    boto3.DEFAULT_SESSION = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,205 @@
+# Parallel DynamoDB bulk loader built on batch_write_item
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+from botocore.exceptions import ClientError
+
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+# batch_write_item accepts at most 25 put/delete requests per call
+BATCH_SIZE = 25
+
+# Error codes that mean "slow down" rather than "this request is wrong"
+THROTTLING_ERRORS = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+
+
+def jittered_backoff(attempt, base_delay=0.05, max_delay=5.0):
+    # "Full jitter": sleep a random time up to the exponential cap so retrying
+    # workers spread out instead of hammering the same partition in lockstep
+    time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+class AIMDRateLimiter:
+    """Shared items/second budget with additive increase, multiplicative decrease.
+
+    Every successful batch raises the rate by `increase`; a throttle multiplies it
+    by `decrease` (at most once per `cooldown` seconds, so one burst of throttled
+    workers doesn't collapse the rate to the floor).
+    """
+
+    def __init__(self, initial_rate=1000.0, min_rate=25.0, max_rate=float("inf"),
+                 increase=25.0, decrease=0.5, cooldown=1.0):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+        self._last_decrease = 0.0
+
+    def acquire(self, items=1):
+        # Reserve a time slot for `items` writes and sleep until it starts
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + items / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+
+
+@dataclass
+class LoadStats:
+    items_written: int = 0
+    items_failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    throttles: int = 0
+    consumed_wcu: float = 0.0
+    elapsed: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def items_per_second(self):
+        return self.items_written / self.elapsed if self.elapsed else 0.0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self):
+        return (f"{self.items_written} written, {self.items_failed} failed in {self.elapsed:.1f}s "
+                f"({self.items_per_second:.0f} items/s, {self.consumed_wcu:.0f} WCU, "
+                f"{self.retries} retries, {self.throttles} throttles)")
+
+
+class BulkLoader:
+    """Write DynamoDB items (wire format) with batch_write_item across worker threads.
+
+    UnprocessedItems and throttling errors are retried with full-jitter exponential
+    backoff, and all workers share one AIMDRateLimiter. Pass `client` to reuse an
+    existing client or to point at a local stand-in (moto, DynamoDB Local).
+    """
+
+    def __init__(self, table_name, client=None, workers=8, rate_limiter=None,
+                 max_retries=10, base_delay=0.05, max_delay=5.0):
+        self.table_name = table_name
+        self.client = client or pooled_client("dynamodb", max_pool_connections=workers)
+        self.workers = workers
+        self.rate_limiter = rate_limiter or AIMDRateLimiter()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _write_batch(self, requests, stats):
+        attempt = 0
+        try:
+            while requests:
+                self.rate_limiter.acquire(len(requests))
+                try:
+                    response = self.client.batch_write_item(
+                        RequestItems={self.table_name: requests},
+                        ReturnConsumedCapacity="TOTAL",
+                    )
+                except ClientError as e:
+                    if e.response["Error"]["Code"] not in THROTTLING_ERRORS:
+                        raise
+                    stats.add(throttles=1)
+                else:
+                    unprocessed = response.get("UnprocessedItems", {}).get(self.table_name, [])
+                    consumed = sum(c.get("CapacityUnits", 0) for c in response.get("ConsumedCapacity", []))
+                    stats.add(items_written=len(requests) - len(unprocessed), consumed_wcu=consumed)
+                    # From here on only the unprocessed requests are outstanding
+                    requests = unprocessed
+
+                if not requests:
+                    self.rate_limiter.on_success()
+                    return
+                # Partially processed batch: DynamoDB is throttling this partition, back off
+                self.rate_limiter.on_throttle()
+                if attempt >= self.max_retries:
+                    logger.error(f"Giving up on {len(requests)} items after {attempt} retries")
+                    stats.add(items_failed=len(requests))
+                    return
+                stats.add(retries=1)
+                jittered_backoff(attempt, self.base_delay, self.max_delay)
+                attempt += 1
+        except Exception:
+            # Earlier attempts already counted their items as written; only the rest failed
+            stats.add(items_failed=len(requests))
+            raise
+
+    def _worker(self, batches, stats, errors):
+        while True:
+            requests = batches.get()
+            if requests is None:
+                return
+            try:
+                self._write_batch(requests, stats)
+                stats.add(batches=1)
+            except Exception as e:
+                # Keep draining the queue so the producer never blocks; report after join.
+                # _write_batch counted the items still unprocessed as failed
+                errors.append(e)
+
+    def load(self, items, delete_keys=()):
+        """Write every item, delete every key and return LoadStats (items/s, consumed WCU, retries).
+
+        Deletes count as written items. A key must not also appear in items.
+        """
+        stats = LoadStats()
+        errors = []
+        # Bounded queue: the producer can't run more than a few batches ahead of the writers
+        batches = queue.Queue(maxsize=self.workers * 4)
+        threads = [
+            threading.Thread(target=self._worker, args=(batches, stats, errors), daemon=True)
+            for _ in range(self.workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        requests = []
+        puts = ({"PutRequest": {"Item": item}} for item in items)
+        deletes = ({"DeleteRequest": {"Key": key}} for key in delete_keys)
+        for request in itertools.chain(puts, deletes):
+            requests.append(request)
+            if len(requests) == BATCH_SIZE:
+                batches.put(requests)
+                requests = []
+        if requests:
+            batches.put(requests)
+        for _ in threads:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+
+        stats.elapsed = time.perf_counter() - start
+        logger.info(f"DynamoDB load into {self.table_name}: {stats.summary()}")
+        if errors:
+            raise errors[0]
+        return stats
@@ -0,0 +1,147 @@
+# Parallel DynamoDB key lookups built on batch_get_item
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from .clients import pooled_client
+from .dynamodb_loader import THROTTLING_ERRORS, jittered_backoff
+
+logger = logging.getLogger(__name__)
+
+# batch_get_item accepts at most 100 keys per call
+BATCH_SIZE = 100
+
+_deserializer = TypeDeserializer()
+
+
+class ColumnBuilder:
+    """Accumulate DynamoDB items (wire format) straight into per-attribute columns.
+
+    Scalars are appended as their raw payload and converted once per column in
+    to_frame(): N columns go through pd.to_numeric, S columns become Arrow-backed
+    strings, SS values stay lists. Only other nested types (L, M, NS, ...) are
+    deserialized value by value.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+        self.types = {}
+
+    def add(self, item):
+        for name, wire in item.items():
+            (kind, value), = wire.items()
+            column = self.columns.get(name)
+            if column is None:
+                # Attribute first seen here: earlier rows don't have it
+                column = self.columns[name] = [None] * self.rows
+                self.types[name] = kind
+            elif len(column) < self.rows:
+                column.extend([None] * (self.rows - len(column)))
+            if kind in ("S", "N", "BOOL"):
+                column.append(value)
+            elif kind == "SS":
+                # String sets arrive as a plain list of str - keep it as a list
+                column.append(value)
+            elif kind == "NULL":
+                column.append(None)
+            else:
+                value = _deserializer.deserialize(wire)
+                # Sets (NS/BS) become sorted lists so the column can be written to Parquet
+                column.append(sorted(value) if isinstance(value, set) else value)
+        self.rows += 1
+
+    def extend(self, other):
+        for name, values in other.columns.items():
+            column = self.columns.setdefault(name, [])
+            self.types.setdefault(name, other.types[name])
+            column.extend([None] * (self.rows - len(column)))
+            column.extend(values)
+        self.rows += other.rows
+
+    def to_frame(self):
+        data = {}
+        for name, column in self.columns.items():
+            column.extend([None] * (self.rows - len(column)))
+            kind = self.types[name]
+            if kind == "N":
+                data[name] = pd.to_numeric(pd.Series(column, dtype=object))
+            elif kind == "S":
+                data[name] = pd.array(column, dtype=pd.StringDtype("pyarrow"))
+            elif kind == "BOOL":
+                data[name] = pd.array(column, dtype="boolean")
+            else:
+                data[name] = pd.Series(column, dtype=object)
+        return pd.DataFrame(data, index=pd.RangeIndex(self.rows))
+
+
+class BatchGetEngine:
+    """Resolve many partition keys with concurrent 100-key batch_get_item calls.
+
+    Input keys are deduplicated, UnprocessedKeys are retried with jittered
+    exponential backoff, and responses are decoded straight into columns.
+    Pass `client` to reuse an existing client or to point at moto / DynamoDB Local.
+    """
+
+    def __init__(self, table_name, key_name, key_type="S", client=None, workers=8,
+                 projection=None, consistent_read=False, max_retries=10, base_delay=0.05, max_delay=5.0):
+        self.table_name = table_name
+        self.key_name = key_name
+        self.key_type = key_type
+        self.client = client or pooled_client("dynamodb", max_pool_connections=workers)
+        self.workers = workers
+        self.projection = projection
+        self.consistent_read = consistent_read
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _request(self, keys):
+        request = {"Keys": keys, "ConsistentRead": self.consistent_read}
+        if self.projection:
+            # Placeholders avoid clashes with DynamoDB reserved words (e.g. "year")
+            names = {f"#p{i}": attr for i, attr in enumerate(self.projection)}
+            request["ProjectionExpression"] = ", ".join(names)
+            request["ExpressionAttributeNames"] = names
+        return request
+
+    def _get_batch(self, key_values):
+        columns = ColumnBuilder()
+        keys = [{self.key_name: {self.key_type: str(v)}} for v in key_values]
+        attempt = 0
+        while keys:
+            try:
+                response = self.client.batch_get_item(RequestItems={self.table_name: self._request(keys)})
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in THROTTLING_ERRORS:
+                    raise
+                unprocessed = keys
+            else:
+                for item in response["Responses"].get(self.table_name, []):
+                    columns.add(item)
+                unprocessed = response.get("UnprocessedKeys", {}).get(self.table_name, {}).get("Keys", [])
+
+            if not unprocessed:
+                break
+            if attempt >= self.max_retries:
+                raise RuntimeError(f"{len(unprocessed)} keys still unprocessed after {attempt} retries")
+            jittered_backoff(attempt, self.base_delay, self.max_delay)
+            attempt += 1
+            keys = unprocessed
+        return columns
+
+    def get(self, key_values):
+        """Return a DataFrame with one row per key found (missing keys are skipped)."""
+        unique_keys = pd.unique(pd.Series(list(key_values), dtype=object).astype(str))
+        batches = [unique_keys[i:i + BATCH_SIZE] for i in range(0, len(unique_keys), BATCH_SIZE)]
+
+        columns = ColumnBuilder()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for batch_columns in pool.map(self._get_batch, batches):
+                columns.extend(batch_columns)
+
+        logger.info(f"Looked up {len(unique_keys)} unique keys in {len(batches)} requests, found {columns.rows}")
+        return columns.to_frame()
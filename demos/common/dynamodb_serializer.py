@@ -0,0 +1,107 @@
+# Column-at-a-time DataFrame -> DynamoDB wire format (S / N / SS / L / BOOL) conversion
+import numpy as np
+import pandas as pd
+
+
+def _null_mask(series):
+    mask = series.isna().to_numpy()
+    if series.dtype.kind == "f":
+        # DynamoDB numbers can't be infinite either
+        mask |= np.isinf(series.to_numpy(dtype="float64", na_value=np.nan))
+    return mask
+
+
+def _numbers(series, mask):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        values = series.to_numpy(dtype="int64", na_value=0).astype(str).tolist()
+    else:
+        # repr() is the shortest string that round-trips the float exactly
+        values = [repr(v) for v in series.to_numpy(dtype="float64", na_value=0.0).tolist()]
+    return [{"N": v} for v in values]
+
+
+def _strings(series, mask):
+    values = series.to_numpy(dtype=object, na_value=None)
+    if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+        return [{"S": v if v.__class__ is str else str(v)} for v in values.tolist()]
+    return [{"S": v} for v in series.astype(str).tolist()]
+
+
+def _booleans(series, mask):
+    return [{"BOOL": v} for v in series.to_numpy(dtype=bool, na_value=False).tolist()]
+
+
+def _convert_lists(series, mask, convert):
+    # List columns like genres repeat a small set of combinations, so each distinct
+    # list is converted once and the (read-only) wire value is shared between items
+    cache = {}
+    out = []
+    for i, v in enumerate(series.tolist()):
+        if mask[i]:
+            out.append(None)
+            continue
+        key = tuple(v)
+        wire = cache.get(key)
+        if wire is None:
+            wire = cache[key] = convert(key)
+        if not wire:
+            mask[i] = True
+        out.append(wire)
+    return out
+
+
+def _string_sets(series, mask):
+    # String sets must be non-empty and unique; empty lists are treated as missing
+    return _convert_lists(series, mask, lambda v: {"SS": list(dict.fromkeys(map(str, v)))} if v else {})
+
+
+def _lists(series, mask):
+    return _convert_lists(series, mask, lambda v: {"L": [{"S": str(s)} for s in v]})
+
+
+CONVERTERS = {
+    "S": _strings,
+    "N": _numbers,
+    "BOOL": _booleans,
+    "SS": _string_sets,
+    "L": _lists,
+}
+
+
+def infer_type(series, list_type="SS"):
+    """Pick the DynamoDB type for a column from its dtype (object columns: first non-null value)."""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "BOOL"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "N"
+    if dtype == object:
+        first = series.first_valid_index()
+        if first is not None and isinstance(series.at[first], (list, tuple, set, np.ndarray)):
+            return list_type
+    return "S"
+
+
+def serialize_items(df, types=None, list_type="SS"):
+    """Convert df to a list of DynamoDB items in wire format.
+
+    Converters are chosen once per column; `types` overrides the inferred type for
+    specific columns (e.g. {"movieId": "S"} when the key is a string attribute).
+    Null/NaN cells are left out of the item instead of being written as NULL.
+    """
+    types = types or {}
+    names, columns, null_rows = [], [], []
+    for name in df.columns:
+        series = df[name]
+        mask = _null_mask(series)
+        kind = types.get(name) or infer_type(series, list_type)
+        columns.append(CONVERTERS[kind](series, mask))
+        names.append(name)
+        null_rows.append(np.flatnonzero(mask).tolist())
+
+    items = [dict(zip(names, row)) for row in zip(*columns)]
+    # Drop missing attributes afterwards - only touches the (usually few) null cells
+    for name, rows in zip(names, null_rows):
+        for i in rows:
+            del items[i][name]
+    return items
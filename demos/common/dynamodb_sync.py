@@ -0,0 +1,219 @@
+# Change-detecting DynamoDB sync: per-key content hashes pick the items to write or delete
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .clients import pooled_client
+from .ingest_manifest import hashable_frame
+
+logger = logging.getLogger(__name__)
+
+# Item attribute holding the content hash in "attribute" mode (16 hex digits)
+HASH_ATTRIBUTE = "content_hash"
+
+# Joins the values of a composite key into one string
+KEY_SEPARATOR = "\x1f"
+
+
+def key_strings(df, key_columns):
+    """One string per row naming its item: the key values, joined for composite keys."""
+    keys = df[key_columns[0]].astype(str)
+    if len(key_columns) > 1:
+        keys = keys.str.cat([df[name].astype(str) for name in key_columns[1:]], sep=KEY_SEPARATOR)
+    return pd.Index(keys.to_numpy(dtype=object))
+
+
+def content_hashes(df, key_columns):
+    """uint64 digest of every row's non-key columns; column order doesn't matter, names do."""
+    columns = sorted(name for name in df.columns if name not in key_columns and name != HASH_ATTRIBUTE)
+    seed = np.uint64(int.from_bytes(hashlib.sha256("\x1f".join(columns).encode()).digest()[:8], "little"))
+    if not columns:
+        return np.full(len(df), seed, dtype=np.uint64)
+    return pd.util.hash_pandas_object(hashable_frame(df[columns]), index=False).to_numpy() ^ seed
+
+
+def _scalar(value):
+    # {"S": "12"} / {"N": "12"} -> "12", the same text astype(str) gives for the DataFrame key
+    return next(iter(value.values()))
+
+
+@dataclass
+class SyncStats:
+    rows: int = 0
+    inserts: int = 0
+    updates: int = 0
+    unchanged: int = 0
+    deletes: int = 0
+
+    @property
+    def writes_avoided(self):
+        return self.unchanged
+
+    def summary(self):
+        share = self.unchanged / self.rows if self.rows else 0.0
+        return (f"{self.inserts} inserts, {self.updates} updates, {self.deletes} deletes, "
+                f"{self.unchanged} of {self.rows} rows unchanged ({share:.0%} of writes avoided)")
+
+
+class DynamoDBSync:
+    """Find the rows of a DataFrame that differ from what was last synced to a table.
+
+    Every row's non-key columns are reduced to a 64-bit hash and compared, in one
+    vectorized pass, with the hashes of the previous sync:
+    - mode "local": hashes are kept in a Parquet file under state_dir. Costs no reads,
+      but only knows about writes made through this class - delete the file after
+      the table is recreated or written by other means.
+    - mode "attribute": every written item carries a content_hash attribute and the
+      previous hashes are read with one parallel Scan of keys and hashes, so the
+      table itself is the source of truth. Items without the attribute count as changed.
+
+    diff() returns the new or changed rows (call it once per frame or chunk),
+    deleted_keys() the previously synced keys no diffed frame contained, and
+    commit() records the new hashes - call it only after the writes succeeded.
+    """
+
+    def __init__(self, table_name, key_columns, mode="local", state_dir="/tmp/dynamodb_sync",
+                 client=None, workers=8):
+        if mode not in ("local", "attribute"):
+            raise ValueError(f"mode must be 'local' or 'attribute', not {mode!r}")
+        self.table_name = table_name
+        self.key_columns = list(key_columns)
+        self.mode = mode
+        self.state_path = Path(state_dir) / f"{table_name}.parquet"
+        self.workers = workers
+        self.client = client or pooled_client("dynamodb", max_pool_connections=workers)
+        self.stats = SyncStats()
+        self._previous = None
+        self._seen = []
+
+    # Previous hashes: (keys, hashes, known) - known is False where an item has no hash
+
+    def _load_local(self):
+        if not self.state_path.exists():
+            logger.info(f"No sync state at {self.state_path}, every row counts as new")
+            return pd.Index([], dtype=object), np.empty(0, dtype=np.uint64), np.empty(0, dtype=bool)
+        table = pq.read_table(self.state_path)
+        saved_key = json.loads(table.schema.metadata.get(b"key_columns", b"null"))
+        if saved_key != self.key_columns:
+            logger.info(f"Sync state at {self.state_path} is for key {saved_key}, ignoring it")
+            return pd.Index([], dtype=object), np.empty(0, dtype=np.uint64), np.empty(0, dtype=bool)
+        return (pd.Index(table["key"].to_pylist(), dtype=object), table["hash"].to_numpy(),
+                np.ones(table.num_rows, dtype=bool))
+
+    def _scan_segment(self, segment):
+        names = {f"#k{i}": name for i, name in enumerate(self.key_columns)}
+        names["#h"] = HASH_ATTRIBUTE
+        keys, hashes = [], []
+        paginator = self.client.get_paginator("scan")
+        for page in paginator.paginate(TableName=self.table_name, Segment=segment, TotalSegments=self.workers,
+                                       ProjectionExpression=", ".join(names), ExpressionAttributeNames=names):
+            for item in page["Items"]:
+                keys.append(KEY_SEPARATOR.join(_scalar(item[name]) for name in self.key_columns))
+                digest = item.get(HASH_ATTRIBUTE)
+                hashes.append(int(digest["S"], 16) if digest else None)
+        return keys, hashes
+
+    def _scan(self):
+        # Parallel Scan of keys and hashes only; reads cost RCUs, but far fewer than rewriting cost WCUs
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            segments = list(pool.map(self._scan_segment, range(self.workers)))
+        keys = [key for segment_keys, _ in segments for key in segment_keys]
+        hashes = [digest for _, segment_hashes in segments for digest in segment_hashes]
+        logger.info(f"Scanned {len(keys)} keys and content hashes from {self.table_name}")
+        known = np.array([digest is not None for digest in hashes], dtype=bool)
+        hashes = np.array([0 if digest is None else digest for digest in hashes], dtype=np.uint64)
+        return pd.Index(keys, dtype=object), hashes, known
+
+    def _load(self):
+        keys, hashes, known = self._load_local() if self.mode == "local" else self._scan()
+        unique = ~keys.duplicated()
+        return keys[unique], hashes[unique], known[unique]
+
+    @property
+    def previous(self):
+        if self._previous is None:
+            self._previous = self._load()
+        return self._previous
+
+    # Diff
+
+    def diff(self, df):
+        """Rows of df that are new or changed since the last sync (for duplicate keys the last row wins).
+
+        In attribute mode the rows come back with the content_hash column to write.
+        """
+        keys, hashes, known = self.previous
+        df = df.drop_duplicates(subset=self.key_columns, keep="last")
+        incoming = key_strings(df, self.key_columns)
+        digests = content_hashes(df, self.key_columns)
+
+        position = keys.get_indexer(incoming)
+        new = position == -1
+        changed = np.zeros(len(df), dtype=bool)
+        existing = ~new
+        if existing.any():
+            old = position[existing]
+            changed[existing] = ~known[old] | (hashes[old] != digests[existing])
+        self._seen.append(pd.Series(digests, index=incoming))
+
+        self.stats.rows += len(df)
+        self.stats.inserts += int(new.sum())
+        self.stats.updates += int(changed.sum())
+        self.stats.unchanged += int(len(df) - new.sum() - changed.sum())
+
+        write = new | changed
+        rows = df[write].copy()
+        if self.mode == "attribute":
+            rows[HASH_ATTRIBUTE] = [f"{digest:016x}" for digest in digests[write].tolist()]
+        return rows
+
+    def _seen_hashes(self):
+        if not self._seen:
+            return pd.Series([], index=pd.Index([], dtype=object), dtype=np.uint64)
+        seen = pd.concat(self._seen)
+        return seen[~seen.index.duplicated(keep="last")]
+
+    def deleted_keys(self):
+        """Key columns (as strings) of previously synced items missing from every diffed frame."""
+        keys, _, _ = self.previous
+        gone = keys[~keys.isin(self._seen_hashes().index)]
+        self.stats.deletes = len(gone)
+        parts = pd.Series(gone, dtype=object).str.split(KEY_SEPARATOR, expand=True, regex=False) if len(gone) else None
+        return pd.DataFrame({
+            name: parts[i] if parts is not None else pd.Series(dtype=object)
+            for i, name in enumerate(self.key_columns)
+        })
+
+    def commit(self, drop_missing=False):
+        """Save the diffed rows' hashes; drop_missing=True after deleting deleted_keys() from the table.
+
+        Attribute mode has nothing to save: the hashes were written with the items.
+        """
+        if self.mode != "local":
+            return
+        keys, hashes, known = self.previous
+        seen = self._seen_hashes()
+        if drop_missing:
+            state = seen
+        else:
+            kept = ~keys.isin(seen.index) & known
+            state = pd.concat([pd.Series(hashes[kept], index=keys[kept]), seen])
+        table = pa.table({"key": pa.array(state.index.tolist(), pa.string()),
+                          "hash": pa.array(state.to_numpy(dtype=np.uint64), pa.uint64())})
+        table = table.replace_schema_metadata({"key_columns": json.dumps(self.key_columns)})
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        tmp.replace(self.state_path)
+        self._previous = (pd.Index(state.index, dtype=object), state.to_numpy(dtype=np.uint64),
+                          np.ones(len(state), dtype=bool))
+        self._seen = []
+        logger.info(f"Sync state: {len(state)} hashes -> {self.state_path}")
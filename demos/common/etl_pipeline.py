@@ -0,0 +1,173 @@
+# Staged fetch -> transform -> write pipeline with bounded queues and a resumable checkpoint
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    chunks: int = 0
+    rows: int = 0
+    busy: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, rows, seconds):
+        with self._lock:
+            self.chunks += 1
+            self.rows += rows
+            self.busy += seconds
+
+    def summary(self):
+        rate = self.rows / self.busy if self.busy else 0.0
+        return f"{self.name}: {self.chunks} chunks, {self.rows} rows, {self.busy:.1f}s busy ({rate:.0f} rows/s)"
+
+
+class Checkpoint:
+    """Indices of chunks already written, persisted as JSON after every chunk.
+
+    The file is tagged with a run key (e.g. the query text); a checkpoint written
+    for a different key is ignored. clear() removes it once a run completes.
+    """
+
+    def __init__(self, path, key):
+        self.path = Path(path)
+        self.key = hashlib.sha256(key.encode()).hexdigest()
+        self._lock = threading.Lock()
+        self.completed = set()
+        if self.path.exists():
+            saved = json.loads(self.path.read_text())
+            if saved.get("key") == self.key:
+                self.completed = set(saved["completed"])
+
+    @property
+    def resuming(self):
+        return bool(self.completed)
+
+    def mark(self, index):
+        with self._lock:
+            self.completed.add(index)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"key": self.key, "completed": sorted(self.completed)}))
+            tmp.replace(self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+class ChunkPipeline:
+    """Overlap fetching, transforming and writing DataFrame chunks.
+
+    The caller's thread pulls chunks from the source iterator (the fetch stage),
+    one thread runs transform(chunk), and `writers` threads run write(chunk).
+    Stages are connected by queues holding at most queue_size chunks, so a slow
+    writer stalls the fetch instead of buffering the whole result in memory.
+    Chunks recorded in the checkpoint are skipped; the first error stops the
+    pipeline and is re-raised after the threads are joined.
+    """
+
+    def __init__(self, transform, write, writers=4, queue_size=4, checkpoint=None):
+        self.transform = transform
+        self.write = write
+        self.writers = writers
+        self.queue_size = queue_size
+        self.checkpoint = checkpoint
+        self.metrics = {name: StageMetrics(name) for name in ("fetch", "transform", "write")}
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, q, item):
+        # Block while the next stage is full, but give up once another stage failed
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def _get(self, q):
+        # Next task, or _DONE once the upstream stage finished or any stage failed
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _transform_stage(self, inbox, outbox):
+        try:
+            while (task := self._get(inbox)) is not _DONE:
+                index, chunk = task
+                start = time.perf_counter()
+                chunk = self.transform(chunk)
+                self.metrics["transform"].record(len(chunk), time.perf_counter() - start)
+                if not self._put(outbox, (index, chunk)):
+                    return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.writers):
+                self._put(outbox, _DONE)
+
+    def _write_stage(self, inbox):
+        while (task := self._get(inbox)) is not _DONE:
+            index, chunk = task
+            try:
+                start = time.perf_counter()
+                self.write(chunk)
+                self.metrics["write"].record(len(chunk), time.perf_counter() - start)
+                if self.checkpoint is not None:
+                    self.checkpoint.mark(index)
+            except Exception as e:
+                self._fail(e)
+
+    def run(self, chunks):
+        """Push every chunk through transform and write; returns the per-stage metrics."""
+        to_transform = queue.Queue(maxsize=self.queue_size)
+        to_write = queue.Queue(maxsize=self.queue_size)
+        threads = [threading.Thread(target=self._transform_stage, args=(to_transform, to_write), daemon=True)]
+        threads += [threading.Thread(target=self._write_stage, args=(to_write,), daemon=True)
+                    for _ in range(self.writers)]
+        for thread in threads:
+            thread.start()
+
+        skipped = 0
+        start = time.perf_counter()
+        try:
+            for index, chunk in enumerate(chunks):
+                self.metrics["fetch"].record(len(chunk), time.perf_counter() - start)
+                if self.checkpoint is not None and index in self.checkpoint.completed:
+                    skipped += 1
+                elif not self._put(to_transform, (index, chunk)):
+                    break
+                start = time.perf_counter()
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(to_transform, _DONE)
+            for thread in threads:
+                thread.join()
+
+        if skipped:
+            logger.info(f"Resumed from checkpoint: skipped {skipped} chunks already written")
+        for stage in self.metrics.values():
+            logger.info(f"Pipeline {stage.summary()}")
+        if self._errors:
+            raise self._errors[0]
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+        return self.metrics
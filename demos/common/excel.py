@@ -0,0 +1,123 @@
+# Streaming Excel reader/writer on openpyxl read-only / write-only mode, with a Parquet conversion cache
+import hashlib
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from xml.etree import ElementTree
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Part of the cache key: bump when the conversion below changes
+READER_VERSION = 1
+
+
+_MAIN_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _sheet_names(path):
+    # Read xl/workbook.xml directly: even read-only load_workbook parses the whole shared strings table
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    return [sheet.get("name") for sheet in root.iterfind("m:sheets/m:sheet", _MAIN_NS)]
+
+
+def iter_sheet_chunks(path, sheet_name=0, chunksize=50_000):
+    """Yield DataFrames of at most chunksize rows; the first row is the header.
+
+    Read-only mode parses the sheet XML as a stream, so memory stays bounded by
+    one chunk instead of the whole workbook's cell objects.
+    """
+    # openpyxl takes ~0.2s to import; only pay for it when a workbook is actually parsed
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+        while chunk := list(islice(rows, chunksize)):
+            yield pd.DataFrame.from_records(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def read_sheet(path, sheet_name=0, chunksize=50_000):
+    chunks = list(iter_sheet_chunks(path, sheet_name, chunksize))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_excel(path, sheet_name=0, workers=4, chunksize=50_000, cache_dir=None):
+    """Drop-in for pd.read_excel(path, sheet_name=...) on large workbooks.
+
+    sheet_name may be an index, a name, a list of either, or None for every sheet
+    (lists and None return {name: DataFrame} like pandas). Several sheets are parsed
+    in parallel worker processes - openpyxl is pure Python, so threads wouldn't help
+    (on spawn-based platforms the calling script needs a __main__ guard).
+    With cache_dir, each sheet's conversion is stored as Parquet keyed by the
+    file's SHA-256, so an unchanged workbook isn't parsed again.
+    """
+    names = _sheet_names(path)
+    single = sheet_name is not None and not isinstance(sheet_name, list)
+    wanted = names if sheet_name is None else [sheet_name] if single else sheet_name
+    wanted = [names[s] if isinstance(s, int) else s for s in wanted]
+
+    cache_paths = {}
+    results = {}
+    if cache_dir:
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        digest = file_digest(path)
+        for name in wanted:
+            key = hashlib.sha256(f"{READER_VERSION}|{digest}|{name}".encode()).hexdigest()
+            cache_paths[name] = cache_dir / f"{key}.parquet"
+            if cache_paths[name].exists():
+                results[name] = pd.read_parquet(cache_paths[name])
+        if results:
+            logger.info(f"Excel cache: {len(results)} of {len(wanted)} sheets of {path} unchanged, not parsed")
+
+    todo = [name for name in wanted if name not in results]
+    if len(todo) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            parsed = pool.map(read_sheet, [path] * len(todo), todo, [chunksize] * len(todo))
+            results.update(zip(todo, parsed))
+    else:
+        results.update((name, read_sheet(path, name, chunksize)) for name in todo)
+
+    for name in todo:
+        if name in cache_paths:
+            try:
+                results[name].to_parquet(cache_paths[name], index=False)
+            except (TypeError, ValueError) as e:
+                # Columns mixing e.g. numbers and text can't be written as Parquet
+                logger.warning(f"Not caching sheet {name!r}: {e}")
+
+    if single:
+        return results[wanted[0]]
+    return {name: results[name] for name in wanted}
+
+
+def write_excel(df, path, sheet_name="Sheet1"):
+    """Write df row by row with openpyxl write-only mode (no in-memory cell grid)."""
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append([str(c) for c in df.columns])
+    for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+        sheet.append(row)
+    workbook.save(path)
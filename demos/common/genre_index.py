@@ -0,0 +1,275 @@
+# Genre -> movieId inverted index, stored as Parquet and optionally as a DynamoDB adjacency table
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .clients import pooled_client
+from .dynamodb_loader import BulkLoader
+
+logger = logging.getLogger(__name__)
+
+EMPTY = np.empty(0, dtype=np.uint32)
+
+SCHEMA = pa.schema([
+    ("genre", pa.string()),
+    # "bitmap": one bit per movieId up to max_id; "array": sorted little-endian uint32 ids
+    ("encoding", pa.dictionary(pa.int8(), pa.string())),
+    ("count", pa.int32()),
+    ("max_id", pa.int64()),
+    ("data", pa.binary()),
+])
+
+
+def _empty_pairs():
+    return pd.DataFrame({"genre": pd.Series(dtype=object), "movieId": pd.Series(dtype=np.uint32)})
+
+
+def genre_pairs(df, key="movieId", genres="genres"):
+    """One (genre, movieId) row per membership; genres may be lists or "A|B" strings."""
+    values = df[genres]
+    if values.map(lambda v: isinstance(v, str)).any():
+        values = values.str.split("|")
+    pairs = pd.DataFrame({"genre": values, "movieId": df[key]}).explode("genre").dropna()
+    pairs = pairs[pairs["genre"] != ""]
+    pairs["movieId"] = pd.to_numeric(pairs["movieId"]).astype(np.uint32)
+    return pairs.drop_duplicates(ignore_index=True)
+
+
+def encode_posting(ids):
+    """Pick the smaller of a bitmap and a sorted id array (the Roaring container rule)."""
+    max_id = int(ids[-1]) if len(ids) else 0
+    if (max_id + 1) / 8 < len(ids) * 4:
+        bits = np.zeros(max_id + 1, dtype=bool)
+        bits[ids] = True
+        return "bitmap", max_id, np.packbits(bits, bitorder="little").tobytes()
+    return "array", max_id, ids.astype("<u4").tobytes()
+
+
+def decode_posting(encoding, max_id, data):
+    if encoding == "bitmap":
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=max_id + 1, bitorder="little")
+        return np.flatnonzero(bits).astype(np.uint32)
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32)
+
+
+def combine(postings, all_of=(), any_of=(), none_of=(), universe=None):
+    """Evaluate all_of AND (any_of OR ...) AND NOT none_of over sorted id arrays.
+
+    postings(genre) returns a genre's sorted ids. Without all_of and any_of the
+    result starts from universe (every indexed movie).
+    """
+    result = None
+    # Smallest posting first, so every later intersection works on the fewest ids
+    for ids in sorted((postings(genre) for genre in all_of), key=len):
+        result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+        if not len(result):
+            return EMPTY
+    if any_of:
+        union = np.unique(np.concatenate([postings(genre) for genre in any_of]))
+        result = union if result is None else np.intersect1d(result, union, assume_unique=True)
+    if result is None:
+        if universe is None:
+            raise ValueError("all_of or any_of is required")
+        result = universe
+    for genre in none_of:
+        result = np.setdiff1d(result, postings(genre), assume_unique=True)
+    return result
+
+
+@dataclass
+class IndexDelta:
+    """Memberships an update added and removed, as (genre, movieId) frames."""
+    added: pd.DataFrame = field(default_factory=_empty_pairs)
+    removed: pd.DataFrame = field(default_factory=_empty_pairs)
+
+    def __bool__(self):
+        return bool(len(self.added) or len(self.removed))
+
+    def summary(self):
+        return f"{len(self.added)} memberships added, {len(self.removed)} removed"
+
+
+class GenreIndex:
+    """Inverted index from genre to the sorted movieIds in it.
+
+    Lookups are intersections/unions of small sorted arrays instead of a scan of
+    every movie's genres list. In Parquet each genre is one row holding either a
+    bitmap or a sorted uint32 array, whichever is smaller. update() and remove()
+    touch only the given movies and return the IndexDelta they caused, which
+    GenreAdjacencyTable.apply() writes to DynamoDB.
+    movieIds must be integers (MovieLens ids are; the DynamoDB key is their string form).
+    """
+
+    def __init__(self, postings=None):
+        self.postings = dict(postings or {})
+
+    @classmethod
+    def from_frame(cls, df, key="movieId", genres="genres"):
+        pairs = genre_pairs(df, key, genres)
+        return cls({genre: np.unique(group["movieId"].to_numpy()) for genre, group in pairs.groupby("genre")})
+
+    # Queries
+
+    def genres(self):
+        return sorted(self.postings)
+
+    def ids(self, genre):
+        return self.postings.get(genre, EMPTY)
+
+    def movie_ids(self):
+        """Every indexed movieId."""
+        if not self.postings:
+            return EMPTY
+        return np.unique(np.concatenate(list(self.postings.values())))
+
+    def counts(self):
+        return pd.Series({genre: len(ids) for genre, ids in self.postings.items()}, dtype="int64").sort_index()
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """movieIds in every all_of genre, at least one any_of genre and no none_of genre."""
+        universe = self.movie_ids() if not (all_of or any_of) else None
+        return combine(self.ids, all_of, any_of, none_of, universe=universe)
+
+    # Incremental maintenance
+
+    def _apply(self, ids, pairs):
+        # Replace the memberships of ids with pairs, genre by genre
+        ids = np.unique(np.asarray(ids, dtype=np.uint32))
+        fresh = {genre: np.unique(group["movieId"].to_numpy()) for genre, group in pairs.groupby("genre")}
+        added, removed = [], []
+        for genre in sorted(set(self.postings) | set(fresh)):
+            current = self.postings.get(genre, EMPTY)
+            old = np.intersect1d(current, ids, assume_unique=True)
+            new = fresh.get(genre, EMPTY)
+            gone = np.setdiff1d(old, new, assume_unique=True)
+            joined = np.setdiff1d(new, old, assume_unique=True)
+            if not (len(gone) or len(joined)):
+                continue
+            posting = np.union1d(np.setdiff1d(current, gone, assume_unique=True), joined).astype(np.uint32)
+            if len(posting):
+                self.postings[genre] = posting
+            else:
+                del self.postings[genre]
+            if len(joined):
+                added.append(pd.DataFrame({"genre": genre, "movieId": joined}))
+            if len(gone):
+                removed.append(pd.DataFrame({"genre": genre, "movieId": gone}))
+        return IndexDelta(
+            added=pd.concat(added, ignore_index=True) if added else _empty_pairs(),
+            removed=pd.concat(removed, ignore_index=True) if removed else _empty_pairs(),
+        )
+
+    def update(self, df, key="movieId", genres="genres"):
+        """Upsert the movies in df: their genres become exactly the ones listed there."""
+        return self._apply(pd.to_numeric(df[key]).to_numpy(), genre_pairs(df, key, genres))
+
+    def remove(self, movie_ids):
+        return self._apply(pd.to_numeric(pd.Series(movie_ids)).to_numpy(), _empty_pairs())
+
+    def replace(self, df, key="movieId", genres="genres"):
+        """Make df the complete movie list: update its movies and drop every other one."""
+        ids = np.union1d(self.movie_ids(), pd.to_numeric(df[key]).to_numpy().astype(np.uint32))
+        return self._apply(ids, genre_pairs(df, key, genres))
+
+    # Parquet storage
+
+    def to_table(self):
+        rows = []
+        for genre, ids in sorted(self.postings.items()):
+            encoding, max_id, data = encode_posting(ids)
+            rows.append({"genre": genre, "encoding": encoding, "count": len(ids), "max_id": max_id, "data": data})
+        return pa.Table.from_pylist(rows, schema=SCHEMA)
+
+    @classmethod
+    def from_table(cls, table):
+        columns = table.to_pydict()
+        return cls({
+            genre: decode_posting(encoding, max_id, data)
+            for genre, encoding, max_id, data in zip(columns["genre"], columns["encoding"], columns["max_id"], columns["data"])
+        })
+
+    def save(self, bucket, key, s3_client=None):
+        buffer = io.BytesIO()
+        pq.write_table(self.to_table(), buffer, compression="zstd")
+        (s3_client or pooled_client("s3")).put_object(Bucket=bucket, Key=key, Body=buffer.getvalue())
+        logger.info(f"Genre index: {len(self.postings)} genres, {len(buffer.getvalue())} bytes "
+                    f"-> s3://{bucket}/{key}")
+
+    @classmethod
+    def load(cls, bucket, key, s3_client=None):
+        """The saved index, or an empty one if there is none yet."""
+        s3 = s3_client or pooled_client("s3")
+        try:
+            body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except s3.exceptions.NoSuchKey:
+            logger.info(f"No genre index at s3://{bucket}/{key}, starting an empty one")
+            return cls()
+        return cls.from_table(pq.read_table(io.BytesIO(body)))
+
+
+class GenreAdjacencyTable:
+    """The index as a DynamoDB adjacency list: one item per (genre, movieId) edge.
+
+    The table has partition key genre (S) and sort key movieId (S), so one genre's
+    movies are a single Query. apply() writes only an IndexDelta's changed edges.
+    """
+
+    def __init__(self, table_name, client=None, workers=4):
+        self.table_name = table_name
+        self.workers = workers
+        self.client = client or pooled_client("dynamodb", max_pool_connections=workers)
+
+    @staticmethod
+    def _edges(pairs):
+        return [{"genre": {"S": genre}, "movieId": {"S": str(movie_id)}}
+                for genre, movie_id in zip(pairs["genre"], pairs["movieId"])]
+
+    def apply(self, delta):
+        loader = BulkLoader(self.table_name, client=self.client, workers=self.workers)
+        return loader.load(self._edges(delta.added), delete_keys=self._edges(delta.removed))
+
+    def ids(self, genre):
+        ids = []
+        paginator = self.client.get_paginator("query")
+        for page in paginator.paginate(
+            TableName=self.table_name,
+            KeyConditionExpression="genre = :genre",
+            ExpressionAttributeValues={":genre": {"S": genre}},
+            ProjectionExpression="movieId",
+        ):
+            ids.extend(int(item["movieId"]["S"]) for item in page["Items"])
+        return np.unique(np.asarray(ids, dtype=np.uint32))
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """Same as GenreIndex.query; all_of or any_of is required (there is no cheap universe)."""
+        genres = sorted(set(all_of) | set(any_of) | set(none_of))
+        # One Query per genre, all in parallel
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            postings = dict(zip(genres, pool.map(self.ids, genres)))
+        return combine(postings.__getitem__, all_of, any_of, none_of)
+
+
+def refresh_index(df, bucket, key, full=False, removed=(), adjacency_table=None, s3_client=None):
+    """Apply an ingested frame to the index saved at s3://bucket/key and return the IndexDelta.
+
+    full=True means df is the whole dataset (replace), otherwise its movies are upserted
+    and the movieIds in removed (e.g. items deleted from the table) are dropped.
+    The index is saved, and the adjacency table updated, only when memberships changed.
+    """
+    index = GenreIndex.load(bucket, key, s3_client=s3_client)
+    delta = index.replace(df) if full else index.update(df)
+    if len(removed):
+        gone = index.remove(removed)
+        delta = IndexDelta(added=delta.added, removed=pd.concat([delta.removed, gone.removed], ignore_index=True))
+    logger.info(f"Genre index: {delta.summary()}")
+    if delta:
+        index.save(bucket, key, s3_client=s3_client)
+        if adjacency_table:
+            GenreAdjacencyTable(adjacency_table).apply(delta)
+    return delta
@@ -0,0 +1,107 @@
+# Glue Data Catalog sync: create-or-update tables, bulk partition registration, partition projection
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from .clients import pooled_client
+from .dynamodb_loader import jittered_backoff
+
+logger = logging.getLogger(__name__)
+
+# batch_create_partition accepts at most 100 partitions per call
+BATCH_SIZE = 100
+
+THROTTLING_ERRORS = {"ThrottlingException", "ConcurrentModificationException"}
+
+
+class CatalogSync:
+    """Keep a partitioned Glue table in step with the files written under its location.
+
+    register_partitions() adds partitions with batch_create_partition in 100-partition
+    batches sent concurrently, so Athena sees new data without MSCK REPAIR TABLE.
+    Partitions that already exist are left alone. enable_projection() switches the
+    table to partition projection, where Athena computes partitions from table
+    properties instead of listing them from the catalog.
+    Pass `client` to reuse an existing client or to point at moto.
+    """
+
+    def __init__(self, database, table, client=None, workers=4, max_retries=5):
+        self.database = database
+        self.table = table
+        self.client = client or pooled_client("glue")
+        self.workers = workers
+        self.max_retries = max_retries
+
+    def ensure_table(self, table_input):
+        """create_table, or update_table if it already exists (so scripts can be rerun)."""
+        try:
+            self.client.create_table(DatabaseName=self.database, TableInput=table_input)
+        except self.client.exceptions.AlreadyExistsException:
+            self.client.update_table(DatabaseName=self.database, TableInput=table_input)
+
+    def _create_batch(self, partition_inputs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.batch_create_partition(
+                    DatabaseName=self.database,
+                    TableName=self.table,
+                    PartitionInputList=partition_inputs,
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in THROTTLING_ERRORS or attempt == self.max_retries:
+                    raise
+                jittered_backoff(attempt)
+                continue
+            errors = [e for e in response.get("Errors", [])
+                      if e["ErrorDetail"]["ErrorCode"] != "AlreadyExistsException"]
+            if errors:
+                raise RuntimeError(f"batch_create_partition failed for {len(errors)} partitions: "
+                                   f"{errors[0]['ErrorDetail']}")
+            return len(partition_inputs) - len(response.get("Errors", []))
+
+    def register_partitions(self, partitions):
+        """Register {partition values tuple (or single value): S3 location} and return how many were new."""
+        table = self.client.get_table(DatabaseName=self.database, Name=self.table)["Table"]
+        inputs = []
+        for values, location in partitions.items():
+            values = values if isinstance(values, tuple) else (values,)
+            # Partitions inherit the table's columns and Parquet formats, with their own location
+            descriptor = copy.deepcopy(table["StorageDescriptor"])
+            descriptor["Location"] = location
+            inputs.append({"Values": [str(v) for v in values], "StorageDescriptor": descriptor})
+
+        batches = [inputs[i:i + BATCH_SIZE] for i in range(0, len(inputs), BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            created = sum(pool.map(self._create_batch, batches))
+        logger.info(f"Glue {self.database}.{self.table}: {created} new partitions registered "
+                    f"({len(inputs) - created} already existed) in {len(batches)} batches")
+        return created
+
+    def enable_projection(self, columns, location_template):
+        """Turn on partition projection.
+
+        columns maps partition column -> projection properties without the prefix, e.g.
+        {"release_year": {"type": "integer", "range": "1874,2030"}}
+        {"department": {"type": "enum", "values": "HR,Sales"}}
+        location_template: "s3://bucket/movies/release_year=${release_year}/"
+        """
+        table = self.client.get_table(DatabaseName=self.database, Name=self.table)["Table"]
+        parameters = dict(table.get("Parameters", {}))
+        parameters["projection.enabled"] = "true"
+        parameters["storage.location.template"] = location_template
+        for column, properties in columns.items():
+            for name, value in properties.items():
+                parameters[f"projection.{column}.{name}"] = str(value)
+
+        # update_table takes a TableInput, which excludes read-only fields returned by get_table
+        table_input = {
+            key: table[key]
+            for key in ("Name", "Description", "Owner", "Retention", "StorageDescriptor",
+                        "PartitionKeys", "TableType")
+            if key in table
+        }
+        table_input["Parameters"] = parameters
+        self.client.update_table(DatabaseName=self.database, TableInput=table_input)
+        logger.info(f"Glue {self.database}.{self.table}: partition projection enabled for {', '.join(columns)}")
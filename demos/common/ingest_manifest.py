@@ -0,0 +1,87 @@
+# Manifest of ingested S3 objects and per-partition content hashes for incremental loads
+import hashlib
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+
+def object_info(s3_client, bucket, key):
+    """ETag, size and last-modified time of an input object (one HEAD request)."""
+    head = s3_client.head_object(Bucket=bucket, Key=key)
+    return {
+        "etag": head["ETag"],
+        "size": head["ContentLength"],
+        "last_modified": head["LastModified"].isoformat(),
+    }
+
+
+def hashable_frame(df):
+    # hash_pandas_object can't hash lists (genres); join them into one string per cell
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        first = series.first_valid_index()
+        if series.dtype == object and first is not None and isinstance(series.at[first], (list, tuple, np.ndarray)):
+            series = series.map(lambda v: "\x1f".join(map(str, v)) if isinstance(v, (list, tuple, np.ndarray)) else v)
+        columns[name] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def partition_hashes(df, partition_col):
+    """Return {partition value as str: digest of its rows}, independent of row order.
+
+    Rows with a null partition value are skipped, as the dataset writers skip them.
+    """
+    row_hashes = pd.util.hash_pandas_object(hashable_frame(df.drop(columns=[partition_col])), index=False)
+    hashes = {}
+    for value, rows in row_hashes.groupby(df[partition_col], sort=True):
+        hashes[str(value)] = hashlib.sha256(np.sort(rows.to_numpy()).tobytes()).hexdigest()
+    return hashes
+
+
+class IngestManifest:
+    """What the last successful load saw: input object versions and partition hashes.
+
+    Stored as JSON in S3 (outside the table location, so Athena never reads it).
+    """
+
+    def __init__(self, bucket, key, s3_client=None):
+        self.bucket = bucket
+        self.key = key
+        self.s3 = s3_client or pooled_client("s3")
+        self.objects = {}
+        self.partitions = {}
+        try:
+            body = self.s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+        except self.s3.exceptions.NoSuchKey:
+            logger.info(f"No manifest at s3://{bucket}/{key}, this is a full load")
+            return
+        saved = json.loads(body)
+        self.objects = saved.get("objects", {})
+        self.partitions = saved.get("partitions", {})
+
+    def unchanged(self, uri, info):
+        """True if the input object is byte-for-byte the one already ingested."""
+        return self.objects.get(uri) == info
+
+    def diff(self, hashes):
+        """Return (partitions whose rows changed or are new, partitions that disappeared)."""
+        changed = sorted(value for value, digest in hashes.items() if self.partitions.get(value) != digest)
+        removed = sorted(set(self.partitions) - set(hashes))
+        return changed, removed
+
+    def save(self, uri, info, hashes):
+        self.objects[uri] = info
+        self.partitions = hashes
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Body=json.dumps({"objects": self.objects, "partitions": self.partitions}, indent=1).encode(),
+            ContentType="application/json",
+        )
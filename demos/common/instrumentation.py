@@ -0,0 +1,285 @@
+# Opt-in tracing for the demo pipelines: timed stage spans, AWS call statistics and memory snapshots
+import atexit
+import contextvars
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import botocore.session
+from botocore.utils import determine_content_length
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Error codes AWS services use for throttling (botocore retries all of them)
+THROTTLE_CODES = frozenset({
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "TooManyRequestsException", "ProvisionedThroughputExceededException", "RequestLimitExceeded",
+    "RequestThrottled", "SlowDown", "BandwidthLimitExceeded", "LimitExceededException",
+    "TransactionInProgressException", "EC2ThrottledException", "PriorRequestNotComplete",
+})
+
+_tracer = None
+
+# Per-context state, so several demos in one process (run_demos) and concurrent spans
+# in worker threads are told apart: the demo that called start_tracing(), and the
+# (span_id, CallStats) of every span open around the current code
+_demo = contextvars.ContextVar("demo", default=None)
+_open_spans = contextvars.ContextVar("open_spans", default=())
+
+
+def rss_mb():
+    """(current, peak) resident set size of this process in MB."""
+    # VmHWM is this process image's own high-water mark; on Linux ru_maxrss also
+    # counts the parent's memory copied at fork, even after exec
+    try:
+        status = dict(line.split(":", 1) for line in Path("/proc/self/status").read_text().splitlines())
+        return int(status["VmRSS"].split()[0]) / 1024, int(status["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return None, peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttles: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    seconds: float = 0.0
+
+
+class Tracer:
+    """Collects spans and per-operation AWS call statistics for one process.
+
+    Spans are appended to path as JSON lines as they finish (several runs can share
+    one file, told apart by "run"); a summary line with the AWS call statistics and
+    peak memory is written at exit. With otel=True every span is mirrored to the
+    OpenTelemetry tracer configured for the process.
+    AWS calls are counted on every botocore client created after install(),
+    including the ones awswrangler creates internally. A call counts toward the spans
+    open in the context that made it; threads (and thread pool tasks) started while
+    tracing is on inherit their starter's context, so a writer thread's calls land in
+    its own span and the spans around it, not in whatever else is running.
+    """
+
+    def __init__(self, name, path=None, otel=False):
+        self.name = name
+        self.path = Path(path) if path else None
+        self.run_id = uuid.uuid4().hex[:12]
+        self.aws = defaultdict(CallStats)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._create_client = None
+        self._thread_start = None
+        self._submit = None
+        self._otel = None
+        if otel:
+            try:
+                from opentelemetry import trace
+                self._otel = trace.get_tracer("aws-wrangler-demos")
+            except ImportError:
+                logger.warning("DEMO_TRACE_OTEL is set but opentelemetry is not installed; skipping it")
+
+    # AWS calls
+
+    def install(self):
+        """Instrument every botocore client created from now on."""
+        create_client = self._create_client = botocore.session.Session.create_client
+        tracer = self
+
+        def create_instrumented_client(session, *args, **kwargs):
+            return tracer.instrument(create_client(session, *args, **kwargs))
+
+        botocore.session.Session.create_client = create_instrumented_client
+
+        # Carry the starter's context (demo name, open spans) into new threads and pool tasks
+        thread_start = self._thread_start = threading.Thread.start
+        submit = self._submit = ThreadPoolExecutor.submit
+
+        def start_in_context(thread):
+            run, context = thread.run, contextvars.copy_context()
+            thread.run = lambda: context.run(run)
+            return thread_start(thread)
+
+        def submit_in_context(executor, fn, /, *args, **kwargs):
+            return submit(executor, contextvars.copy_context().run, fn, *args, **kwargs)
+
+        threading.Thread.start = start_in_context
+        ThreadPoolExecutor.submit = submit_in_context
+        atexit.register(self.close)
+
+    def instrument(self, client):
+        events = client.meta.events
+        events.register("before-call", self._before_call)
+        events.register("request-created", self._request_created)
+        events.register("needs-retry", self._needs_retry)
+        events.register("after-call", self._after_call)
+        return client
+
+    @staticmethod
+    def _operation(event_name):
+        # e.g. after-call.dynamodb.BatchWriteItem -> dynamodb.BatchWriteItem
+        return ".".join(event_name.split(".")[1:3])
+
+    def _count(self, event_name, **deltas):
+        # The hooks run in the thread making the call, so _open_spans are that call's spans
+        targets = [stats for _, stats in _open_spans.get()]
+        with self._lock:
+            targets.append(self.aws[self._operation(event_name)])
+            for stats in targets:
+                for name, value in deltas.items():
+                    setattr(stats, name, getattr(stats, name) + value)
+
+    def _before_call(self, event_name, context, **kwargs):
+        context["trace_start"] = time.perf_counter()
+        self._count(event_name, calls=1)
+
+    def _request_created(self, event_name, request, **kwargs):
+        # Streamed uploads (aws-chunked with a trailing checksum) carry their size in a header
+        size = int(request.headers.get("X-Amz-Decoded-Content-Length") or determine_content_length(request.body) or 0)
+        self._count(event_name, bytes_sent=size)
+
+    def _needs_retry(self, event_name, response=None, **kwargs):
+        # Called after every attempt; response is (http_response, parsed) unless the connection failed
+        if response is not None and response[1].get("Error", {}).get("Code") in THROTTLE_CODES:
+            self._count(event_name, throttles=1)
+
+    def _after_call(self, event_name, http_response, parsed, context, **kwargs):
+        self._count(
+            event_name,
+            seconds=time.perf_counter() - context.get("trace_start", time.perf_counter()),
+            bytes_received=int(http_response.headers.get("Content-Length") or 0),
+            retries=parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+            errors=int(http_response.status_code >= 300),
+        )
+
+    def aws_totals(self):
+        totals = CallStats()
+        with self._lock:
+            for stats in self.aws.values():
+                for name, value in asdict(stats).items():
+                    setattr(totals, name, getattr(totals, name) + value)
+        return totals
+
+    # Spans
+
+    @contextmanager
+    def span(self, name, **attributes):
+        enclosing = _open_spans.get()
+        record = {
+            "type": "span",
+            "run": self.run_id,
+            "demo": _demo.get() or self.name,
+            "name": name,
+            "span_id": uuid.uuid4().hex[:8],
+            "parent_id": enclosing[-1][0] if enclosing else None,
+            "thread": threading.current_thread().name,
+            "attributes": attributes,
+            "error": None,
+        }
+        calls = CallStats()
+        token = _open_spans.set(enclosing + ((record["span_id"], calls),))
+        otel = self._otel.start_as_current_span(name, attributes=attributes) if self._otel else nullcontext()
+        rss_start, _ = rss_mb()
+        start = time.perf_counter()
+        with otel as otel_span:
+            try:
+                # The caller may add attributes known only at the end (e.g. rows written)
+                yield attributes
+            except BaseException as exc:
+                record["error"] = repr(exc)
+                raise
+            finally:
+                seconds = time.perf_counter() - start
+                _open_spans.reset(token)
+                rss_end, rss_peak = rss_mb()
+                with self._lock:
+                    aws = asdict(calls)
+                aws["seconds"] = round(aws["seconds"], 6)
+                record.update({
+                    "start": round(start - self._start, 6),
+                    "seconds": round(seconds, 6),
+                    "aws": aws,
+                    "rss_mb": {"start": rss_start, "end": rss_end, "peak": rss_peak},
+                })
+                if otel_span is not None:
+                    otel_span.set_attributes({f"aws.{key}": value for key, value in aws.items()})
+                    otel_span.set_attributes({"memory.rss_mb": rss_end or 0.0, "memory.peak_rss_mb": rss_peak})
+                self._emit(record)
+
+    def _emit(self, record):
+        if self.path is None:
+            return
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._lock:
+            with self.path.open("a") as f:
+                f.write(line + "\n")
+
+    def close(self):
+        if self._create_client is not None:
+            botocore.session.Session.create_client = self._create_client
+            threading.Thread.start = self._thread_start
+            ThreadPoolExecutor.submit = self._submit
+            self._create_client = None
+        _, peak = rss_mb()
+        with self._lock:
+            aws = {operation: asdict(stats) for operation, stats in sorted(self.aws.items())}
+        self._emit({
+            "type": "summary",
+            "run": self.run_id,
+            "demo": self.name,
+            "seconds": round(time.perf_counter() - self._start, 6),
+            "peak_rss_mb": peak,
+            "aws": aws,
+        })
+        totals = self.aws_totals()
+        logger.info(f"Trace {self.run_id}: {totals.calls} AWS calls, {totals.retries} retries, "
+                    f"{totals.throttles} throttled, peak RSS {peak:.0f} MB")
+
+
+def start_tracing(name, path=None, otel=None):
+    """Enable tracing for this process if DEMO_TRACE_PATH or DEMO_TRACE_OTEL is set.
+
+    Call it before creating any boto3 clients. When neither is set nothing is
+    patched and span() returns a no-op context manager. The process keeps one
+    tracer; later calls (each demo under run_demos) only name the spans of the
+    current context, so run every demo in its own contextvars context.
+    """
+    global _tracer
+    path = path if path is not None else os.environ.get("DEMO_TRACE_PATH")
+    if otel is None:
+        otel = os.environ.get("DEMO_TRACE_OTEL", "false").lower() == "true"
+    if _tracer is None and not (path or otel):
+        return None
+    _demo.set(name)
+    if _tracer is None:
+        _tracer = Tracer(name, path=path, otel=otel)
+        _tracer.install()
+    return _tracer
+
+
+def span(name, **attributes):
+    """Time a pipeline stage (with span("parquet_encode", rows=len(df)) as stage: ...).
+
+    The context value is the span's attribute dict, so callers can add results to it;
+    when tracing is off it is just the (discarded) attributes.
+    """
+    if _tracer is None:
+        return nullcontext(attributes)
+    return _tracer.span(name, **attributes)
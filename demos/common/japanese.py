@@ -0,0 +1,77 @@
+# Japanese text normalization applied once per distinct value, memoized across runs
+import json
+import logging
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump when normalize_text changes so cached results from older runs are discarded
+NORMALIZER_VERSION = 1
+
+# Half-width, full-width (U+3000) and other Unicode whitespace
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(value):
+    """jaconv.hira2kata(jaconv.z2h(value)) with stray spaces removed ("ア ナリス ト" -> "ｱﾅﾘｽﾄ")."""
+    # Imported on first use, so loading this module (e.g. in demos/run_demos.py) stays cheap
+    import jaconv
+    return _SPACES.sub("", jaconv.hira2kata(jaconv.z2h(value)))
+
+
+class TextNormalizer:
+    """Normalize string columns by converting each distinct value only once.
+
+    Columns like title and department repeat a handful of values across many rows,
+    so the column is factorized, the uniques are normalized (looked up in the
+    memo first) and the result is expanded back with one take(). With cache_path
+    the memo is stored as JSON and reused by later runs; call save() to write it.
+    """
+
+    def __init__(self, cache_path=None, normalize=normalize_text):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.normalize = normalize
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path is not None and self.cache_path.exists():
+            saved = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            if saved.get("version") == NORMALIZER_VERSION:
+                self.memo = saved["values"]
+
+    def normalize_series(self, series):
+        codes, uniques = pd.factorize(series)
+        normalized = np.empty(len(uniques) + 1, dtype=object)
+        for i, value in enumerate(uniques):
+            value = str(value)
+            result = self.memo.get(value)
+            if result is None:
+                result = self.memo[value] = self.normalize(value)
+                self.misses += 1
+            else:
+                self.hits += 1
+            normalized[i] = result
+        # Missing values have code -1, which picks the trailing None
+        normalized[-1] = None
+        return pd.Series(normalized[codes], index=series.index, name=series.name)
+
+    def normalize_columns(self, df, columns):
+        """Return a copy of df with the given columns normalized."""
+        df = df.copy()
+        for column in columns:
+            df[column] = self.normalize_series(df[column])
+        logger.info(f"Normalized {len(df)} rows x {len(columns)} columns: "
+                    f"{self.misses} values converted, {self.hits} served from memo")
+        return df
+
+    def save(self):
+        if self.cache_path is None:
+            return
+        tmp = self.cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": NORMALIZER_VERSION, "values": self.memo}, ensure_ascii=False),
+                       encoding="utf-8")
+        tmp.replace(self.cache_path)
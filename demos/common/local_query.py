@@ -0,0 +1,593 @@
+# Local query engine for simple SELECTs over Glue-registered Parquet tables (no Athena round trip)
+import logging
+import re
+import time
+from itertools import product
+from urllib.parse import urlparse
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from .athena_unload import _PANDAS_TYPES
+from .clients import pooled_client, session
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Glue/Hive partition key types -> Arrow types (anything else is read as a string)
+_GLUE_TYPES = {
+    "tinyint": pa.int8(),
+    "smallint": pa.int16(),
+    "int": pa.int32(),
+    "integer": pa.int32(),
+    "bigint": pa.int64(),
+    "float": pa.float32(),
+    "double": pa.float64(),
+    "boolean": pa.bool_(),
+    "date": pa.date32(),
+}
+
+
+def glue_type(text):
+    """Arrow type of a Glue column type such as bigint, decimal(10,2) or array<string>."""
+    text = text.strip().lower()
+    if text in _GLUE_TYPES:
+        return _GLUE_TYPES[text]
+    if text.startswith("array<") and text.endswith(">"):
+        return pa.list_(glue_type(text[6:-1]))
+    if text.startswith("decimal(") and text.endswith(")"):
+        precision, scale = (int(part) for part in text[8:-1].split(","))
+        return pa.decimal128(precision, scale)
+    if text == "timestamp":
+        return pa.timestamp("ms")
+    return pa.string()
+
+
+def partition_path_value(value, type_):
+    """How a Hive partition path spells the literal value for a key of type_.
+
+    None means no partition can hold it (e.g. 1995.5 for an integer key). Raises
+    UnsupportedQuery for literals Athena wouldn't compare with the key either (a
+    string against an integer key); returns False for key types whose path
+    spelling isn't fixed (float, date), which pyarrow prunes after listing instead.
+    """
+    if pa.types.is_boolean(type_):
+        if not isinstance(value, bool):
+            raise UnsupportedQuery(f"Can't compare a boolean partition key with {value!r}")
+        return str(value).lower()
+    if pa.types.is_integer(type_):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise UnsupportedQuery(f"Can't compare an integer partition key with {value!r}")
+        # 1995.0 is partition 1995
+        return str(int(value)) if float(value).is_integer() else None
+    if pa.types.is_string(type_):
+        if not isinstance(value, str):
+            raise UnsupportedQuery(f"Can't compare a string partition key with {value!r}")
+        return value
+    return False
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^']|'')*')
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<name>"[^"]+"|[A-Za-z_][\w-]*)
+      | (?P<op><=|>=|<>|!=|=|<|>|\(|\)|,|\*|\.)
+    )""", re.X)
+
+_COMPARISONS = {"=": pc.equal, "<>": pc.not_equal, "!=": pc.not_equal,
+                "<": pc.less, "<=": pc.less_equal, ">": pc.greater, ">=": pc.greater_equal}
+
+
+class UnsupportedQuery(ValueError):
+    """The query is outside what the local engine handles; run it on Athena instead."""
+
+
+# Parsing: SELECT columns FROM table [WHERE predicate] [ORDER BY ...] [LIMIT n]
+# Predicates are AND/OR/NOT over comparisons, IN, BETWEEN, IS [NOT] NULL, LIKE and
+# contains(array_column, value), as nested tuples, e.g. ("cmp", "release_year", "=", 1995)
+
+class _Parser:
+    def __init__(self, sql):
+        sql = sql.strip().rstrip(";")
+        self.tokens = []
+        position = 0
+        while position < len(sql):
+            match = _TOKEN.match(sql, position)
+            if not match or match.end() == position:
+                if sql[position:].strip():
+                    raise UnsupportedQuery(f"Can't tokenize: {sql[position:position + 20]!r}")
+                break
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == "string":
+                self.tokens.append(("value", text[1:-1].replace("''", "'")))
+            elif kind == "number":
+                self.tokens.append(("value", float(text) if "." in text else int(text)))
+            elif kind == "name" and text.startswith('"'):
+                self.tokens.append(("name", text[1:-1]))
+            elif kind == "name":
+                self.tokens.append(("name", text))
+            else:
+                self.tokens.append(("op", text))
+            position = match.end()
+        self.position = 0
+
+    def peek(self, *keywords):
+        if self.position >= len(self.tokens):
+            return False
+        kind, text = self.tokens[self.position]
+        if not keywords:
+            return True
+        return kind in ("name", "op") and str(text).lower() in keywords
+
+    def take(self, *keywords):
+        if keywords and not self.peek(*keywords):
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else "end of query"
+            raise UnsupportedQuery(f"Expected {' or '.join(keywords)}, found {found!r}")
+        if self.position >= len(self.tokens):
+            raise UnsupportedQuery("Unexpected end of query")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def optional(self, keyword):
+        if self.peek(keyword):
+            self.take(keyword)
+            return True
+        return False
+
+    def name(self):
+        kind, text = self.take()
+        if kind != "name":
+            raise UnsupportedQuery(f"Expected a column or table name, found {text!r}")
+        return text.lower()
+
+    def value(self):
+        kind, text = self.take()
+        if kind == "name" and text.lower() in ("true", "false"):
+            return text.lower() == "true"
+        if kind != "value":
+            raise UnsupportedQuery(f"Expected a literal, found {text!r}")
+        return text
+
+    def values(self):
+        self.take("(")
+        values = [self.value()]
+        while self.peek(","):
+            self.take(",")
+            values.append(self.value())
+        self.take(")")
+        return values
+
+    def query(self):
+        self.take("select")
+        if self.peek("distinct"):
+            raise UnsupportedQuery("DISTINCT is not supported")
+        columns = []
+        if self.peek("*"):
+            self.take("*")
+            columns = None
+        else:
+            while True:
+                column = self.name()
+                if self.peek("("):
+                    raise UnsupportedQuery(f"Functions in the select list are not supported ({column})")
+                alias = column
+                if self.peek("as"):
+                    self.take("as")
+                    alias = self.name()
+                columns.append((column, alias))
+                if not self.peek(","):
+                    break
+                self.take(",")
+        self.take("from")
+        table = self.name()
+        database = None
+        if self.peek("."):
+            self.take(".")
+            database, table = table, self.name()
+        where = None
+        if self.peek("where"):
+            self.take("where")
+            where = self.predicate()
+        order_by = []
+        if self.peek("order"):
+            self.take("order")
+            self.take("by")
+            while True:
+                column = self.name()
+                descending = False
+                if self.peek("asc", "desc"):
+                    descending = self.take()[1].lower() == "desc"
+                order_by.append((column, "descending" if descending else "ascending"))
+                if not self.peek(","):
+                    break
+                self.take(",")
+        limit = None
+        if self.peek("limit"):
+            self.take("limit")
+            limit = self.value()
+            # Athena accepts only a non-negative integer here (no LIMIT 2.5 or LIMIT 'x')
+            if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+                raise UnsupportedQuery(f"LIMIT must be a non-negative integer, not {limit!r}")
+        if self.peek():
+            raise UnsupportedQuery(f"Unsupported clause: {self.tokens[self.position][1]!r}")
+        return {"columns": columns, "database": database, "table": table,
+                "where": where, "order_by": order_by, "limit": limit}
+
+    def predicate(self):
+        terms = [self.conjunction()]
+        while self.peek("or"):
+            self.take("or")
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else ("or", terms)
+
+    def conjunction(self):
+        terms = [self.negation()]
+        while self.peek("and"):
+            self.take("and")
+            terms.append(self.negation())
+        return terms[0] if len(terms) == 1 else ("and", terms)
+
+    def negation(self):
+        if self.peek("not"):
+            self.take("not")
+            return ("not", self.negation())
+        if self.peek("("):
+            self.take("(")
+            term = self.predicate()
+            self.take(")")
+            return term
+        column = self.name()
+        if column == "contains" and self.peek("("):
+            self.take("(")
+            column = self.name()
+            self.take(",")
+            value = self.value()
+            self.take(")")
+            return ("contains", column, value)
+        if self.peek("("):
+            raise UnsupportedQuery(f"Function {column}() is not supported")
+        if self.peek("is"):
+            self.take("is")
+            negated = self.optional("not")
+            self.take("null")
+            return ("null", column, not negated)
+        negated = self.optional("not")
+        if self.peek("in"):
+            self.take("in")
+            term = ("in", column, self.values())
+        elif self.peek("between"):
+            self.take("between")
+            low = self.value()
+            self.take("and")
+            term = ("between", column, low, self.value())
+        elif self.peek("like"):
+            self.take("like")
+            term = ("like", column, self.value())
+        elif not negated and self.peek(*_COMPARISONS):
+            term = ("cmp", column, self.take()[1], self.value())
+        else:
+            raise UnsupportedQuery(f"Unsupported condition on {column}")
+        return ("not", term) if negated else term
+
+
+def parse_query(sql):
+    """Parse a simple SELECT into a dict (columns, table, where, order_by, limit).
+
+    Raises UnsupportedQuery for joins, aggregates, functions other than contains(), etc.
+    """
+    return _Parser(sql).query()
+
+
+def predicate_columns(node):
+    if node is None:
+        return set()
+    if node[0] in ("and", "or"):
+        return set().union(*(predicate_columns(term) for term in node[1]))
+    if node[0] == "not":
+        return predicate_columns(node[1])
+    return {node[1]}
+
+
+def partition_values(node, key):
+    """Values a partition key is limited to by top-level AND-ed =/IN conditions (None = any)."""
+    if node is None:
+        return None
+    terms = node[1] if node[0] == "and" else [node]
+    allowed = None
+    for term in terms:
+        if term[0] == "cmp" and term[1] == key and term[2] == "=":
+            values = {term[3]}
+        elif term[0] == "in" and term[1] == key:
+            values = set(term[2])
+        else:
+            continue
+        allowed = values if allowed is None else allowed & values
+    return allowed
+
+
+def to_expression(node, fields):
+    """The part of the predicate pyarrow can push into the scan (None if nothing).
+
+    The scan uses it to skip partitions and row groups (min/max statistics);
+    AND-ed terms it can't express, such as contains(), are applied after reading.
+    """
+    kind = node[0]
+    if kind == "and":
+        parts = [part for part in (to_expression(term, fields) for term in node[1]) if part is not None]
+        if not parts:
+            return None
+        expression = parts[0]
+        for part in parts[1:]:
+            expression = expression & part
+        return expression
+    if kind in ("or", "not"):
+        parts = [to_expression(term, fields) for term in (node[1] if kind == "or" else [node[1]])]
+        if any(part is None for part in parts):
+            return None
+        if kind == "not":
+            return ~parts[0]
+        expression = parts[0]
+        for part in parts[1:]:
+            expression = expression | part
+        return expression
+    if kind == "contains":
+        return None
+    field = pc.field(fields[node[1]])
+    if kind == "cmp":
+        return _COMPARISONS[node[2]](field, node[3])
+    if kind == "in":
+        return field.isin(node[2])
+    if kind == "between":
+        return (field >= node[2]) & (field <= node[3])
+    if kind == "null":
+        return field.is_null() if node[2] else field.is_valid()
+    if kind == "like":
+        return pc.match_like(field, node[2])
+    raise UnsupportedQuery(f"Unsupported condition {kind}")
+
+
+def predicate_pushed(node):
+    """True if to_expression() covers the whole predicate (no post-filter needed)."""
+    if node[0] in ("and", "or"):
+        return all(predicate_pushed(term) for term in node[1])
+    if node[0] == "not":
+        return predicate_pushed(node[1])
+    return node[0] != "contains"
+
+
+def evaluate(node, table, fields):
+    """Boolean mask of the rows in table that satisfy the whole predicate (SQL NULL = no match)."""
+    kind = node[0]
+    if kind == "and":
+        masks = [evaluate(term, table, fields) for term in node[1]]
+        result = masks[0]
+        for mask in masks[1:]:
+            result = pc.and_kleene(result, mask)
+        return result
+    if kind == "or":
+        masks = [evaluate(term, table, fields) for term in node[1]]
+        result = masks[0]
+        for mask in masks[1:]:
+            result = pc.or_kleene(result, mask)
+        return result
+    if kind == "not":
+        return pc.invert(evaluate(node[1], table, fields))
+    column = table.column(fields[node[1]])
+    if kind == "contains":
+        lists = column.combine_chunks()
+        hits = pc.equal(pc.list_flatten(lists), pa.scalar(node[2]))
+        rows = pc.filter(pc.list_parent_indices(lists), pc.fill_null(hits, False)).to_numpy()
+        mask = np.zeros(len(lists), dtype=bool)
+        mask[rows] = True
+        return pa.array(mask)
+    if kind == "cmp":
+        return _COMPARISONS[node[2]](column, node[3])
+    if kind == "in":
+        return pc.is_in(column, value_set=pa.array(node[2]))
+    if kind == "between":
+        return pc.and_kleene(pc.greater_equal(column, node[2]), pc.less_equal(column, node[3]))
+    if kind == "null":
+        return pc.is_null(column) if node[2] else pc.is_valid(column)
+    if kind == "like":
+        return pc.match_like(column, node[2])
+    raise UnsupportedQuery(f"Unsupported condition {kind}")
+
+
+def s3_filesystem(s3_client=None):
+    """pyarrow S3 filesystem with the boto3 session's credentials, region and endpoint (moto, LocalStack)."""
+    s3 = s3_client or pooled_client("s3")
+    credentials = session().get_credentials().get_frozen_credentials()
+    endpoint = urlparse(s3.meta.endpoint_url)
+    kwargs = {}
+    if not endpoint.hostname.endswith("amazonaws.com"):
+        kwargs = {"endpoint_override": endpoint.netloc, "scheme": endpoint.scheme}
+    return pafs.S3FileSystem(
+        access_key=credentials.access_key,
+        secret_key=credentials.secret_key,
+        session_token=credentials.token,
+        region=s3.meta.region_name,
+        **kwargs,
+    )
+
+
+class LocalQueryEngine:
+    """Run simple SELECTs on a Glue table's Parquet files in this process instead of Athena.
+
+    The table definition (location, partition keys and their types) comes from Glue.
+    Partitions are pruned from =/IN conditions on partition keys before anything is
+    listed; the remaining predicate, where pyarrow can express it, is pushed into the
+    scan together with the column projection, so only the needed column chunks of
+    row groups whose min/max statistics can match are read. Everything else in the
+    WHERE clause (e.g. contains()) is applied after reading.
+
+    Queries it can't run (joins, aggregates, non-Parquet tables) raise
+    UnsupportedQuery, and so do scans over max_scan_bytes of files; read_sql_query()
+    hands both to its run fallback. Pass filesystem to read a copy of the data
+    elsewhere (e.g. pyarrow.fs.SubTreeFileSystem over a local directory that holds
+    <bucket>/<prefix>); by default s3:// locations use S3 (and its moto endpoint)
+    and file:// or plain paths the local filesystem.
+    """
+
+    def __init__(self, glue_client=None, s3_client=None, filesystem=None, max_scan_bytes=256 * MB):
+        self.glue = glue_client or pooled_client("glue")
+        self.s3 = s3_client
+        self.filesystem = filesystem
+        self.max_scan_bytes = max_scan_bytes
+        self._tables = {}
+        self.last_scan = None
+
+    def table_definition(self, database, table):
+        key = (database, table)
+        if key not in self._tables:
+            definition = self.glue.get_table(DatabaseName=database, Name=table)["Table"]
+            descriptor = definition["StorageDescriptor"]
+            serde = descriptor.get("SerdeInfo", {}).get("SerializationLibrary", "")
+            if "parquet" not in (descriptor.get("InputFormat", "") + serde).lower():
+                raise UnsupportedQuery(f"{database}.{table} is not a Parquet table")
+            self._tables[key] = {
+                "location": descriptor["Location"],
+                "columns": [column["Name"].lower() for column in descriptor.get("Columns", [])],
+                "partition_keys": [
+                    (column["Name"].lower(), _GLUE_TYPES.get(column["Type"].lower(), pa.string()))
+                    for column in definition.get("PartitionKeys", [])
+                ],
+                # Declared data column types, for results that match no files
+                "types": {column["Name"].lower(): glue_type(column["Type"]) for column in descriptor.get("Columns", [])},
+            }
+        return self._tables[key]
+
+    def _filesystem(self, location):
+        parsed = urlparse(location)
+        if self.filesystem is not None:
+            return self.filesystem, f"{parsed.netloc}{parsed.path}".rstrip("/")
+        if parsed.scheme in ("s3", "s3a"):
+            return s3_filesystem(self.s3), f"{parsed.netloc}{parsed.path}".rstrip("/")
+        return pafs.LocalFileSystem(), (parsed.path if parsed.scheme == "file" else location).rstrip("/")
+
+    def _files(self, filesystem, base, partition_keys, where):
+        # Leading partition keys fixed by the predicate become path prefixes; the
+        # rest are pruned by pyarrow from the partition values in the paths
+        fixed = []
+        for name, type_ in partition_keys:
+            values = partition_values(where, name)
+            if values is None:
+                break
+            # Spelled as in the paths, so 1995.0 reads release_year=1995/
+            spelled = {partition_path_value(value, type_) for value in values}
+            if False in spelled:
+                break
+            fixed.append([f"{name}={value}" for value in sorted(spelled - {None})])
+        prefixes = ["/".join([base, *parts]) for parts in product(*fixed)]
+        files = []
+        for prefix in prefixes:
+            if filesystem.get_file_info(prefix).type != pafs.FileType.Directory:
+                continue
+            for info in filesystem.get_file_info(pafs.FileSelector(prefix, recursive=True)):
+                name = info.base_name
+                if info.type == pafs.FileType.File and info.size and not name.startswith(("_", ".")):
+                    files.append(info)
+        # Same file (and so row) order on every filesystem
+        files.sort(key=lambda info: info.path)
+        return files, len(prefixes) if fixed else None
+
+    def query(self, sql, database):
+        """Run sql locally and return the result as an Arrow table (column names lower-cased)."""
+        start = time.perf_counter()
+        query = parse_query(sql)
+        definition = self.table_definition(query["database"] or database, query["table"])
+        partition_keys = definition["partition_keys"]
+        filesystem, base = self._filesystem(definition["location"])
+
+        files, partitions = self._files(filesystem, base, partition_keys, query["where"])
+        scan_bytes = sum(info.size for info in files)
+        if scan_bytes > self.max_scan_bytes:
+            raise UnsupportedQuery(f"{scan_bytes / MB:.0f} MB of files to scan, over the "
+                                   f"{self.max_scan_bytes / MB:.0f} MB local limit")
+
+        partition_names = [name for name, _ in partition_keys]
+        if not files:
+            # Nothing matches the partition filter: an empty result, as Athena would return,
+            # typed from the Glue schema so it has the dtypes a non-empty result would have
+            types = {**definition["types"], **dict(partition_keys)}
+            columns = query["columns"] or [(c, c) for c in definition["columns"] + partition_names]
+            missing = sorted({c for c, _ in columns if c not in types})
+            if missing:
+                raise UnsupportedQuery(f"Unknown columns: {', '.join(missing)}")
+            empty = pa.schema([(alias, types[c]) for c, alias in columns]).empty_table()
+            return self._finish(empty, start, files, partitions)
+
+        partitioning = ds.partitioning(pa.schema(partition_keys), flavor="hive") if partition_keys else None
+        # The listing's FileInfos (with sizes) spare pyarrow a HEAD request per file
+        options = ds.FileSystemFactoryOptions(partition_base_dir=base, partitioning=partitioning)
+        dataset = ds.FileSystemDatasetFactory(filesystem, files, ds.ParquetFileFormat(), options).finish()
+        # SQL names are case-insensitive; files may hold e.g. movieId
+        fields = {name.lower(): name for name in dataset.schema.names}
+        if query["columns"] is None:
+            # SELECT *: the Glue column order, partition keys last (as in Athena)
+            data_columns = [c for c in definition["columns"] if c in fields]
+            data_columns = data_columns or [c for c in fields if c not in partition_names]
+            query["columns"] = [(name, name) for name in data_columns + partition_names]
+        needed = [c for c, _ in query["columns"]] + sorted(predicate_columns(query["where"]))
+        needed += [c for c, _ in query["order_by"]]
+        missing = sorted({c for c in needed if c not in fields})
+        if missing:
+            raise UnsupportedQuery(f"Unknown columns: {', '.join(missing)}")
+
+        read = list(dict.fromkeys(fields[c] for c in needed))
+        pushed = to_expression(query["where"], fields) if query["where"] is not None else None
+        exact = query["where"] is None or predicate_pushed(query["where"])
+        # With the whole filter pushed down, LIMIT without ORDER BY stops the scan early
+        head_only = exact and query["limit"] is not None and not query["order_by"]
+        try:
+            if head_only:
+                table = dataset.head(query["limit"], columns=read, filter=pushed)
+            else:
+                table = dataset.to_table(columns=read, filter=pushed)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            # e.g. files whose column types disagree (Athena fails on those as well)
+            raise UnsupportedQuery(f"Can't read {query['table']} locally: {e}") from e
+        if not exact:
+            table = table.filter(pc.fill_null(evaluate(query["where"], table, fields), False))
+        if query["order_by"]:
+            table = table.sort_by([(fields[c], order) for c, order in query["order_by"]])
+        if query["limit"] is not None and not head_only:
+            table = table.slice(0, query["limit"])
+
+        table = table.select([fields[c] for c, _ in query["columns"]])
+        table = table.rename_columns([alias for _, alias in query["columns"]])
+        return self._finish(table, start, files, partitions)
+
+    def _finish(self, table, start, files, partitions):
+        scan_bytes = sum(info.size for info in files)
+        self.last_scan = {
+            "files": len(files),
+            "partitions": partitions,
+            "bytes": scan_bytes,
+            "rows": table.num_rows,
+            "seconds": time.perf_counter() - start,
+        }
+        logger.info(f"Local query: {table.num_rows} rows from {len(files)} files "
+                    f"({scan_bytes / MB:.1f} MB) in {self.last_scan['seconds']:.3f}s")
+        return table
+
+    def read_sql_query(self, sql, database, run=None):
+        """Like wr.athena.read_sql_query(sql, database); falls back to run() when given.
+
+        Columns come back lower-cased with the same nullable/Arrow-backed dtypes as
+        Athena results (see common.athena_unload).
+        """
+        try:
+            table = self.query(sql, database)
+        except UnsupportedQuery as e:
+            if run is None:
+                raise
+            logger.info(f"Running on Athena instead: {e}")
+            return run()
+        return table.to_pandas(types_mapper=_PANDAS_TYPES.get)
@@ -0,0 +1,221 @@
+# Read-through cache for DynamoDB key lookups: in-process LRU + optional on-disk tier
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Cached marker for keys DynamoDB doesn't have, so they aren't fetched again until expiry
+NOT_FOUND = "__not_found__"
+
+# An eventually consistent read of an item up to 4 KB costs 0.5 RCU
+RCU_PER_ITEM = 0.5
+
+# Disk tier location for the demos: the user's own cache directory, not world-writable /tmp
+DEFAULT_DISK_PATH = str(Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+                        / "aws-wrangler-demos" / "dynamodb_lookup_cache.sqlite")
+
+
+def _encode_value(value):
+    # DynamoDB numbers and sets (and numpy values from DataFrame records) as tagged JSON
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": sorted(value, key=str)}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA:
+        return None
+    raise TypeError(f"{type(value).__name__} is not cacheable")
+
+
+def _decode_value(value):
+    if "__decimal__" in value:
+        return Decimal(value["__decimal__"])
+    if "__set__" in value:
+        return set(value["__set__"])
+    return value
+
+
+def dumps(value):
+    return json.dumps(value, default=_encode_value)
+
+
+def loads(text):
+    return json.loads(text, object_hook=_decode_value)
+
+
+class LookupCache:
+    """Two-tier cache of DynamoDB items keyed by partition key value.
+
+    The memory tier is an LRU with a TTL; the optional disk tier (SQLite file at
+    disk_path) survives between runs and can be shared with writer processes,
+    which call invalidate()/clear() after they change the table. The disk tier
+    stores items as JSON (Decimal and set tagged), never pickles, so a planted
+    file can't run code; rows it can't decode count as misses.
+    Entries are namespaced by table so one file can serve several tables. Readers
+    that cache partial items (e.g. a ProjectionExpression) use "table#variant";
+    invalidate()/clear() on "table" cover those variants too.
+    """
+
+    def __init__(self, namespace, max_entries=10_000, ttl=300, disk_path=None, disk_ttl=86_400):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            Path(disk_path).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "namespace TEXT, key TEXT, value BLOB, expires REAL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def _remember(self, key, value, now):
+        self._memory[key] = (value, now + self.ttl)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Return ({key: item or NOT_FOUND} for cached keys, [keys to fetch])."""
+        found, pending = {}, []
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None and entry[1] > now:
+                    self._memory.move_to_end(key)
+                    found[key] = entry[0]
+                    self.memory_hits += 1
+                else:
+                    pending.append(key)
+
+            missing = pending
+            if self._db is not None and pending:
+                missing = []
+                for key in pending:
+                    row = self._db.execute(
+                        "SELECT value FROM items WHERE namespace = ? AND key = ? AND expires > ?",
+                        (self.namespace, key, now),
+                    ).fetchone()
+                    try:
+                        value = loads(row[0]) if row is not None else None
+                    except (TypeError, ValueError):
+                        # Not JSON (e.g. written by an older version): fetch it again
+                        row = None
+                    if row is None:
+                        missing.append(key)
+                        continue
+                    found[key] = value
+                    self._remember(key, value, now)
+                    self.disk_hits += 1
+            self.misses += len(missing)
+        return found, missing
+
+    def put_many(self, items):
+        now = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value, now)
+            if self._db is not None and items:
+                rows = []
+                for key, value in items.items():
+                    try:
+                        rows.append((self.namespace, key, dumps(value), now + self.disk_ttl))
+                    except (TypeError, ValueError) as e:
+                        # Kept in memory only
+                        logger.debug(f"Not caching {key} on disk: {e}")
+                self._db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+
+    def invalidate(self, keys):
+        """Drop the given keys from both tiers (call after writing those items)."""
+        keys = [str(k) for k in keys]
+        with self._lock:
+            for key in keys:
+                self._memory.pop(key, None)
+            if self._db is not None:
+                prefix = f"{self.namespace}#"
+                self._db.executemany(
+                    "DELETE FROM items WHERE (namespace = ? OR substr(namespace, 1, ?) = ?) AND key = ?",
+                    [(self.namespace, len(prefix), prefix, k) for k in keys],
+                )
+                self._db.commit()
+
+    def clear(self):
+        """Drop every cached item for this namespace (e.g. after a bulk reload)."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                # Exact prefix match: LIKE would treat _ and % in table names as wildcards
+                prefix = f"{self.namespace}#"
+                self._db.execute(
+                    "DELETE FROM items WHERE namespace = ? OR substr(namespace, 1, ?) = ?",
+                    (self.namespace, len(prefix), prefix),
+                )
+                self._db.commit()
+
+    @property
+    def hits(self):
+        return self.memory_hits + self.disk_hits
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "rcu_saved": self.hits * RCU_PER_ITEM,
+        }
+
+
+class CachedTable:
+    """Read-through wrapper: only keys missing from the cache are passed to fetch.
+
+    fetch(keys) must return a DataFrame with one row per key found and a key_name
+    column, e.g. BatchGetEngine.get or a wr.dynamodb.read_items call.
+    """
+
+    def __init__(self, fetch, key_name, cache):
+        self.fetch = fetch
+        self.key_name = key_name
+        self.cache = cache
+
+    def get(self, key_values):
+        keys = list(dict.fromkeys(str(k) for k in key_values))
+        found, missing = self.cache.get_many(keys)
+
+        if missing:
+            fetched = self.fetch(missing)
+            records = fetched.to_dict("records") if len(fetched) else []
+            new_items = {str(record[self.key_name]): record for record in records}
+            # Remember keys the table doesn't have as well, so they aren't re-fetched
+            new_items.update({key: NOT_FOUND for key in missing if key not in new_items})
+            self.cache.put_many(new_items)
+            found.update(new_items)
+
+        stats = self.cache.stats()
+        logger.info(f"Lookup cache: {len(keys) - len(missing)} of {len(keys)} keys served from cache "
+                    f"({stats['hit_rate']:.0%} hit rate overall, {stats['rcu_saved']:.1f} RCU saved)")
+        rows = [found[key] for key in keys if found[key] != NOT_FOUND]
+        return pd.DataFrame.from_records(rows)
@@ -0,0 +1,107 @@
+# MovieLens helpers shared by the ingest demos (01, 04, 06)
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Full title grammar: "Title (Alt Title) (1995)"
+# - title: everything before the optional alias and the year, surrounding spaces dropped
+# - alt_title: foreign/alternate title in parentheses, with any "a.k.a." prefix removed
+# - release_year: the first 4-digit year in parentheses
+# Capturing regexes are slow even in RE2, so this pattern only runs on the few titles
+# that don't end in "(YYYY)"; everything else goes through plain string kernels
+TITLE_PATTERN = (
+    r'^(?P<title>.*?)'
+    r'(?:\s*\((?:a\.k\.a\.\s*)?(?P<alt_title>[^()]*)\))?'
+    r'\s*\((?P<release_year>\d{4})\)'
+)
+
+# Keep columns Arrow-backed / nullable when converting back to pandas (no object columns)
+_PANDAS_TYPES = {
+    pa.string(): pd.StringDtype("pyarrow"),
+    pa.large_string(): pd.StringDtype("pyarrow"),
+    pa.int32(): pd.Int32Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+def _to_arrow_strings(titles):
+    # Arrow-backed pandas columns and Arrow arrays are used as-is, anything else is converted once
+    if not isinstance(titles, (pa.Array, pa.ChunkedArray)):
+        titles = pa.array(titles, type=pa.string(), from_pandas=True)
+    if isinstance(titles, pa.ChunkedArray):
+        titles = titles.combine_chunks()
+    return titles.cast(pa.string())
+
+
+def _replace(values, mask, replacements):
+    # Scatter the values computed for a filtered subset back into the full column
+    if not len(replacements):
+        return values
+    return pc.replace_with_mask(values, mask, replacements)
+
+
+def parse_titles(titles, detect_remakes=False):
+    """Split MovieLens titles into title, release_year and alt_title columns.
+
+    Titles without a year keep their full (trimmed) text and get a null year.
+    With detect_remakes=True an is_remake column flags titles that already
+    appeared with an earlier year in the same input.
+    """
+    trimmed = pc.utf8_trim_whitespace(_to_arrow_strings(titles))
+    null_string = pa.scalar(None, pa.string())
+
+    # Fast path: nearly every title ends in "(YYYY)", a fixed-width ASCII suffix.
+    # Byte slices are much cheaper than UTF-8 aware ones and are safe here because
+    # the cut always lands right before the ASCII "(".
+    raw = trimmed.cast(pa.binary())
+    has_year = pc.fill_null(pc.match_substring_regex(pc.binary_slice(raw, -6), r'^\(\d{4}\)$'), False)
+    title = pc.utf8_rtrim_whitespace(pc.if_else(has_year, pc.binary_slice(raw, 0, -6), raw).view(pa.string()))
+    year = pc.if_else(has_year, pc.binary_slice(raw, -5, -1).view(pa.string()), null_string)
+    alt_title = pa.nulls(len(trimmed), pa.string())
+
+    # Alternate titles: "City of Lost Children, The (Cité des enfants perdus, La)"
+    # Only titles with a year whose remaining text ends in ")" are split, on the last " ("
+    maybe_alias = pc.and_(has_year, pc.fill_null(pc.ends_with(title, ')'), False))
+    parts = pc.split_pattern(pc.filter(title, maybe_alias), ' (', max_splits=1, reverse=True)
+    split_ok = pc.equal(pc.list_value_length(parts), 2)
+    parts = pc.filter(parts, split_ok)
+    has_alias = _replace(maybe_alias, maybe_alias, split_ok)
+    alias = pc.utf8_slice_codeunits(pc.list_element(parts, 1), 0, -1)
+    alias = pc.replace_substring_regex(alias, r'^a\.k\.a\.\s*', '')
+    title = _replace(title, has_alias, pc.utf8_rtrim_whitespace(pc.list_element(parts, 0)))
+    alt_title = _replace(alt_title, has_alias, alias)
+
+    # Slow path: the year is somewhere in the middle ("Title (1995) (TV)") - run the full regex
+    no_year = pc.invert(has_year)
+    mid_year = pc.fill_null(pc.match_substring_regex(pc.filter(raw, no_year), r'\(\d{4}\)'), False)
+    needs_regex = _replace(no_year, no_year, mid_year)
+    parsed = pc.extract_regex(pc.filter(trimmed, needs_regex), TITLE_PATTERN)
+    regex_alias = pc.struct_field(parsed, 'alt_title')
+    title = _replace(title, needs_regex, pc.struct_field(parsed, 'title'))
+    year = _replace(year, needs_regex, pc.struct_field(parsed, 'release_year'))
+    alt_title = _replace(alt_title, needs_regex, pc.if_else(pc.equal(regex_alias, ''), null_string, regex_alias))
+
+    table = pa.table({
+        'title': title,
+        'release_year': pc.cast(year, pa.int32()),
+        'alt_title': alt_title,
+    })
+    df = table.to_pandas(types_mapper=_PANDAS_TYPES.get)
+    if isinstance(titles, pd.Series):
+        df.index = titles.index
+
+    if detect_remakes:
+        first_year = df.groupby('title', observed=True)['release_year'].transform('min')
+        df['is_remake'] = (df['release_year'] > first_year).fillna(False).astype('boolean')
+    return df
+
+
+def prepare_movies(df, columns=("title", "release_year", "alt_title")):
+    """The ingest demos' transform: parsed title columns and genres split into lists.
+
+    Module-level (picklable), so ParallelCSVReader can run it inside its worker processes.
+    """
+    columns = list(columns)
+    df[columns] = parse_titles(df['title'])[columns]
+    df['genres'] = df['genres'].str.split('|')
+    return df
@@ -0,0 +1,174 @@
+# Parquet file layout (sort order, row-group/file sizing, dictionary columns) and small-file compaction
+import io
+import logging
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def _leaf_path(field):
+    # Parquet names the values of a list column <name>.list.element
+    if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+        return f"{field.name}.list.element"
+    return field.name
+
+
+def _match_columns(names, columns):
+    # Glue/Athena lower-case column names (movieId is stored as movieid), so match case-insensitively
+    lookup = {column.lower(): column for column in columns}
+    return [lookup[name.lower()] for name in names if name.lower() in lookup]
+
+
+class ParquetLayout:
+    """How rows are arranged inside the Parquet files of one partition.
+
+    - sort_by: rows are sorted by these columns, so row-group min/max statistics let
+      Athena skip row groups for range and equality filters (e.g. movieId)
+    - row_group_bytes / file_bytes: targets in uncompressed (Arrow in-memory) bytes;
+      a partition larger than file_bytes is split across several files
+    - dictionary encoding is enabled only for columns (or list elements, e.g. genres)
+      whose distinct/total ratio is at most dictionary_max_ratio; high-cardinality
+      columns like titles are written PLAIN instead of building a dictionary and
+      falling back
+    """
+
+    def __init__(self, sort_by=None, row_group_bytes=128 * MB, file_bytes=512 * MB,
+                 dictionary_max_ratio=0.5, compression="snappy"):
+        self.sort_by = [sort_by] if isinstance(sort_by, str) else list(sort_by or [])
+        self.row_group_bytes = row_group_bytes
+        self.file_bytes = file_bytes
+        self.dictionary_max_ratio = dictionary_max_ratio
+        self.compression = compression
+
+    def sort(self, table):
+        keys = [(name, "ascending") for name in _match_columns(self.sort_by, table.column_names)]
+        return table.sort_by(keys) if keys and table.num_rows else table
+
+    def dictionary_columns(self, table):
+        columns = []
+        for field, column in zip(table.schema, table.columns):
+            values = column
+            if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                values = pc.list_flatten(column)
+            if len(values) and pc.count_distinct(values).as_py() < len(values) * self.dictionary_max_ratio:
+                columns.append(_leaf_path(field))
+        return columns
+
+    def rows_per(self, table, target_bytes):
+        bytes_per_row = max(table.nbytes / max(table.num_rows, 1), 1)
+        return max(int(target_bytes / bytes_per_row), 1)
+
+    def encode(self, table):
+        """Sort table and return its Parquet encoding as a list of file bodies."""
+        table = self.sort(table)
+        rows_per_file = self.rows_per(table, self.file_bytes)
+        row_group_size = self.rows_per(table, self.row_group_bytes)
+        use_dictionary = self.dictionary_columns(table)
+        files = []
+        for offset in range(0, max(table.num_rows, 1), rows_per_file):
+            buffer = io.BytesIO()
+            pq.write_table(
+                table.slice(offset, rows_per_file),
+                buffer,
+                row_group_size=row_group_size,
+                use_dictionary=use_dictionary,
+                compression=self.compression,
+            )
+            files.append(buffer.getvalue())
+        return files
+
+    def wrangler_kwargs(self, df):
+        """Layout settings for wr.s3.to_parquet (sort df with sort_frame first)."""
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        return {
+            "max_rows_by_file": self.rows_per(table, self.file_bytes),
+            "pyarrow_additional_kwargs": {"use_dictionary": self.dictionary_columns(table)},
+        }
+
+    def sort_frame(self, df):
+        keys = _match_columns(self.sort_by, df.columns)
+        return df.sort_values(keys, kind="stable", ignore_index=True) if keys else df
+
+
+class ParquetCompactor:
+    """Merge the small Parquet files of each partition under prefix into layout-sized files.
+
+    A partition is rewritten when it has at least min_files files and one of them is
+    smaller than small_file_bytes. The swap happens per partition:
+    the merged file(s) are uploaded first, then all replaced files are removed with a
+    single DeleteObjects call, so readers never see a partition with data missing
+    (only, for that instant, both copies). S3 has no multi-object rename; a table
+    format such as Iceberg is needed for a fully atomic swap.
+    """
+
+    def __init__(self, bucket, prefix, layout=None, s3_client=None, workers=8,
+                 min_files=2, small_file_bytes=32 * MB):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/"
+        self.layout = layout or ParquetLayout()
+        self.s3 = s3_client or pooled_client("s3", max_pool_connections=workers)
+        self.workers = workers
+        self.min_files = min_files
+        self.small_file_bytes = small_file_bytes
+
+    def partitions(self):
+        """{partition prefix: [(key, size), ...]} for every Parquet file under prefix."""
+        files = defaultdict(list)
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                key = obj["Key"]
+                name = key.rsplit("/", 1)[-1]
+                # Athena and pyarrow ignore files starting with _ or . - so do we
+                if name.startswith(("_", ".")) or not name.endswith(".parquet"):
+                    continue
+                files[key.rsplit("/", 1)[0] + "/"].append((key, obj["Size"]))
+        return files
+
+    def needs_compaction(self, files):
+        small = sum(size < self.small_file_bytes for _, size in files)
+        return len(files) >= self.min_files and small > 0
+
+    def _read(self, key):
+        body = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return pq.read_table(io.BytesIO(body))
+
+    def _compact_partition(self, partition, files):
+        keys = [key for key, _ in files]
+        table = pa.concat_tables([self._read(key) for key in keys], promote_options="default")
+        version = uuid.uuid4().hex[:12]
+        new_keys = []
+        for i, body in enumerate(self.layout.encode(table)):
+            key = f"{partition}compacted-{version}-{i:05d}.parquet"
+            self.s3.put_object(Bucket=self.bucket, Key=key, Body=body)
+            new_keys.append(key)
+        # DeleteObjects takes up to 1000 keys per call
+        for i in range(0, len(keys), 1000):
+            self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True},
+            )
+        return len(keys), len(new_keys), sum(size for _, size in files)
+
+    def compact(self):
+        """Compact every partition that needs it; returns (partitions, files before, files after)."""
+        todo = {p: files for p, files in self.partitions().items() if self.needs_compaction(files)}
+        before = after = size = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for old, new, nbytes in pool.map(lambda item: self._compact_partition(*item), todo.items()):
+                before += old
+                after += new
+                size += nbytes
+        logger.info(f"Compacted {len(todo)} partitions under s3://{self.bucket}/{self.prefix}: "
+                    f"{before} files -> {after} files ({size / MB:.1f} MB)")
+        return len(todo), before, after
@@ -0,0 +1,114 @@
+# Parallel writer for Hive-style partitioned Parquet datasets on S3
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+from boto3.s3.transfer import TransferConfig
+
+from .clients import pooled_client
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class PartitionedParquetWriter:
+    """Encode each partition to Parquet in memory and upload them concurrently.
+
+    All uploads share one S3 client whose connection pool is sized for the thread
+    pool, so connections are reused instead of re-negotiated per partition.
+    Partitions larger than multipart_threshold are sent as multipart uploads.
+    Pass your own s3_client (e.g. one created inside moto's mock_aws) for testing.
+    With a ParquetLayout, partitions are sorted, sized and dictionary-encoded by it
+    (large partitions may then span several files).
+    Each written partition is replaced: after its upload, objects under the partition
+    prefix that this write didn't produce (extra parts from a larger earlier run,
+    ParquetCompactor output, appended files) are deleted, so Athena never reads
+    stale rows next to the new ones.
+    """
+
+    def __init__(self, bucket, prefix, partition_col, s3_client=None, max_workers=16,
+                 file_name="data.parquet", multipart_threshold=64 * MB, multipart_chunksize=16 * MB,
+                 part_concurrency=4, layout=None):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.partition_col = partition_col
+        self.file_name = file_name
+        self.layout = layout
+        self.max_workers = max_workers
+        self.s3 = s3_client or pooled_client("s3", max_pool_connections=max_workers * part_concurrency)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=part_concurrency,
+        )
+        # At most two encoded partitions per worker are held in memory at once
+        self._in_flight = threading.BoundedSemaphore(max_workers * 2)
+
+    def partition_key(self, value, part=0):
+        name = self.file_name
+        if part:
+            stem, dot, ext = name.rpartition(".")
+            name = f"{stem}-{part:05d}{dot}{ext}" if dot else f"{name}-{part:05d}"
+        return f"{self.prefix}/{self.partition_col}={value}/{name}"
+
+    def _encode(self, group):
+        # The partition value lives in the S3 path, so it is not repeated inside the file
+        frame = group.drop(columns=[self.partition_col])
+        if self.layout is not None:
+            return self.layout.encode(pa.Table.from_pandas(frame, preserve_index=False))
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False)
+        return [buffer.getvalue()]
+
+    def _remove_stale(self, value, keep):
+        partition = self.partition_key(value).rpartition("/")[0] + "/"
+        paginator = self.s3.get_paginator("list_objects_v2")
+        stale = [
+            obj["Key"]
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=partition)
+            for obj in page.get("Contents", [])
+            if obj["Key"] not in keep
+        ]
+        # DeleteObjects takes up to 1000 keys per call
+        for i in range(0, len(stale), 1000):
+            self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in stale[i:i + 1000]], "Quiet": True},
+            )
+        return len(stale)
+
+    def _write_partition(self, value, group):
+        try:
+            size = 0
+            keys = set()
+            for part, body in enumerate(self._encode(group)):
+                key = self.partition_key(value, part)
+                self.s3.upload_fileobj(io.BytesIO(body), self.bucket, key, Config=self.transfer_config)
+                keys.add(key)
+                size += len(body)
+            # Only after the new files are in place, so the partition is never empty
+            removed = self._remove_stale(value, keys)
+            if removed:
+                logger.info(f"Removed {removed} stale files from partition {self.partition_col}={value}")
+            return value, self.partition_key(value), size
+        finally:
+            self._in_flight.release()
+
+    def write(self, df):
+        """Write every partition of df and return {partition_value: s3 uri}."""
+        written = {}
+        total_bytes = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = []
+            for value, group in df.groupby(self.partition_col, sort=False):
+                self._in_flight.acquire()
+                futures.append(pool.submit(self._write_partition, value, group))
+            for future in futures:
+                value, key, size = future.result()
+                written[value] = f"s3://{self.bucket}/{key}"
+                total_bytes += size
+        logger.info(f"Wrote {len(written)} partitions ({total_bytes / MB:.1f} MB) to s3://{self.bucket}/{self.prefix}/")
+        return written
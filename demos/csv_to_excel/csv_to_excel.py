@@ -1,9 +1,16 @@
 import pandas as pd 
+import sys
+from pathlib import Path
+
+# Shared helpers live in demos/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.excel import write_excel
 
 
 
 # read the employees.csv file into a data frame
 df = pd.read_csv("employees.csv")
 
-#write the data frame to an excel file
-df.to_excel("employees.xlsx", index=False)
\ No newline at end of file
+# write the data frame to an excel file
+# openpyxl write-only mode streams rows to the file instead of building every cell in memory
+write_excel(df, "employees.xlsx")
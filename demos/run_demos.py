@@ -0,0 +1,164 @@
+# Run several demos in one Python process: imports, the boto3 session and the pooled
+# clients are set up once instead of once per script
+# Usage:
+#   python demos/run_demos.py                          # all wrangler demos in the README order
+#   python demos/run_demos.py 05 --with-deps           # demo 04 first, then 05
+#   python demos/run_demos.py 01 04 --variant both --report /tmp/run_demos.json
+#   python demos/run_demos.py 04 05 --repeat 2         # second pass shows fully warm timings
+# Demos are not idempotent (e.g. demo 01 appends to the movies table), so --repeat writes again.
+import argparse
+import contextvars
+import importlib
+import json
+import logging
+import os
+import runpy
+import sys
+import time
+import traceback
+from pathlib import Path
+
+DEMOS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(DEMOS_DIR))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("run_demos")
+
+# demo -> scripts, the demos it needs to have run first, and the AWS services it uses
+DEMOS = {
+    "01": {"boto3": "01_csv_to_parquet/boto3_version.py", "wrangler": "01_csv_to_parquet/wrangler.py",
+           "needs": [], "services": ["s3", "glue"]},
+    "02": {"boto3": "02_athena_query/boto3_version.py", "wrangler": "02_athena_query/wrangler.py",
+           "needs": ["01"], "services": ["athena", "glue", "s3"]},
+    "03": {"boto3": "03_excel_to_glue/boto3_version.py", "wrangler": "03_excel_to_glue/wrangler.py",
+           "needs": [], "services": ["s3", "glue"]},
+    "04": {"boto3": "04_dynamodb_write/boto3_version.py", "wrangler": "04_dynamodb_write/wrangler.py",
+           "needs": [], "services": ["s3", "dynamodb"]},
+    "05": {"boto3": "05_dynamodb_lookup/boto3_rename.py", "wrangler": "05_dynamodb_lookup/wrangler.py",
+           "needs": ["04"], "services": ["dynamodb", "s3"]},
+    "06": {"boto3": "06_athena_to_dynamodb_etl/boto3_version.py", "wrangler": "06_athena_to_dynamodb_etl/wrangler.py",
+           "needs": ["01"], "services": ["athena", "glue", "s3", "dynamodb"]},
+}
+# The README's execution order; every demo comes after the ones it needs
+ORDER = ["01", "02", "04", "05", "06", "03"]
+
+
+def plan(selected, with_deps):
+    """Selected demos (plus, with with_deps, everything they need) in dependency order."""
+    wanted = set(selected)
+    if with_deps:
+        pending = list(selected)
+        while pending:
+            for need in DEMOS[pending.pop()]["needs"]:
+                if need not in wanted:
+                    wanted.add(need)
+                    pending.append(need)
+    return [demo for demo in ORDER if demo in wanted]
+
+
+def warm_up(variants, services):
+    """Import the heavy modules and create the shared session/clients; returns timings in seconds."""
+    from common.clients import pooled_client, session
+
+    modules = ["pandas", "pyarrow.parquet", "boto3"]
+    if "wrangler" in variants:
+        modules.append("awswrangler")
+    timings = {}
+    for module in modules:
+        start = time.perf_counter()
+        importlib.import_module(module)
+        timings[f"import {module}"] = time.perf_counter() - start
+    start = time.perf_counter()
+    session()
+    # One client per service loads its model into the session's cache, so clients the
+    # demos create later (other pool sizes, awswrangler's own) skip that step
+    for service in services:
+        pooled_client(service)
+    timings["session + clients"] = time.perf_counter() - start
+    return timings
+
+
+def run_script(script):
+    start = time.perf_counter()
+    # Demos open their input files (e.g. employees.xlsx) relative to their own directory
+    cwd = os.getcwd()
+    os.chdir((DEMOS_DIR / script).parent)
+    try:
+        # A fresh context per demo: its start_tracing() name applies to its own spans only
+        contextvars.copy_context().run(runpy.run_path, str(DEMOS_DIR / script), run_name="__main__")
+        return "ok", time.perf_counter() - start, None
+    except Exception:
+        logger.error(f"{script} failed:\n{traceback.format_exc()}")
+        return "failed", time.perf_counter() - start, traceback.format_exc(limit=3)
+    finally:
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("demos", nargs="*", choices=ORDER, default=ORDER, metavar="DEMO",
+                        help=f"demos to run ({' '.join(ORDER)}); default all")
+    parser.add_argument("--variant", choices=["wrangler", "boto3", "both"], default="wrangler")
+    parser.add_argument("--with-deps", action="store_true", help="also run the demos the selected ones need")
+    parser.add_argument("--repeat", type=int, default=1, help="run the whole selection this many times")
+    parser.add_argument("--report", help="write timings as JSON to this path")
+    args = parser.parse_args()
+
+    demos = plan(args.demos, args.with_deps)
+    variants = ["boto3", "wrangler"] if args.variant == "both" else [args.variant]
+    services = sorted({service for demo in demos for service in DEMOS[demo]["services"]})
+
+    # Tracing (DEMO_TRACE_PATH) has to wrap client creation, so it starts before the warm-up
+    from common.instrumentation import span, start_tracing
+    start_tracing("run_demos")
+
+    with span("warm_up"):
+        startup = warm_up(variants, services)
+    startup_seconds = sum(startup.values())
+
+    runs = []
+    failed = set()
+    for repeat in range(1, args.repeat + 1):
+        for demo in demos:
+            for variant in variants:
+                script = DEMOS[demo][variant]
+                if failed & set(DEMOS[demo]["needs"]):
+                    runs.append({"demo": demo, "variant": variant, "pass": repeat, "status": "skipped"})
+                    continue
+                logger.info(f"Running demo {demo} ({variant}), pass {repeat}")
+                with span("demo", demo=demo, variant=variant, run=repeat):
+                    status, seconds, error = run_script(script)
+                if status == "failed":
+                    failed.add(demo)
+                runs.append({"demo": demo, "variant": variant, "pass": repeat, "status": status,
+                             "seconds": round(seconds, 3), "error": error})
+
+    print(f"\nStartup paid once here (and by every script run on its own): {startup_seconds:.2f}s")
+    for step, seconds in startup.items():
+        print(f"  {step:<28} {seconds:>6.2f}s")
+    header = "".join(f"{'pass ' + str(n):>10}" for n in range(1, args.repeat + 1))
+    print(f"\n{'demo':<6}{'variant':<10}{header}")
+    for demo in demos:
+        for variant in variants:
+            cells = []
+            for run in runs:
+                if run["demo"] == demo and run["variant"] == variant:
+                    cells.append(f"{run['seconds']:>9.2f}s" if run["status"] == "ok" else f"{run['status']:>10}")
+            print(f"{demo:<6}{variant:<10}{''.join(cells)}")
+    executed = [run for run in runs if "seconds" in run]
+    total = sum(run["seconds"] for run in executed)
+    print(f"\n{len(executed)} runs in {total + startup_seconds:.2f}s; as separate scripts the startup alone "
+          f"would add about {startup_seconds * max(len(executed) - 1, 0):.2f}s")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps({
+            "startup": {step: round(seconds, 3) for step, seconds in startup.items()},
+            "startup_seconds": round(startup_seconds, 3),
+            "runs": runs,
+        }, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()